@@ -0,0 +1,410 @@
+"""
+Multi-account detection over shared IPs and UUIDs
+
+Keeps an in-memory bipartite graph of users <-> IPs <-> UUIDs, loaded
+incrementally from user_ip / user_uuid using last_update watermarks and
+cached on disk between restarts. Users that share an IP or UUID are merged
+into clusters with union-find, so cluster lookups never touch MySQL.
+
+Watermarks cannot see deleted rows, so each refresh also counts the rows of
+both tables and reloads a table in full when its count no longer matches
+the graph. With a cache path, only the worker process holding the cache's
+lock file queries MySQL and writes the cache; the other workers reload the
+file when it changes.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+BATCH_SIZE = 10000
+
+# Seconds between cache file checks in workers that do not refresh
+FOLLOW_INTERVAL = 5.0
+
+# kind -> (table, identifier column)
+IDENTIFIER_TABLES = {'ip': ('user_ip', 'ip'), 'uuid': ('user_uuid', 'uuid')}
+
+
+class UnionFind:
+    """Disjoint sets with path halving and union by size"""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.size[item] = 1
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+def _to_timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class AccountLinkGraph:
+    """Users linked through shared identifiers, grouped into clusters"""
+
+    def __init__(self, get_connection, cache_path=None, max_identifier_users=25):
+        self._get_connection = get_connection
+        self.cache_path = cache_path
+        # Identifiers shared by more users than this (NAT gateways, VPN exits)
+        # are reported but not used to merge clusters
+        self.max_identifier_users = int(max_identifier_users)
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._users = {}
+        self._identifiers = {'ip': {}, 'uuid': {}}
+        self._user_identifiers = {'ip': {}, 'uuid': {}}
+        self._watermarks = {'ip': None, 'uuid': None, 'user': None}
+        self._components = {}
+        self._cluster_of = {}
+        self._thread = None
+        self._lock_fd = None
+        self._cache_version = None
+        self.ready = False
+        self.refreshed_at = None
+        self.refresh_seconds = None
+        self.full_reloads = 0
+
+        self._load_cache()
+
+    # Loading
+
+    def _fetch_batches(self, cursor, query, params):
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+    def _load_users(self, cursor):
+        watermark = self._watermarks['user']
+        if watermark is None:
+            query = "SELECT id, user_name, email, status, level, last_active FROM user"
+            params = ()
+        else:
+            query = """
+                SELECT id, user_name, email, status, level, last_active FROM user
+                WHERE last_active >= %s OR creation_time >= %s
+            """
+            params = (datetime.fromtimestamp(watermark), datetime.fromtimestamp(watermark))
+
+        users = []
+        for user_id, user_name, email, status, level, last_active in self._fetch_batches(cursor, query, params):
+            last_active = _to_timestamp(last_active)
+            users.append({
+                'id': user_id,
+                'user_name': user_name,
+                'email': email,
+                'status': status,
+                'level': level,
+                'last_active': last_active
+            })
+            if last_active is not None and (watermark is None or last_active > watermark):
+                watermark = last_active
+        return users, watermark
+
+    def _load_identifiers(self, cursor, kind, full=False):
+        table, column = IDENTIFIER_TABLES[kind]
+        watermark = None if full else self._watermarks[kind]
+        query = f"SELECT user, {column}, last_update FROM {table}"
+        params = ()
+        if watermark is not None:
+            # Inclusive so rows written in the watermark's second are not missed
+            query += " WHERE last_update >= %s"
+            params = (datetime.fromtimestamp(watermark),)
+
+        edges = []
+        for user_id, identifier, last_update in self._fetch_batches(cursor, query, params):
+            edges.append((user_id, identifier))
+            last_update = _to_timestamp(last_update)
+            if last_update is not None and (watermark is None or last_update > watermark):
+                watermark = last_update
+        return edges, watermark
+
+    def _add_edges(self, kind, edges):
+        owners = self._identifiers[kind]
+        owned = self._user_identifiers[kind]
+        for user_id, identifier in edges:
+            owners.setdefault(identifier, set()).add(user_id)
+            owned.setdefault(user_id, set()).add(identifier)
+
+    def _edge_count(self, kind, edges):
+        """Edges of `kind` the graph would hold after adding `edges`"""
+        owned = self._user_identifiers[kind]
+        new = {(user_id, identifier) for user_id, identifier in edges if identifier not in owned.get(user_id, ())}
+        return sum(len(identifiers) for identifiers in owned.values()) + len(new)
+
+    def refresh(self):
+        """Pull rows changed since the watermarks and recompute clusters"""
+        with self._refresh_lock:
+            started = time.monotonic()
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            loaded = {}
+            try:
+                users, user_watermark = self._load_users(cursor)
+                for kind, (table, _) in IDENTIFIER_TABLES.items():
+                    edges, watermark = self._load_identifiers(cursor, kind)
+                    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                    # A count that differs from the edges means rows were
+                    # deleted (or written since the read above); the
+                    # watermark cannot tell which, so start the table over
+                    full = cursor.fetchone()[0] != self._edge_count(kind, edges)
+                    if full:
+                        edges, watermark = self._load_identifiers(cursor, kind, full=True)
+                    loaded[kind] = (edges, watermark, full)
+            finally:
+                cursor.close()
+                conn.close()
+
+            # Only this thread mutates the graph; readers take the lock
+            with self._lock:
+                for user in users:
+                    self._users[user['id']] = user
+                for kind, (edges, watermark, full) in loaded.items():
+                    if full:
+                        self._identifiers[kind] = {}
+                        self._user_identifiers[kind] = {}
+                        self.full_reloads += 1
+                    self._add_edges(kind, edges)
+                    self._watermarks[kind] = watermark
+                self._watermarks['user'] = user_watermark
+
+            self._rebuild_clusters()
+            self.refresh_seconds = round(time.monotonic() - started, 3)
+            self.refreshed_at = time.time()
+            self.ready = True
+            self._save_cache()
+
+    def _rebuild_clusters(self):
+        union_find = UnionFind()
+        with self._lock:
+            groups = [users for owners in self._identifiers.values() for users in owners.values()]
+        for users in groups:
+            if len(users) < 2 or len(users) > self.max_identifier_users:
+                continue
+            first, *rest = users
+            for user_id in rest:
+                union_find.union(first, user_id)
+
+        components = {}
+        for user_id in list(union_find.parent):
+            components.setdefault(union_find.find(user_id), set()).add(user_id)
+
+        cluster_of = {}
+        for root, members in components.items():
+            for user_id in members:
+                cluster_of[user_id] = root
+
+        with self._lock:
+            self._components = components
+            self._cluster_of = cluster_of
+
+    # Background job
+
+    def start(self, interval):
+        """Refresh every `interval` seconds on a daemon thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name='account-links', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            try:
+                self.update()
+            except Exception as e:
+                print(f'Account link refresh failed: {e}')
+            # Followers only stat the cache file, so they can look often
+            time.sleep(interval if self._lock_fd is not None or not self.cache_path else min(interval, FOLLOW_INTERVAL))
+
+    def update(self):
+        """Refresh from MySQL in the writer process; elsewhere reload the cache if it changed"""
+        if self._is_writer():
+            self.refresh()
+        else:
+            self._load_cache()
+
+    def _is_writer(self):
+        """Whether this process refreshes the graph; with a cache path only the lock holder does"""
+        if not self.cache_path or self._lock_fd is not None:
+            return True
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(f'{self.cache_path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Held until this process exits; another worker then takes over
+        self._lock_fd = fd
+        return True
+
+    # Disk cache
+
+    def _load_cache(self):
+        """Replace the graph with the cache file's, unless it is unchanged since the last load"""
+        if not self.cache_path:
+            return
+        try:
+            stat = os.stat(self.cache_path)
+        except FileNotFoundError:
+            return
+        # Every save replaces the file, so a new inode means new contents
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self._cache_version:
+            return
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            users = {int(user_id): user for user_id, user in data['users'].items()}
+            identifiers = {kind: {} for kind in IDENTIFIER_TABLES}
+            user_identifiers = {kind: {} for kind in IDENTIFIER_TABLES}
+            for kind, owners in data['identifiers'].items():
+                for identifier, owner_ids in owners.items():
+                    identifiers[kind][identifier] = set(owner_ids)
+                    for user_id in owner_ids:
+                        user_identifiers[kind].setdefault(user_id, set()).add(identifier)
+            with self._lock:
+                self._users = users
+                self._identifiers = identifiers
+                self._user_identifiers = user_identifiers
+                self._watermarks = data['watermarks']
+            self.refreshed_at = data.get('refreshed_at')
+            self._cache_version = version
+            self._rebuild_clusters()
+            self.ready = True
+        except Exception as e:
+            print(f'Ignoring unreadable account link cache {self.cache_path}: {e}')
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            'users': self._users,
+            'identifiers': {
+                kind: {identifier: sorted(users) for identifier, users in owners.items()}
+                for kind, owners in self._identifiers.items()
+            },
+            'watermarks': self._watermarks,
+            'refreshed_at': self.refreshed_at
+        }
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cache_path)
+        # Our own write; nothing to reload
+        stat = os.stat(self.cache_path)
+        self._cache_version = (stat.st_ino, stat.st_mtime_ns)
+
+    # Queries
+
+    def _describe(self, members):
+        """Cluster members plus the identifiers they share (caller holds the lock)"""
+        shared = {}
+        for kind, owners in self._identifiers.items():
+            owned = self._user_identifiers[kind]
+            identifiers = set()
+            for user_id in members:
+                identifiers |= owned.get(user_id, set())
+            shared[kind] = sorted(
+                (
+                    {
+                        'value': identifier,
+                        'users': sorted(owners[identifier] & members),
+                        'total_users': len(owners[identifier]),
+                        'linking': len(owners[identifier]) <= self.max_identifier_users
+                    }
+                    for identifier in identifiers
+                    if len(owners[identifier] & members) > 1
+                ),
+                key=lambda item: -len(item['users'])
+            )
+
+        users = [
+            self._users.get(user_id, {'id': user_id})
+            for user_id in sorted(members)
+        ]
+        return {
+            'size': len(members),
+            'users': users,
+            'shared_ips': shared['ip'],
+            'shared_uuids': shared['uuid'],
+            'score': self._score(len(members), len(shared['uuid']), len(shared['ip']))
+        }
+
+    def _score(self, size, shared_uuids, shared_ips):
+        # Shared device UUIDs are much stronger evidence than shared IPs
+        return (size - 1) * 10 + shared_uuids * 5 + shared_ips
+
+    def cluster_for_user(self, user_id):
+        """The cluster containing `user_id`, or None if the user shares nothing"""
+        with self._lock:
+            root = self._cluster_of.get(user_id)
+            if root is None:
+                return None
+            return self._describe(self._components[root])
+
+    def suspicious_clusters(self, limit=20, min_size=2):
+        """Top clusters by suspicion score"""
+        with self._lock:
+            components = [members for members in self._components.values() if len(members) >= min_size]
+            # Cheap pre-ranking by size keeps _describe off the long tail
+            components.sort(key=len, reverse=True)
+            described = [self._describe(members) for members in components[:limit * 5]]
+        described.sort(key=lambda cluster: cluster['score'], reverse=True)
+        return described[:limit]
+
+    def stats(self):
+        with self._lock:
+            multi = [members for members in self._components.values() if len(members) > 1]
+            return {
+                'ready': self.ready,
+                'users': len(self._users),
+                'ips': len(self._identifiers['ip']),
+                'uuids': len(self._identifiers['uuid']),
+                'clusters': len(multi),
+                'clustered_users': sum(len(members) for members in multi),
+                'largest_cluster': max((len(members) for members in multi), default=0),
+                'watermarks': dict(self._watermarks),
+                'refreshed_at': self.refreshed_at,
+                'refresh_seconds': self.refresh_seconds,
+                'full_reloads': self.full_reloads,
+                'writer': not self.cache_path or self._lock_fd is not None
+            }
@@ -0,0 +1,301 @@
+"""
+Daily activity rollups and signup-cohort retention
+
+The game only keeps each user's latest `last_active`, so active users per
+day cannot be recovered from the user table after the fact. ActivityRollup
+polls it on an interval, reading only users whose last_active moved past a
+(last_active, id) watermark, and records each (user, day) it sees in a local
+SQLite file. From those it maintains compact per-day rows (DAU, WAU, MAU,
+new signups) and per-cohort active counts, so the activity endpoints read
+O(days) rows instead of grouping the whole user table.
+
+A user who is active on several days between two polls is only counted on
+the last of them, so poll well inside a day.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+WINDOWS = {'dau': 1, 'wau': 7, 'mau': 30}
+
+_EPOCH = date(1970, 1, 1)
+
+
+def day_number(value):
+    """Days since 1970-01-01 for a date, datetime or ISO string"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def day_date(number):
+    return _EPOCH + timedelta(days=number)
+
+
+class ActivityRollup:
+    """Incremental per-day and per-cohort activity counts from the user table"""
+
+    def __init__(self, path, get_connection, interval=300.0, batch_size=5000,
+                 backfill_days=30, raw_retention_days=60):
+        self.path = path
+        self._get_connection = get_connection
+        self.interval = float(interval)
+        self.batch_size = int(batch_size)
+        self.backfill_days = int(backfill_days)
+        # (user, day) rows are only needed for the WAU/MAU windows; the
+        # daily and cohort counts are kept for good. They are kept at least
+        # long enough to count full windows over the whole backfill
+        self.raw_retention_days = max(int(raw_retention_days), self.backfill_days + max(WINDOWS.values()))
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.last_error = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS user_day (
+                    day INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    PRIMARY KEY (day, user_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS daily_activity (
+                    day INTEGER PRIMARY KEY,
+                    dau INTEGER NOT NULL DEFAULT 0,
+                    wau INTEGER NOT NULL DEFAULT 0,
+                    mau INTEGER NOT NULL DEFAULT 0,
+                    new_users INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS cohort_activity (
+                    cohort INTEGER NOT NULL,
+                    day INTEGER NOT NULL,
+                    active INTEGER NOT NULL,
+                    PRIMARY KEY (cohort, day)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    key TEXT PRIMARY KEY,
+                    value
+                );
+            """)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self, write=False):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Writers take the lock up front, so workers running the job at
+            # the same time queue up and each sees the previous watermark
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _state(self, conn):
+        return dict(conn.execute("SELECT key, value FROM rollup_state").fetchall())
+
+    def _set_state(self, conn, **values):
+        conn.executemany("INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)", values.items())
+
+    def start(self):
+        """Run the job every `interval` seconds in a daemon thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='activity-rollup', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.run()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f'Activity rollup failed: {e}')
+            if self._stop.wait(self.interval):
+                return
+
+    def run(self, force=False):
+        """Roll up activity since the watermark; False if another worker just did"""
+        with self._connect(write=True) as conn:
+            state = self._state(conn)
+            if not force and time.time() - (state.get('last_run') or 0) < self.interval / 2:
+                return False
+            today = day_number(datetime.now())
+            self._roll_signups(conn, state)
+            touched = self._roll_active(conn, state, today)
+            # Days since the last run need rows even if nobody was seen on them
+            touched.add(min(state.get('counted_day', today), today))
+            self._recount(conn, min(touched), today)
+            conn.execute("DELETE FROM user_day WHERE day < ?", (today - self.raw_retention_days,))
+            self._set_state(conn, last_run=time.time(), counted_day=today)
+        self.runs += 1
+        return True
+
+    def _fetch(self, query, params):
+        db = self._get_connection()
+        cursor = db.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            db.close()
+
+    def _roll_signups(self, conn, state):
+        """Count users created since the id watermark into their signup day"""
+        after_id = state.get('signup_id') or 0
+        rows = self._fetch("""
+            SELECT DATE(creation_time), COUNT(*), MAX(id)
+            FROM user
+            WHERE id > %s AND creation_time IS NOT NULL
+            GROUP BY DATE(creation_time)
+        """, (after_id,))
+        max_id = after_id
+        # One row per signup day, so this stays small even on the first run
+        for created, count, last_id in rows:
+            conn.execute("""
+                INSERT INTO daily_activity (day, new_users) VALUES (?, ?)
+                ON CONFLICT (day) DO UPDATE SET new_users = new_users + excluded.new_users
+            """, (day_number(created), count))
+            max_id = max(max_id, last_id)
+        self._set_state(conn, signup_id=max_id)
+
+    def _roll_active(self, conn, state, today):
+        """Record users whose last_active moved past the watermark on that day"""
+        after_time = state.get('active_time')
+        after_id = state.get('active_id') or 0
+        if after_time is None:
+            # First run: last_active is all the history the game keeps
+            after_time = day_date(today - self.backfill_days).isoformat() + ' 00:00:00'
+            after_id = 0
+        touched = set()
+        while True:
+            # Keyset pagination on (last_active, id) so ties at a batch edge are not skipped
+            batch = self._fetch("""
+                SELECT id, last_active, creation_time
+                FROM user
+                WHERE last_active > %s OR (last_active = %s AND id > %s)
+                ORDER BY last_active, id
+                LIMIT %s
+            """, (after_time, after_time, after_id, self.batch_size))
+            for user_id, last_active, created in batch:
+                day = day_number(last_active)
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO user_day (day, user_id) VALUES (?, ?)", (day, user_id)
+                ).rowcount
+                if inserted and created is not None:
+                    conn.execute("""
+                        INSERT INTO cohort_activity (cohort, day, active) VALUES (?, ?, 1)
+                        ON CONFLICT (cohort, day) DO UPDATE SET active = active + 1
+                    """, (day_number(created), day))
+                touched.add(day)
+            if batch:
+                last_active, after_id = batch[-1][1], batch[-1][0]
+                after_time = last_active.isoformat(sep=' ') if isinstance(last_active, datetime) else str(last_active)
+            if len(batch) < self.batch_size:
+                break
+        self._set_state(conn, active_time=after_time, active_id=after_id)
+        return touched
+
+    def _recount(self, conn, since, today):
+        """Recompute DAU/WAU/MAU for every day from `since` (windows reach forward from it) to today"""
+        # Older days' WAU/MAU windows reach past the (user, day) rows still
+        # kept, so only their DAU is recounted
+        windowed = today - self.raw_retention_days + max(WINDOWS.values())
+        for day in range(since, today + 1):
+            windows = WINDOWS if day >= windowed else {'dau': WINDOWS['dau']}
+            counts = {
+                name: conn.execute(
+                    "SELECT COUNT(DISTINCT user_id) FROM user_day WHERE day > ? AND day <= ?",
+                    (day - window, day)
+                ).fetchone()[0]
+                for name, window in windows.items()
+            }
+            columns = ', '.join(counts)
+            conn.execute(f"""
+                INSERT INTO daily_activity (day, {columns}) VALUES (:day, {', '.join(':' + name for name in counts)})
+                ON CONFLICT (day) DO UPDATE SET {', '.join(f'{name} = excluded.{name}' for name in counts)}
+            """, dict(counts, day=day))
+
+    def daily(self, days=30):
+        """Per-day rows for the last `days` days (including today), oldest first"""
+        first = day_number(datetime.now()) - int(days) + 1
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, dau, wau, mau, new_users FROM daily_activity WHERE day >= ? ORDER BY day",
+                (first,)
+            ).fetchall()
+        return [
+            {'date': day_date(day).isoformat(), 'dau': dau, 'wau': wau, 'mau': mau, 'new_users': new_users}
+            for day, dau, wau, mau, new_users in rows
+        ]
+
+    def retention(self, cohorts=30, days=30):
+        """Share of each of the last `cohorts` signup days active N days after signup"""
+        first = day_number(datetime.now()) - int(cohorts) + 1
+        with self._connect() as conn:
+            sizes = conn.execute(
+                "SELECT day, new_users FROM daily_activity WHERE day >= ? AND new_users > 0 ORDER BY day",
+                (first,)
+            ).fetchall()
+            active = conn.execute(
+                "SELECT cohort, day - cohort, active FROM cohort_activity WHERE cohort >= ? AND day - cohort < ?",
+                (first, int(days))
+            ).fetchall()
+        by_cohort = {}
+        for cohort, offset, count in active:
+            by_cohort.setdefault(cohort, {})[offset] = count
+        today = day_number(datetime.now())
+        matrix = []
+        for cohort, size in sizes:
+            counts = by_cohort.get(cohort, {})
+            # Days that have not happened yet for this cohort are None, not 0
+            span = min(int(days), today - cohort + 1)
+            matrix.append({
+                'cohort': day_date(cohort).isoformat(),
+                'users': size,
+                'active': [counts.get(offset, 0) for offset in range(span)],
+                'retention': [round(counts.get(offset, 0) * 100 / size, 2) for offset in range(span)]
+                             + [None] * (int(days) - span)
+            })
+        return matrix
+
+    def stats(self):
+        with self._connect() as conn:
+            state = self._state(conn)
+            user_days = conn.execute("SELECT COUNT(*) FROM user_day").fetchone()[0]
+            daily_rows = conn.execute("SELECT COUNT(*) FROM daily_activity").fetchone()[0]
+            cohort_rows = conn.execute("SELECT COUNT(*) FROM cohort_activity").fetchone()[0]
+        return {
+            'interval': self.interval,
+            'last_run': datetime.fromtimestamp(state['last_run']).isoformat() if state.get('last_run') else None,
+            'watermark': {'last_active': state.get('active_time'), 'id': state.get('active_id'),
+                          'signup_id': state.get('signup_id')},
+            'user_days': user_days,
+            'daily_rows': daily_rows,
+            'cohort_rows': cohort_rows,
+            'runs': self.runs,
+            'last_error': self.last_error
+        }
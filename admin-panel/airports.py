@@ -0,0 +1,207 @@
+"""
+In-memory airport reference index
+
+The airport table hardly ever changes, so instead of joining it twice into
+every route query, its id, IATA code, name, city, country and coordinates
+are loaded into parallel arrays sorted by id and looked up with a binary
+search. The table's row count, highest id and last update time are
+re-read every `check_interval` seconds and the index is reloaded when any
+of them changes. Routes pointing at an airport missing from the table are
+left out, as the inner join used to do.
+Lookups never touch the database; call refresh() before checking out the
+connection for the route query, so a reload never needs a second one.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+LOAD_BATCH_SIZE = 5000
+
+# Response suffix -> airport column
+FIELDS = {'iata': 'iata', 'name': 'name', 'city': 'city', 'country': 'country_code'}
+
+
+class AirportIndex:
+    """Airport details by id, refreshed when the airport table changes"""
+
+    def __init__(self, get_connection, check_interval=300.0):
+        self._get_connection = get_connection
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._checking = False
+        self._checked_at = 0.0
+        self._signature = None
+        # (ids, {field: values}, latitudes, longitudes), swapped as a whole on reload
+        self._data = None
+        self.loaded_at = None
+        self.loads = 0
+        self.misses = 0
+
+    def _read_signature(self, cursor):
+        cursor.execute("SELECT COUNT(*), MAX(id) FROM airport")
+        count, max_id = cursor.fetchone()
+        try:
+            # Table metadata only, unlike CHECKSUM TABLE which reads every row
+            cursor.execute("""
+                SELECT UPDATE_TIME FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'airport'
+            """)
+            row = cursor.fetchone()
+            updated = row[0] if row else None
+        except Exception:
+            # Not MySQL; the count and highest id have to do
+            updated = None
+        return count, max_id, updated
+
+    def _load(self, cursor):
+        ids = array('q')
+        values = {field: [] for field in FIELDS}
+        latitudes = array('d')
+        longitudes = array('d')
+        cursor.execute("""
+            SELECT id, iata, name, city, country_code, latitude, longitude
+            FROM airport
+            ORDER BY id
+        """)
+        while True:
+            rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            for airport_id, iata, name, city, country, latitude, longitude in rows:
+                ids.append(airport_id)
+                values['iata'].append(iata)
+                values['name'].append(name)
+                values['city'].append(city)
+                values['country'].append(country)
+                latitudes.append(float(latitude or 0))
+                longitudes.append(float(longitude or 0))
+        return ids, values, latitudes, longitudes
+
+    def refresh(self, force=False):
+        """Reload if the table changed; checks at most every check_interval, one thread at a time"""
+        if self._data is None:
+            # Nothing to serve yet: every caller waits for the first load
+            with self._load_lock:
+                if self._data is None:
+                    self._check(force=True)
+            return
+        with self._lock:
+            due = force or time.monotonic() - self._checked_at >= self.check_interval
+            if self._checking or not due:
+                return
+            self._checking = True
+        try:
+            self._check(force)
+        except Exception as e:
+            # Keep serving the index we have; the next check may succeed
+            print(f'Airport index refresh failed: {e}')
+            with self._lock:
+                self._checked_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._checking = False
+
+    def _check(self, force):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            signature = self._read_signature(cursor)
+            data = self._load(cursor) if force or signature != self._signature else None
+        finally:
+            cursor.close()
+            conn.close()
+        with self._lock:
+            if data is not None:
+                self._data = data
+                self._signature = signature
+                self.loaded_at = time.time()
+                self.loads += 1
+            self._checked_at = time.monotonic()
+
+    def _position(self, data, airport_id):
+        ids = data[0]
+        position = bisect_left(ids, airport_id)
+        if position < len(ids) and ids[position] == airport_id:
+            return position
+        return None
+
+    def get(self, airport_id):
+        """Details of one airport, or None if it is not in the index"""
+        data = self._data
+        position = self._position(data, airport_id) if data else None
+        if position is None:
+            return None
+        airport = {field: values[position] for field, values in data[1].items()}
+        airport['id'] = airport_id
+        airport['latitude'] = data[2][position]
+        airport['longitude'] = data[3][position]
+        return airport
+
+    def resolve(self, rows, columns=(('from_airport', 'from_'), ('to_airport', 'to_')), fields=tuple(FIELDS)):
+        """Rows with `<prefix><field>` keys added for every (id column, prefix) in
+        `columns`; rows referring to an unknown airport are dropped, like an inner join"""
+        data = self._data
+        missing = False
+        resolved = []
+        for row in rows:
+            positions = [self._position(data, row[column]) if data else None for column, _ in columns]
+            if None in positions:
+                missing = True
+                continue
+            for (_, prefix), position in zip(columns, positions):
+                for field in fields:
+                    row[prefix + field] = data[1][field][position]
+            resolved.append(row)
+        if missing:
+            with self._lock:
+                self.misses += 1
+                # An airport we have never seen: check the table again on the next lookup
+                self._checked_at = 0.0
+        return resolved
+
+    def known(self, airport_ids):
+        """Whether each id in `airport_ids` is in the index"""
+        data = self._data
+        result = [data is not None and self._position(data, airport_id) is not None for airport_id in airport_ids]
+        if not all(result):
+            with self._lock:
+                self.misses += 1
+                self._checked_at = 0.0
+        return result
+
+    def column(self, airport_ids, field):
+        """`field` for each id in `airport_ids` (None where unknown)"""
+        data = self._data
+        if not data:
+            return [None] * len(airport_ids)
+        values = data[1][field]
+        result = []
+        missing = False
+        for airport_id in airport_ids:
+            position = self._position(data, airport_id)
+            if position is None:
+                missing = True
+                result.append(None)
+            else:
+                result.append(values[position])
+        if missing:
+            with self._lock:
+                self.misses += 1
+                self._checked_at = 0.0
+        return result
+
+    def stats(self):
+        data = self._data
+        return {
+            'airports': len(data[0]) if data else 0,
+            'loaded_at': self.loaded_at,
+            'loads': self.loads,
+            'misses': self.misses,
+            'check_interval': self.check_interval,
+            'row_count': self._signature[0] if self._signature else None,
+            'max_id': self._signature[1] if self._signature else None,
+            'updated_at': self._signature[2] if self._signature else None
+        }
@@ -4,15 +4,50 @@ Admin Panel for Airline Game
 Runs on port 9001
 """
 
-from flask import Flask, render_template, jsonify, request
-import mysql.connector
+from flask import Flask, Response, g, has_request_context, render_template, jsonify, request
 from datetime import datetime, timedelta
+import base64
+import json
+import math
 import os
-import psutil
+import threading
+import time
 import platform
+import zlib
+
+from account_links import AccountLinkGraph
+from activity import ActivityRollup
+from airports import AirportIndex
+from cache import ResultCache
+from db_pool import ConnectionPool, reset_statement_timeout, set_statement_timeout
+from db_router import (ReadRouter, collect_reads, note_read, start_collecting, stop_collecting,
+                       summarize_reads)
+from docker_monitor import DockerMonitor, DockerUnavailable
+from exports import EXPORTS, FORMATS, available_formats, stream_export
+from fanout import QueryFanout, fetch_all, fetch_value
+from fieldsets import FieldSet, columns_from_rows, shape_rows
+from fleet import FleetRegistry, UnknownHost
+from guard import CircuitBreaker, ConcurrencyLimiter, LastKnownGood, Overloaded, is_overload_error
+from metrics import MetricsRegistry
+from personality import PERSONALITIES, case_expression, check_rules, classify_rows
+from responses import ResponsePipeline
+from snapshots import CycleSnapshots, SnapshotStore
+from sql_trace import SqlTracer
+from stream import PanelBroadcaster, StreamFull
+from system_metrics import SAMPLE_FIELDS, SystemMetricsSampler, format_resources
+from timeseries import DEFAULT_TIERS, TimeSeriesStore, parse_tiers
 
 app = Flask(__name__)
 
+# Native JSON encoding, ETag/304 revalidation and gzip/brotli compression for
+# every complete GET response; set up first so its hook sees responses last
+response_pipeline = ResponsePipeline(
+    min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+    gzip_level=int(os.getenv('COMPRESS_GZIP_LEVEL', 6)),
+    brotli_quality=int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+)
+response_pipeline.init_app(app)
+
 # Database configuration from environment variables
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost').split(':')[0],
@@ -22,97 +57,531 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'ghEtmwBdnXYBQH4')
 }
 
+# Shared connection pool, sized for the dashboard's concurrent panel requests
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    size=int(os.getenv('DB_POOL_SIZE', 5)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+)
+
+# Optional read replica for analytic queries, e.g. DB_REPLICA_HOST=replica:3306.
+# Credentials and database name default to the primary's.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', '')
+replica_pool = None
+if DB_REPLICA_HOST:
+    replica_pool = ConnectionPool(
+        {
+            'host': DB_REPLICA_HOST.split(':')[0],
+            'port': int(DB_REPLICA_HOST.split(':')[1]) if ':' in DB_REPLICA_HOST else 3306,
+            'database': os.getenv('DB_REPLICA_NAME', DB_CONFIG['database']),
+            'user': os.getenv('DB_REPLICA_USER', DB_CONFIG['user']),
+            'password': os.getenv('DB_REPLICA_PASSWORD', DB_CONFIG['password'])
+        },
+        size=int(os.getenv('DB_REPLICA_POOL_SIZE', os.getenv('DB_POOL_SIZE', 5))),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    )
+database_pools = [pool for pool in (db_pool, replica_pool) if pool is not None]
+
+# Reads use the replica while it is under REPLICA_MAX_LAG seconds behind,
+# otherwise the primary
+read_router = ReadRouter(
+    db_pool, replica_pool,
+    max_lag=float(os.getenv('REPLICA_MAX_LAG', 30)),
+    check_interval=float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+)
+
+# Background system sampler; endpoints read its latest snapshot
+system_sampler = SystemMetricsSampler(
+    interval=float(os.getenv('METRICS_SAMPLE_INTERVAL', 1)),
+    history_size=int(os.getenv('METRICS_HISTORY_SIZE', 3600))
+)
+
+# Samples pushed by metrics agents on the other game hosts (system_metrics.py
+# run as a script); this panel's own samples are listed as LOCAL_HOST
+LOCAL_HOST = os.getenv('METRICS_LOCAL_HOST', 'admin-panel')
+FLEET_AGENT_TOKEN = os.getenv('FLEET_AGENT_TOKEN')
+# Largest agent request body, compressed or not
+FLEET_MAX_BODY_BYTES = int(os.getenv('FLEET_MAX_BODY_BYTES', 8 * 1024 * 1024))
+fleet = FleetRegistry(
+    os.getenv('FLEET_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fleet.sqlite3')),
+    history_size=int(os.getenv('FLEET_HISTORY_SIZE', 3600)),
+    heartbeat_timeout=float(os.getenv('FLEET_HEARTBEAT_TIMEOUT', 30))
+)
+
+# Opens after repeated database timeouts so the panel backs off and serves
+# last-known-good responses until a probe request succeeds again
+db_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5)),
+    window=float(os.getenv('BREAKER_WINDOW', 30)),
+    reset_timeout=float(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+)
+
 def get_db_connection():
-    """Get database connection"""
-    return mysql.connector.connect(**DB_CONFIG)
+    """Get a pooled primary database connection (close() returns it to the pool)"""
+    try:
+        return db_pool.get_connection()
+    except Exception as e:
+        if is_overload_error(e):
+            db_breaker.record_failure()
+        raise
+
+def get_read_connection(timeout=None):
+    """Get a pooled connection for analytic reads, from the replica when it is current"""
+    try:
+        return read_router.get_connection(timeout=timeout)
+    except Exception as e:
+        if is_overload_error(e):
+            db_breaker.record_failure()
+        raise
+
+# Independent queries of multi-query endpoints run concurrently, each on its
+# own pooled connection, and return partial results at the deadline
+query_fanout = QueryFanout(get_read_connection, workers=int(os.getenv('FANOUT_WORKERS', 4)))
+QUERY_DEADLINES = {
+    'stats': float(os.getenv('QUERY_DEADLINE_STATS', 5)),
+    'database_stats': float(os.getenv('QUERY_DEADLINE_DATABASE_STATS', 10)),
+    'bots_summary': float(os.getenv('QUERY_DEADLINE_BOTS_SUMMARY', 10))
+}
+
+# Airport names and codes for route endpoints, resolved in memory instead of
+# joining the airport table twice per route
+airport_index = AirportIndex(get_read_connection, check_interval=float(os.getenv('AIRPORT_INDEX_CHECK_INTERVAL', 300)))
+
+# Request and query instrumentation, exposed at /metrics
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'admin_http_requests_total', 'HTTP requests handled', ('route', 'method', 'status'))
+http_latency = metrics.histogram(
+    'admin_http_request_duration_seconds', 'HTTP request latency', ('route',))
+http_in_flight = metrics.gauge(
+    'admin_http_requests_in_flight', 'HTTP requests currently being handled', ('route',))
+db_queries = metrics.counter(
+    'admin_db_queries_total', 'MySQL queries issued', ('route',))
+db_query_seconds = metrics.counter(
+    'admin_db_query_seconds_total', 'Time spent in MySQL queries', ('route',))
+db_query_errors = metrics.counter(
+    'admin_db_query_errors_total', 'MySQL queries that raised', ('route',))
+
+def current_route():
+    """Route pattern of the current request, or 'background' outside one"""
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+    return 'background'
+
+def record_query_metrics(query, params, seconds, cursor, error):
+    """Pool query listener counting queries and query time per route"""
+    route = current_route()
+    db_queries.inc(route=route)
+    db_query_seconds.inc(seconds, route=route)
+    if error is not None:
+        db_query_errors.inc(route=route)
+
+for pool in database_pools:
+    pool.add_query_listener(record_query_metrics)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_route = current_route()
+    g.metrics_started = time.perf_counter()
+    http_in_flight.inc(route=g.metrics_route)
+
+@app.after_request
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    route = g.pop('metrics_route', None)
+    if route is None:
+        return
+    http_in_flight.dec(route=route)
+    http_latency.observe(time.perf_counter() - g.pop('metrics_started'), route=route)
+    http_requests.inc(route=route, method=request.method, status=g.pop('metrics_status', 500))
+
+# Per-request SQL tracing: Server-Timing on every response, the full trace
+# in JSON bodies in debug mode, and EXPLAIN plans for slow statements
+SQL_TRACE_IN_RESPONSE = os.getenv('SQL_TRACE_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+
+def run_explain(query, params, pool=None):
+    """Get the EXPLAIN FORMAT=JSON plan of a statement on a separate connection from `pool`"""
+    conn = pool.get_connection() if pool is not None else get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN FORMAT=JSON {query}", params)
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+sql_tracer = SqlTracer(
+    run_explain,
+    slow_threshold=float(os.getenv('SLOW_QUERY_MS', 500)) / 1000,
+    slow_log_size=int(os.getenv('SLOW_QUERY_LOG_SIZE', 200))
+)
+
+def query_trace_listener(pool):
+    """Pool query listener adding each query to the current request's trace"""
+    def record_query_trace(query, params, seconds, cursor, error):
+        trace = g.get('sql_trace') if has_request_context() else None
+        sql_tracer.record(trace, current_route(), query, params, seconds, cursor, error, pool=pool)
+    return record_query_trace
+
+for pool in database_pools:
+    pool.add_query_listener(query_trace_listener(pool))
+
+@app.before_request
+def start_sql_trace():
+    g.sql_trace = []
+    g.sql_trace_started = time.perf_counter()
+
+@app.after_request
+def attach_sql_trace(response):
+    trace = g.get('sql_trace')
+    if trace is None:
+        return response
+    response.headers['Server-Timing'] = sql_tracer.server_timing(
+        trace, time.perf_counter() - g.sql_trace_started)
+    
+    if (app.debug or SQL_TRACE_IN_RESPONSE) and response.is_json and not response.is_streamed:
+        data = response.get_json(silent=True)
+        if isinstance(data, dict):
+            data['_trace'] = trace
+            response.set_data(json.dumps(data, default=str))
+    return response
+
+def set_data_source_headers(response, source):
+    """Report which database served the data and how many seconds old it is"""
+    if source is None or 'X-Data-Source' in response.headers:
+        return
+    response.headers['X-Data-Source'] = source['source']
+    response.headers['X-Data-Staleness'] = f"{max(0.0, time.time() - source['as_of']):.1f}"
+
+@app.before_request
+def start_read_tracking():
+    g.db_reads, g.db_reads_token = start_collecting()
+
+@app.after_request
+def attach_read_source(response):
+    set_data_source_headers(response, summarize_reads(g.get('db_reads')))
+    return response
+
+@app.teardown_request
+def stop_read_tracking(error=None):
+    token = g.pop('db_reads_token', None)
+    if token is not None:
+        stop_collecting(token)
+
+# Database-backed endpoints: statement timeout (seconds, added to every SELECT
+# as MAX_EXECUTION_TIME) and how many may run at once (None: only the global cap)
+DB_STATEMENT_TIMEOUT = float(os.getenv('DB_STATEMENT_TIMEOUT', 10))
+ENDPOINT_LIMITS = {
+    'get_stats': (QUERY_DEADLINES['stats'], None),
+    'get_users': (DB_STATEMENT_TIMEOUT, None),
+    'get_user_details': (DB_STATEMENT_TIMEOUT, None),
+    'get_users_by_ip': (DB_STATEMENT_TIMEOUT, None),
+    'get_database_stats': (QUERY_DEADLINES['database_stats'], None),
+    'get_game_activity': (DB_STATEMENT_TIMEOUT, None),
+    'get_recent_logs': (DB_STATEMENT_TIMEOUT, 4),
+    'get_bots': (DB_STATEMENT_TIMEOUT, 2),
+    'get_bot_routes': (DB_STATEMENT_TIMEOUT, 2),
+    'get_bot_aircraft': (DB_STATEMENT_TIMEOUT, 2),
+    'get_bots_summary': (QUERY_DEADLINES['bots_summary'], None),
+    'get_current_snapshot': (DB_STATEMENT_TIMEOUT, 1)
+}
+
+db_limiter = ConcurrencyLimiter(
+    max_concurrent=int(os.getenv('DB_MAX_CONCURRENT_REQUESTS', 8)),
+    queue_timeout=float(os.getenv('DB_QUEUE_TIMEOUT', 2)),
+    endpoint_limits={endpoint: limit for endpoint, (_, limit) in ENDPOINT_LIMITS.items()}
+)
+last_known_good = LastKnownGood(max_bytes=int(os.getenv('LAST_KNOWN_GOOD_MAX_BYTES', 32 * 1024 * 1024)))
+
+def record_query_health(query, params, seconds, cursor, error):
+    """Pool query listener counting timeouts and lost connections towards the breaker"""
+    if error is not None and is_overload_error(error):
+        db_breaker.record_failure()
+
+def record_probe_query(query, params, seconds, cursor, error):
+    """Pool query listener noting whether the breaker probe's queries succeed"""
+    queries = g.get('db_probe_queries') if has_request_context() else None
+    if queries is not None:
+        queries.append(error is None)
+
+for pool in database_pools:
+    pool.add_query_listener(record_query_health)
+    pool.add_query_listener(record_probe_query)
+
+def degraded_response(reason):
+    """Last-known-good response for this URL marked stale, or 503 if there is none"""
+    cached = last_known_good.get(request.full_path)
+    if cached is None:
+        return jsonify({'error': f'Database temporarily unavailable: {reason}'}), 503, {'Retry-After': '10'}
+    
+    body, mimetype, stored_at = cached
+    age = time.time() - stored_at
+    data = app.json.loads(body)
+    if isinstance(data, dict):
+        data['stale'] = True
+        data['stale_reason'] = reason
+    response = jsonify(data)
+    response.headers['X-Degraded'] = reason
+    response.headers['X-Data-Source'] = 'last-known-good'
+    response.headers['X-Data-Staleness'] = f'{age:.1f}'
+    return response
+
+@app.before_request
+def guard_database_endpoint():
+    limits = ENDPOINT_LIMITS.get(request.endpoint)
+    if limits is None:
+        return None
+    allowed, probe = db_breaker.allow()
+    if not allowed:
+        return degraded_response('circuit breaker open')
+    try:
+        db_limiter.acquire(request.endpoint)
+    except Overloaded as e:
+        if probe:
+            # Shed before touching the database, so nothing was tested
+            db_breaker.abort_probe()
+        return degraded_response(f'overloaded: {e}')
+    g.db_guard = request.endpoint
+    g.db_breaker_probe = probe
+    if probe:
+        # Outcome of every query the probe runs, fanned-out ones included
+        g.db_probe_queries = []
+    g.db_statement_timeout_token = set_statement_timeout(limits[0])
+    return None
+
+@app.after_request
+def remember_good_response(response):
+    if (g.get('db_guard') and request.method == 'GET' and response.status_code == 200
+            and not response.is_streamed and response.is_json):
+        if not g.get('partial_result'):
+            last_known_good.put(request.full_path, response.get_data(), response.mimetype)
+    return response
+
+@app.teardown_request
+def release_database_guard(error=None):
+    endpoint = g.pop('db_guard', None)
+    if endpoint is None:
+        return
+    reset_statement_timeout(g.pop('db_statement_timeout_token'))
+    db_limiter.release(endpoint)
+    if g.pop('db_breaker_probe', False):
+        queries = g.pop('db_probe_queries', [])
+        # Only a probe that reached the database and got answers closes the
+        # breaker; one served from the cache proves nothing
+        if queries and all(queries):
+            db_breaker.end_probe()
+        else:
+            db_breaker.abort_probe()
+
+@app.route('/api/debug/slow-queries')
+def get_slow_queries():
+    """Get recent slow queries and their captured EXPLAIN plans"""
+    limit = min(int(request.args.get('limit', 50)), 500)
+    return jsonify(sql_tracer.slow_queries(limit))
+
+# Shared result cache for aggregate endpoints. TTLs are per cache key; once
+# expired, entries are served stale for CACHE_STALE_TTL more seconds while a
+# single background refresh recomputes them.
+CACHE_DEFAULT_TTL = float(os.getenv('CACHE_DEFAULT_TTL', 60))
+CACHE_STALE_TTL = float(os.getenv('CACHE_STALE_TTL', 300))
+CACHE_TTLS = {
+    'stats': float(os.getenv('CACHE_TTL_STATS', 60)),
+    'database_stats': float(os.getenv('CACHE_TTL_DATABASE_STATS', 60)),
+    'bots_summary': float(os.getenv('CACHE_TTL_BOTS_SUMMARY', 60)),
+    'users_count': float(os.getenv('CACHE_TTL_USERS_COUNT', 60))
+}
+
+result_cache = ResultCache()
+
+def read_current_cycle():
+    """Get the current simulation cycle"""
+    conn = get_read_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT cycle FROM cycle ORDER BY id DESC LIMIT 1")
+        row = cursor.fetchone()
+        return row['cycle'] if row else 0
+    finally:
+        cursor.close()
+        conn.close()
+
+# Drop cycle-scoped entries as soon as the simulation advances
+if os.getenv('CACHE_INVALIDATE_ON_CYCLE', 'true').lower() in ('1', 'true', 'yes'):
+    result_cache.watch('cycle', read_current_cycle,
+                       interval=float(os.getenv('CACHE_CYCLE_CHECK_INTERVAL', 10)))
+
+def cached_response(key, compute, tags=()):
+    """Serve compute() through the result cache as JSON, tagging the cache state"""
+    def compute_with_source():
+        # Keep the source and age of the data next to the cached value
+        with collect_reads() as reads:
+            value = compute()
+        return value, summarize_reads(reads)
+    
+    (value, source), state = result_cache.fetch(
+        key, compute_with_source,
+        ttl=CACHE_TTLS.get(key, CACHE_DEFAULT_TTL),
+        stale_ttl=CACHE_STALE_TTL,
+        tags=tags
+    )
+    if isinstance(value, dict) and value.get('partial'):
+        # Serve a partial result once but let the next request retry the queries
+        result_cache.invalidate(key)
+        g.partial_result = True
+    response = jsonify(value)
+    response.headers['X-Cache'] = state.upper()
+    set_data_source_headers(response, source)
+    return response
 
 @app.route('/')
 def index():
     """Main admin dashboard"""
     return render_template('dashboard.html')
 
-@app.route('/api/stats')
-def get_stats():
-    """Get overall statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
+def compute_stats():
+    """Compute overall user statistics"""
+    result = query_fanout.run({
         # Total users
-        cursor.execute("SELECT COUNT(*) as total FROM user")
-        total_users = cursor.fetchone()['total']
-        
+        'total_users': fetch_value("SELECT COUNT(*) as total FROM user"),
         # Active users (last 7 days)
-        cursor.execute("""
+        'active_users': fetch_value("""
             SELECT COUNT(*) as active 
             FROM user 
             WHERE last_active >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-        """)
-        active_users = cursor.fetchone()['active']
-        
+        """),
         # New users (last 30 days)
-        cursor.execute("""
+        'new_users': fetch_value("""
             SELECT COUNT(*) as new_users 
             FROM user 
             WHERE creation_time >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        """)
-        new_users = cursor.fetchone()['new_users']
-        
+        """),
         # User status breakdown
-        cursor.execute("""
+        'status_breakdown': fetch_all("""
             SELECT status, COUNT(*) as count 
             FROM user 
             GROUP BY status
-        """)
-        status_breakdown = cursor.fetchall()
-        
+        """),
         # Top users by level
-        cursor.execute("""
+        'top_users': fetch_all("""
             SELECT user_name, email, level, status, last_active
             FROM user
             ORDER BY level DESC
             LIMIT 10
         """)
-        top_users = cursor.fetchall()
-        
-        return jsonify({
-            'total_users': total_users,
-            'active_users': active_users,
-            'new_users': new_users,
-            'status_breakdown': status_breakdown,
-            'top_users': top_users
-        })
-    finally:
-        cursor.close()
-        conn.close()
+    }, deadline=QUERY_DEADLINES['stats'])
+    
+    return result.annotate({
+        'total_users': result.get('total_users', 0),
+        'active_users': result.get('active_users', 0),
+        'new_users': result.get('new_users', 0),
+        'status_breakdown': result.get('status_breakdown', []),
+        'top_users': result.get('top_users', [])
+    })
+
+@app.route('/api/stats')
+def get_stats():
+    """Get overall statistics"""
+    return cached_response('stats', compute_stats)
+
+def encode_user_cursor(user):
+    """Encode the (last_active, id) position of a user row as an opaque cursor"""
+    last_active = user['last_active'].isoformat() if user['last_active'] else None
+    raw = json.dumps([last_active, user['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_user_cursor(cursor):
+    """Decode a cursor produced by encode_user_cursor"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    last_active, user_id = json.loads(raw)
+    return (datetime.fromisoformat(last_active) if last_active else None), int(user_id)
+
+def build_user_search(search, match):
+    """WHERE fragments and params for a user name/email search"""
+    if not search:
+        return [], []
+    if match == 'prefix':
+        # Anchored patterns can use the user_name/email indexes
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        pattern = f'{escaped}%'
+    else:
+        pattern = f'%{search}%'
+    return ["(u.user_name LIKE %s OR u.email LIKE %s)"], [pattern, pattern]
+
+def count_users(search, match):
+    """Count users matching a search, cached briefly per search term"""
+    def compute():
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conditions, params = build_user_search(search, match)
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(f"SELECT COUNT(*) as total FROM user u {where_clause}", params)
+            return cursor.fetchone()['total']
+        finally:
+            cursor.close()
+            conn.close()
+    
+    total, state = result_cache.fetch(
+        f'users_count:{match}:{search}', compute,
+        ttl=CACHE_TTLS.get('users_count', CACHE_DEFAULT_TTL),
+        stale_ttl=CACHE_STALE_TTL
+    )
+    return total, state != 'miss'
 
 @app.route('/api/users')
 def get_users():
-    """Get all users with pagination"""
+    """Get all users with page or cursor pagination"""
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 50))
+    per_page = min(int(request.args.get('per_page', 50)), 500)
     search = request.args.get('search', '')
+    match = request.args.get('match', 'contains')
+    after = request.args.get('cursor')
+    keyset = after is not None or request.args.get('pagination') == 'cursor'
     
-    conn = get_db_connection()
+    started = time.perf_counter()
+    # Counted before checking out our connection: on a cache miss the count
+    # needs one of its own, and holding two at once can exhaust the pool
+    total, total_cached = count_users(search, match)
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        offset = (page - 1) * per_page
-        
-        # Build query
-        where_clause = ""
-        params = []
-        if search:
-            where_clause = "WHERE u.user_name LIKE %s OR u.email LIKE %s"
-            params = [f'%{search}%', f'%{search}%']
-        
-        # Get total count
-        count_query = f"SELECT COUNT(*) as total FROM user u {where_clause}"
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()['total']
-        
-        # Get users with airline info
-        query = f"""
+        conditions, params = build_user_search(search, match)
+        
+        if keyset and after:
+            try:
+                last_active, last_id = decode_user_cursor(after)
+            except (ValueError, TypeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Rows after (last_active, id) in last_active DESC, id DESC order;
+            # NULL last_active sorts last
+            if last_active is None:
+                conditions.append("(u.last_active IS NULL AND u.id < %s)")
+                params += [last_id]
+            else:
+                conditions.append(
+                    "(u.last_active < %s OR u.last_active IS NULL"
+                    " OR (u.last_active = %s AND u.id < %s))"
+                )
+                params += [last_active, last_active, last_id]
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if keyset:
+            limit_clause = "LIMIT %s"
+            params += [per_page + 1]
+        else:
+            limit_clause = "LIMIT %s OFFSET %s"
+            params += [per_page, (page - 1) * per_page]
+        
+        cursor.execute(f"""
             SELECT 
                 u.id,
                 u.user_name,
@@ -121,33 +590,48 @@ def get_users():
                 u.admin_status,
                 u.level,
                 u.creation_time,
-                u.last_active,
-                GROUP_CONCAT(a.name) as airlines
+                u.last_active
             FROM user u
-            LEFT JOIN user_airline ua ON u.user_name = ua.user_name
-            LEFT JOIN airline a ON ua.airline = a.id
             {where_clause}
-            GROUP BY u.id
-            ORDER BY u.last_active DESC
-            LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, params + [per_page, offset])
+            ORDER BY u.last_active DESC, u.id DESC
+            {limit_clause}
+        """, params)
         users = cursor.fetchall()
         
-        # Convert datetime to string
+        has_more = keyset and len(users) > per_page
+        users = users[:per_page]
+        next_cursor = encode_user_cursor(users[-1]) if has_more else None
+        
+        # Airlines for this page only, instead of joining them into the paged scan
+        airlines = {}
+        if users:
+            names = [user['user_name'] for user in users]
+            cursor.execute(f"""
+                SELECT ua.user_name, GROUP_CONCAT(a.name) as airlines
+                FROM user_airline ua
+                JOIN airline a ON ua.airline = a.id
+                WHERE ua.user_name IN ({', '.join(['%s'] * len(names))})
+                GROUP BY ua.user_name
+            """, names)
+            airlines = {row['user_name']: row['airlines'] for row in cursor.fetchall()}
+        
         for user in users:
-            if user['creation_time']:
-                user['creation_time'] = user['creation_time'].isoformat()
-            if user['last_active']:
-                user['last_active'] = user['last_active'].isoformat()
+            user['airlines'] = airlines.get(user['user_name'])
         
-        return jsonify({
+        result = {
             'users': users,
             'total': total,
-            'page': page,
+            'total_cached': total_cached,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        })
+            'total_pages': (total + per_page - 1) // per_page,
+            'query_time_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        if keyset:
+            result['next_cursor'] = next_cursor
+            result['has_more'] = has_more
+        else:
+            result['page'] = page
+        return jsonify(result)
     finally:
         cursor.close()
         conn.close()
@@ -155,7 +639,7 @@ def get_users():
 @app.route('/api/users/<int:user_id>')
 def get_user_details(user_id):
     """Get detailed user information including IP addresses"""
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -176,12 +660,6 @@ def get_user_details(user_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Convert datetime to string
-        if user['creation_time']:
-            user['creation_time'] = user['creation_time'].isoformat()
-        if user['last_active']:
-            user['last_active'] = user['last_active'].isoformat()
-        
         # Get IP addresses
         cursor.execute("""
             SELECT ip, occurrence, last_update
@@ -192,10 +670,6 @@ def get_user_details(user_id):
         """, (user_id,))
         ips = cursor.fetchall()
         
-        for ip in ips:
-            if ip['last_update']:
-                ip['last_update'] = ip['last_update'].isoformat()
-        
         # Get user modifiers
         cursor.execute("""
             SELECT modifier_name, creation
@@ -214,10 +688,6 @@ def get_user_details(user_id):
         """, (user_id,))
         uuids = cursor.fetchall()
         
-        for uuid in uuids:
-            if uuid['last_update']:
-                uuid['last_update'] = uuid['last_update'].isoformat()
-        
         return jsonify({
             'user': user,
             'ips': ips,
@@ -231,7 +701,7 @@ def get_user_details(user_id):
 @app.route('/api/ip/<ip_address>')
 def get_users_by_ip(ip_address):
     """Get all users associated with an IP address"""
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -255,192 +725,391 @@ def get_users_by_ip(ip_address):
         """, (ip_address,))
         users = cursor.fetchall()
         
-        for user in users:
-            if user['last_update']:
-                user['last_update'] = user['last_update'].isoformat()
-        
         return jsonify({'users': users, 'ip': ip_address})
     finally:
         cursor.close()
         conn.close()
 
+# Alt-account clusters over shared IPs/UUIDs, refreshed in the background
+ACCOUNT_LINKS_REFRESH_INTERVAL = float(os.getenv('ACCOUNT_LINKS_REFRESH_INTERVAL', 300))
+account_links = AccountLinkGraph(
+    get_read_connection,
+    cache_path=os.getenv('ACCOUNT_LINKS_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'account_links.json')),
+    max_identifier_users=int(os.getenv('ACCOUNT_LINKS_MAX_IDENTIFIER_USERS', 25))
+)
+
+def get_account_links():
+    """Account link graph, starting its refresh job on first use"""
+    account_links.start(ACCOUNT_LINKS_REFRESH_INTERVAL)
+    return account_links
+
+@app.route('/api/users/<int:user_id>/cluster')
+def get_user_cluster(user_id):
+    """Get every account linked to a user through shared IPs or UUIDs"""
+    graph = get_account_links()
+    if not graph.ready:
+        return jsonify({'error': 'Account link graph is still building'}), 503
+    
+    cluster = graph.cluster_for_user(user_id)
+    if cluster is None:
+        cluster = {'size': 1, 'users': [{'id': user_id}], 'shared_ips': [], 'shared_uuids': [], 'score': 0}
+    return jsonify({'user_id': user_id, 'cluster': cluster, 'refreshed_at': graph.refreshed_at})
+
+@app.route('/api/clusters/suspicious')
+def get_suspicious_clusters():
+    """Get the top-N most suspicious multi-account clusters"""
+    limit = min(int(request.args.get('limit', 20)), 200)
+    min_size = int(request.args.get('min_size', 2))
+    
+    graph = get_account_links()
+    if not graph.ready:
+        return jsonify({'error': 'Account link graph is still building'}), 503
+    
+    return jsonify({
+        'clusters': graph.suspicious_clusters(limit=limit, min_size=min_size),
+        'refreshed_at': graph.refreshed_at
+    })
+
+@app.route('/api/clusters/status')
+def get_cluster_status():
+    """Get account link graph size and refresh state"""
+    return jsonify(get_account_links().stats())
+
+@app.route('/api/airports/index')
+def get_airport_index_status():
+    """Get the in-memory airport index size and refresh state"""
+    return jsonify(airport_index.stats())
+
+# Daily active users and signup cohorts, rolled up from the user table's
+# last_active into a local SQLite file by a background job
+ACTIVITY_ROLLUP_ENABLED = os.getenv('ACTIVITY_ROLLUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+activity_rollup = ActivityRollup(
+    os.getenv('ACTIVITY_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'activity.sqlite3')),
+    get_read_connection,
+    interval=float(os.getenv('ACTIVITY_ROLLUP_INTERVAL', 300)),
+    batch_size=int(os.getenv('ACTIVITY_ROLLUP_BATCH_SIZE', 5000)),
+    backfill_days=int(os.getenv('ACTIVITY_BACKFILL_DAYS', 30)),
+    raw_retention_days=int(os.getenv('ACTIVITY_RAW_RETENTION_DAYS', 60))
+)
+
+@app.before_request
+def start_activity_rollup():
+    # Started with the first request rather than at import, so the job
+    # reads through the database settings the app ends up configured with
+    if ACTIVITY_ROLLUP_ENABLED:
+        activity_rollup.start()
+
 @app.route('/api/activity')
 def get_activity():
-    """Get recent user activity"""
+    """Get daily active users and signups for the last N days from the activity rollup"""
     days = int(request.args.get('days', 7))
-    
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT 
-                DATE(last_active) as date,
-                COUNT(DISTINCT id) as active_users
-            FROM user
-            WHERE last_active >= DATE_SUB(NOW(), INTERVAL %s DAY)
-            GROUP BY DATE(last_active)
-            ORDER BY date DESC
-        """, (days,))
-        activity = cursor.fetchall()
-        
-        for row in activity:
-            if row['date']:
-                row['date'] = row['date'].isoformat()
-        
-        return jsonify({'activity': activity})
-    finally:
-        cursor.close()
-        conn.close()
+    rows = activity_rollup.daily(days)
+    return jsonify({
+        'activity': [
+            {'date': row['date'], 'active_users': row['dau'], 'new_users': row['new_users']}
+            for row in reversed(rows)
+        ]
+    })
+
+@app.route('/api/activity/active-users')
+def get_active_users():
+    """Get DAU, WAU and MAU curves with daily signups"""
+    days = min(int(request.args.get('days', 90)), 3650)
+    rows = activity_rollup.daily(days)
+    return jsonify({
+        'dates': [row['date'] for row in rows],
+        'series': {key: [row[key] for row in rows] for key in ('dau', 'wau', 'mau', 'new_users')}
+    })
+
+@app.route('/api/activity/retention')
+def get_activity_retention():
+    """Get the signup cohort retention matrix"""
+    cohorts = min(int(request.args.get('cohorts', 30)), 365)
+    days = min(int(request.args.get('days', 30)), 365)
+    return jsonify({'days': days, 'cohorts': activity_rollup.retention(cohorts, days)})
+
+@app.route('/api/activity/rollup')
+def get_activity_rollup_status():
+    """Get the activity rollup watermark, last run and table sizes"""
+    return jsonify(activity_rollup.stats())
+
+def host_samples(limit):
+    """(samples, interval) for the `host` argument; None for an unknown host"""
+    host = request.args.get('host')
+    if not host or host == LOCAL_HOST:
+        return system_sampler.history(min(limit, system_sampler.history_size)), system_sampler.interval
+    status = fleet.host(host)
+    if status is None:
+        return None
+    return fleet.history(host, min(limit, fleet.history_size)), status['info'].get('interval')
 
 @app.route('/api/server/resources')
 def get_server_resources():
-    """Get server resource usage (CPU, RAM, Disk)"""
+    """Get server resource usage (CPU, RAM, Disk) from the latest sample of this or an agent host"""
+    host = request.args.get('host')
     try:
-        # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
-        cpu_count = psutil.cpu_count()
-        cpu_freq = psutil.cpu_freq()
-        
-        # Memory usage
-        memory = psutil.virtual_memory()
-        memory_total = memory.total / (1024 ** 3)  # GB
-        memory_used = memory.used / (1024 ** 3)    # GB
-        memory_percent = memory.percent
-        
-        # Disk usage
-        disk = psutil.disk_usage('/')
-        disk_total = disk.total / (1024 ** 3)  # GB
-        disk_used = disk.used / (1024 ** 3)    # GB
-        disk_percent = disk.percent
-        
-        # Swap memory
-        swap = psutil.swap_memory()
-        swap_total = swap.total / (1024 ** 3)  # GB
-        swap_used = swap.used / (1024 ** 3)    # GB
-        swap_percent = swap.percent
-        
-        # System uptime
-        boot_time = datetime.fromtimestamp(psutil.boot_time())
-        uptime = datetime.now() - boot_time
-        uptime_str = str(uptime).split('.')[0]  # Remove microseconds
-        
-        # Network info
-        net_io = psutil.net_io_counters()
-        bytes_sent = net_io.bytes_sent / (1024 ** 3)  # GB
-        bytes_recv = net_io.bytes_recv / (1024 ** 3)  # GB
-        
-        # Process count
-        process_count = len(psutil.pids())
-        
-        return jsonify({
-            'cpu': {
-                'percent': round(cpu_percent, 2),
-                'count': cpu_count,
-                'frequency': round(cpu_freq.current, 2) if cpu_freq else 0
-            },
-            'memory': {
-                'total': round(memory_total, 2),
-                'used': round(memory_used, 2),
-                'percent': round(memory_percent, 2)
-            },
-            'disk': {
-                'total': round(disk_total, 2),
-                'used': round(disk_used, 2),
-                'percent': round(disk_percent, 2)
-            },
-            'swap': {
-                'total': round(swap_total, 2),
-                'used': round(swap_used, 2),
-                'percent': round(swap_percent, 2)
-            },
-            'network': {
-                'sent': round(bytes_sent, 2),
-                'received': round(bytes_recv, 2)
-            },
-            'system': {
-                'uptime': uptime_str,
-                'boot_time': boot_time.isoformat(),
-                'process_count': process_count,
-                'platform': platform.system(),
-                'platform_release': platform.release()
-            }
-        })
+        if not host or host == LOCAL_HOST:
+            resources = format_resources(system_sampler.latest())
+            resources['system']['platform'] = platform.system()
+            resources['system']['platform_release'] = platform.release()
+            resources['host'] = LOCAL_HOST
+            resources['status'] = 'up'
+            return jsonify(resources)
+        
+        status = fleet.host(host)
+        if status is None:
+            return jsonify({'error': f'Unknown host: {host}'}), 404
+        sample = fleet.latest(host)
+        if sample is None:
+            return jsonify({'error': f'No samples from {host} yet', 'status': status['status']}), 404
+        resources = format_resources(sample)
+        resources['system']['platform'] = status['info'].get('platform')
+        resources['system']['platform_release'] = status['info'].get('platform_release')
+        resources['host'] = host
+        resources['status'] = status['status']
+        resources['last_seen'] = status['last_seen']
+        return jsonify(resources)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/database/stats')
-def get_database_stats():
-    """Get database statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+@app.route('/api/server/resources/history')
+def get_server_resources_history():
+    """Get the last N resource samples of this or an agent host for trend charts"""
+    found = host_samples(int(request.args.get('limit', 60)))
+    if found is None:
+        return jsonify({'error': f"Unknown host: {request.args.get('host')}"}), 404
+    samples, interval = found
+    return jsonify({
+        'host': request.args.get('host') or LOCAL_HOST,
+        'interval': interval,
+        'samples': [
+            {
+                'timestamp': datetime.fromtimestamp(sample['timestamp']).isoformat(),
+                'cpu_percent': round(sample['cpu_percent'], 2),
+                'memory_percent': round(sample['memory_percent'], 2),
+                'swap_percent': round(sample['swap_percent'], 2),
+                'disk_percent': round(sample['disk_percent'], 2),
+                'net_sent_rate': round(sample['net_sent_rate'], 2),
+                'net_recv_rate': round(sample['net_recv_rate'], 2),
+                'process_count': sample['process_count']
+            }
+            for sample in samples
+        ]
+    })
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def sample_number(sample, key):
+    """A sample value if it is a finite number, else None"""
+    value = sample.get(key)
+    return value if is_number(value) else None
+
+def fleet_summary(sample):
+    if sample is None:
+        return None
+    # Samples stored before pushes were validated may hold anything
+    timestamp = sample_number(sample, 'timestamp')
+    summary = {'sampled_at': datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None}
+    for key in ('cpu_percent', 'memory_percent', 'disk_percent', 'swap_percent', 'net_sent_rate', 'net_recv_rate'):
+        value = sample_number(sample, key)
+        summary[key] = round(value, 2) if value is not None else None
+    return summary
+
+@app.route('/api/fleet')
+def get_fleet():
+    """Get every monitored host with its status and latest resource usage"""
+    hosts = [{
+        'host': LOCAL_HOST,
+        'status': 'up',
+        'local': True,
+        'latest': fleet_summary(system_sampler.latest())
+    }]
+    for status in fleet.hosts():
+        status['local'] = False
+        status['latest'] = fleet_summary(status['latest'])
+        hosts.append(status)
+    return jsonify({
+        'hosts': hosts,
+        'up': sum(1 for host in hosts if host['status'] == 'up'),
+        'down': sum(1 for host in hosts if host['status'] == 'down')
+    })
+
+def check_agent_token():
+    if FLEET_AGENT_TOKEN and request.headers.get('Authorization') != f'Bearer {FLEET_AGENT_TOKEN}':
+        raise PermissionError('Invalid agent token')
+
+def gunzip_limited(body, limit, chunk_size=64 * 1024):
+    """Decompress a gzip body a chunk at a time; ValueError once it passes `limit` bytes"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = []
+    size = 0
+    while True:
+        chunk = decompressor.decompress(body, chunk_size)
+        body = decompressor.unconsumed_tail
+        if not chunk and not body:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise ValueError(f'body is larger than {limit} bytes uncompressed')
+        chunks.append(chunk)
+    if not decompressor.eof:
+        raise ValueError('truncated gzip body')
+    return b''.join(chunks)
+
+def read_agent_payload():
+    """Agent request body as a dict; agents send gzip-compressed JSON"""
+    check_agent_token()
+    if (request.content_length or 0) > FLEET_MAX_BODY_BYTES:
+        raise ValueError(f'body is larger than {FLEET_MAX_BODY_BYTES} bytes')
+    body = request.get_data()
+    if request.headers.get('Content-Encoding') == 'gzip':
+        body = gunzip_limited(body, FLEET_MAX_BODY_BYTES)
+    payload = json.loads(body)
+    if not isinstance(payload, dict) or not payload.get('host'):
+        raise ValueError('host is required')
+    return payload
+
+def read_agent_samples(fields, rows):
+    """Sample dicts from a push's field names and value rows; ValueError if malformed"""
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        raise ValueError('fields must be a list of names')
+    missing = set(SAMPLE_FIELDS) - set(fields)
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(sorted(missing))}")
+    if not isinstance(rows, list):
+        raise ValueError('samples must be a list of rows')
+    samples = []
+    for index, values in enumerate(rows):
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError(f'sample {index} does not have {len(fields)} values')
+        sample = dict(zip(fields, values))
+        bad = [field for field in SAMPLE_FIELDS if not is_number(sample[field])]
+        if bad:
+            raise ValueError(f"sample {index} has non-numeric values for: {', '.join(bad)}")
+        samples.append(sample)
+    return samples
+
+@app.route('/api/fleet/register', methods=['POST'])
+def register_fleet_host():
+    """Register a metrics agent host (agents call this on start)"""
     try:
-        stats = {}
-        
+        payload = read_agent_payload()
+        if payload['host'] == LOCAL_HOST:
+            raise ValueError(f'{LOCAL_HOST} is this panel\'s own name')
+        fleet.register(payload['host'], payload.get('info'), float(payload.get('push_interval', 10)))
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except (ValueError, TypeError, OSError) as e:
+        return jsonify({'error': f'Invalid registration: {e}'}), 400
+    return jsonify({'host': payload['host'], 'registered': True})
+
+@app.route('/api/fleet/push', methods=['POST'])
+def push_fleet_samples():
+    """Store a batch of samples from a registered metrics agent"""
+    try:
+        payload = read_agent_payload()
+        samples = read_agent_samples(payload['fields'], payload['samples'])
+        stored = fleet.push(payload['host'], samples)
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except UnknownHost as e:
+        return jsonify({'error': f'Unknown host: {e}; register first'}), 404
+    except (KeyError, ValueError, TypeError, OSError) as e:
+        return jsonify({'error': f'Invalid push: {e}'}), 400
+    return jsonify({'host': payload['host'], 'stored': stored})
+
+@app.route('/api/fleet/<host>', methods=['DELETE'])
+def forget_fleet_host(host):
+    """Stop listing a decommissioned host and drop its samples"""
+    try:
+        check_agent_token()
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    if not fleet.forget(host):
+        return jsonify({'error': f'Unknown host: {host}'}), 404
+    return jsonify({'host': host, 'forgotten': True})
+
+@app.route('/api/database/pool')
+def get_database_pool():
+    """Get connection pool metrics"""
+    return jsonify(dict(db_pool.stats(), fanout=query_fanout.stats()))
+
+@app.route('/api/database/guard')
+def get_database_guard():
+    """Get circuit breaker, concurrency limiter and last-known-good cache state"""
+    return jsonify({
+        'statement_timeout': DB_STATEMENT_TIMEOUT,
+        'breaker': db_breaker.stats(),
+        'limiter': db_limiter.stats(),
+        'last_known_good': last_known_good.stats()
+    })
+
+@app.route('/api/database/replica')
+def get_database_replica():
+    """Get read replica lag, routing decision and replica pool metrics"""
+    status = read_router.status()
+    status['pool'] = replica_pool.stats() if replica_pool is not None else None
+    return jsonify(status)
+
+def compute_database_stats():
+    """Compute database statistics"""
+    result = query_fanout.run({
         # Total airlines
-        cursor.execute("SELECT COUNT(*) as count FROM airline")
-        stats['total_airlines'] = cursor.fetchone()['count']
-        
+        'total_airlines': fetch_value("SELECT COUNT(*) as count FROM airline"),
         # Active airlines (with balance > 0)
-        cursor.execute("SELECT COUNT(*) as count FROM airline WHERE balance > 0")
-        stats['active_airlines'] = cursor.fetchone()['count']
-        
+        'active_airlines': fetch_value("SELECT COUNT(*) as count FROM airline WHERE balance > 0"),
         # Bot airlines
-        cursor.execute("SELECT COUNT(*) as count FROM airline WHERE airline_type = 2")
-        stats['bot_airlines'] = cursor.fetchone()['count']
-        
+        'bot_airlines': fetch_value("SELECT COUNT(*) as count FROM airline WHERE airline_type = 2"),
         # Total airports
-        cursor.execute("SELECT COUNT(*) as count FROM airport")
-        stats['total_airports'] = cursor.fetchone()['count']
-        
+        'total_airports': fetch_value("SELECT COUNT(*) as count FROM airport"),
         # Total links/routes
-        cursor.execute("SELECT COUNT(*) as count FROM link")
-        stats['total_links'] = cursor.fetchone()['count']
-        
+        'total_links': fetch_value("SELECT COUNT(*) as count FROM link"),
         # Total airplanes
-        cursor.execute("SELECT COUNT(*) as count FROM airplane")
-        stats['total_airplanes'] = cursor.fetchone()['count']
-        
+        'total_airplanes': fetch_value("SELECT COUNT(*) as count FROM airplane"),
         # In-flight airplanes
-        cursor.execute("SELECT COUNT(*) as count FROM airplane WHERE is_sold = 0")
-        stats['active_airplanes'] = cursor.fetchone()['count']
-        
+        'active_airplanes': fetch_value("SELECT COUNT(*) as count FROM airplane WHERE is_sold = 0"),
         # Database size
-        cursor.execute("""
+        'database_size_mb': fetch_value("""
             SELECT 
                 ROUND(SUM(data_length + index_length) / 1024 / 1024, 2) as size_mb
             FROM information_schema.TABLES
             WHERE table_schema = %s
-        """, (DB_CONFIG['database'],))
-        result = cursor.fetchone()
-        stats['database_size_mb'] = result['size_mb'] if result['size_mb'] else 0
-        
+        """, (DB_CONFIG['database'],)),
         # Current game cycle
-        cursor.execute("SELECT cycle FROM cycle ORDER BY id DESC LIMIT 1")
-        cycle_result = cursor.fetchone()
-        stats['current_cycle'] = cycle_result['cycle'] if cycle_result else 0
-        
+        'current_cycle': fetch_value("SELECT cycle FROM cycle ORDER BY id DESC LIMIT 1"),
         # Total passenger count (last cycle)
-        cursor.execute("""
+        'last_cycle_passengers': fetch_value("""
             SELECT SUM(passenger_count) as total 
             FROM link_consumption 
             WHERE cycle = (SELECT MAX(cycle) FROM link_consumption)
         """)
-        passenger_result = cursor.fetchone()
-        stats['last_cycle_passengers'] = passenger_result['total'] if passenger_result['total'] else 0
-        
-        return jsonify(stats)
+    }, deadline=QUERY_DEADLINES['database_stats'])
+    
+    stats = {name: result.get(name, 0) for name in (
+        'total_airlines', 'active_airlines', 'bot_airlines', 'total_airports', 'total_links',
+        'total_airplanes', 'active_airplanes', 'database_size_mb', 'current_cycle',
+        'last_cycle_passengers'
+    )}
+    return result.annotate(stats)
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Get result cache hit/miss counters"""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/database/stats')
+def get_database_stats():
+    """Get database statistics"""
+    try:
+        return cached_response('database_stats', snapshot_section('database_stats'), tags=('cycle',))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
-@app.route('/api/game/activity')
-def get_game_activity():
-    """Get recent game activity"""
-    conn = get_db_connection()
+def compute_game_activity():
+    """Compute recent game activity"""
+    airport_index.refresh()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -477,96 +1146,250 @@ def get_game_activity():
             ORDER BY lc.passenger_count DESC
             LIMIT 10
         """)
-        busiest_routes = cursor.fetchall()
+        busiest_routes = airport_index.resolve(cursor.fetchall())
         
-        return jsonify({
+        return {
             'recent_airlines': recent_airlines,
             'top_airlines': top_airlines,
             'busiest_routes': busiest_routes
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        }
     finally:
         cursor.close()
         conn.close()
 
+@app.route('/api/game/activity')
+def get_game_activity():
+    """Get recent game activity"""
+    try:
+        return cached_response('game_activity', snapshot_section('game_activity'), tags=('cycle',))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Container list and per-container stats from the Docker Engine API
+docker_monitor = DockerMonitor(
+    socket_path=os.getenv('DOCKER_SOCKET', '/var/run/docker.sock'),
+    stats_interval=float(os.getenv('DOCKER_STATS_INTERVAL', 10)),
+    history_size=int(os.getenv('DOCKER_STATS_HISTORY', 360)),
+    containers=[name for name in os.getenv('DOCKER_STATS_CONTAINERS', '').split(',') if name]
+)
+
 @app.route('/api/containers')
 def get_containers():
-    """Get Docker container status"""
+    """Get Docker container status and latest resource stats"""
     try:
-        import subprocess
-        import json
-        
-        # Run docker ps command
-        result = subprocess.run(
-            ['docker', 'ps', '--format', '{{json .}}'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode != 0:
-            return jsonify({'error': 'Docker not available or no permissions'}), 500
-        
-        containers = []
-        for line in result.stdout.strip().split('\n'):
-            if line:
-                try:
-                    container = json.loads(line)
-                    containers.append({
-                        'name': container.get('Names', 'Unknown'),
-                        'image': container.get('Image', 'Unknown'),
-                        'status': container.get('Status', 'Unknown'),
-                        'ports': container.get('Ports', ''),
-                        'id': container.get('ID', '')[:12]
-                    })
-                except json.JSONDecodeError:
-                    continue
-        
-        return jsonify({'containers': containers})
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'Docker command timeout'}), 500
-    except FileNotFoundError:
-        return jsonify({'error': 'Docker not installed'}), 500
+        return jsonify({'containers': docker_monitor.containers()})
+    except DockerUnavailable as e:
+        return jsonify({'error': f'Docker not available or no permissions: {e}'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/containers/<name>/stats')
+def get_container_stats(name):
+    """Get recent resource samples for one container"""
+    limit = int(request.args.get('limit', 60))
+    docker_monitor.start()
+    history = docker_monitor.history(name, limit)
+    if history is None:
+        return jsonify({'error': 'Container not found'}), 404
+    return jsonify({'container': name, 'interval': docker_monitor.stats_interval, 'samples': history})
+
+@app.route('/api/containers/status')
+def get_docker_monitor_status():
+    """Get Docker monitor connection state and counters"""
+    return jsonify(docker_monitor.status())
+
+LOG_PAGE_MAX = int(os.getenv('LOG_PAGE_MAX', 500))
+LOG_EXPORT_MAX_ROWS = int(os.getenv('LOG_EXPORT_MAX_ROWS', 1000000))
+LOG_EXPORT_BATCH_SIZE = int(os.getenv('LOG_EXPORT_BATCH_SIZE', 5000))
+
+def log_table_exists():
+    """Whether the game database has a log table, cached for LOG_TABLE_CHECK_TTL seconds"""
+    def compute():
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) as count
+                FROM information_schema.TABLES
+                WHERE table_schema = %s AND table_name = 'log'
+            """, (DB_CONFIG['database'],))
+            return cursor.fetchone()['count'] > 0
+        finally:
+            cursor.close()
+            conn.close()
+    
+    exists, _ = result_cache.fetch(
+        'log_table_exists', compute,
+        ttl=float(os.getenv('LOG_TABLE_CHECK_TTL', 600))
+    )
+    return exists
+
+def int_arg(args, name, default=None):
+    """Integer query argument, or `default` when absent; ValueError names the argument"""
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer, got {value!r}') from None
+
+def build_log_filters(args):
+    """WHERE fragments and params for the airline/category/id-range log filters; ValueError on bad ids"""
+    conditions = []
+    params = []
+    for name, condition in (('airline', "airline = %s"), ('from_id', "id >= %s"), ('to_id', "id <= %s")):
+        value = int_arg(args, name)
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    if args.get('category'):
+        conditions.append("category = %s")
+        params.append(args['category'])
+    return conditions, params
+
 @app.route('/api/logs/recent')
 def get_recent_logs():
-    """Get recent system/application logs"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    """Get recent system/application logs, or only rows newer than since_id"""
+    try:
+        limit = min(int_arg(request.args, 'limit', 50), LOG_PAGE_MAX)
+        since_id = int_arg(request.args, 'since_id')
+        conditions, params = build_log_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}', 'logs': []}), 400
     
     try:
-        # Check if log table exists
-        cursor.execute("""
-            SELECT COUNT(*) as count
-            FROM information_schema.TABLES
-            WHERE table_schema = %s AND table_name = 'log'
-        """, (DB_CONFIG['database'],))
-        
-        if cursor.fetchone()['count'] == 0:
+        if not log_table_exists():
             return jsonify({'logs': [], 'message': 'Log table not found'})
         
-        # Get recent logs
-        cursor.execute("""
-            SELECT id, airline, category, log_time, message
-            FROM log
-            ORDER BY id DESC
-            LIMIT 50
-        """)
-        logs = cursor.fetchall()
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        try:
+            if since_id is not None:
+                # Oldest new rows first so a burst larger than `limit` is
+                # picked up over several polls instead of skipped
+                conditions.append("id > %s")
+                params.append(since_id)
+                order = "ASC"
+            else:
+                order = "DESC"
+            
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(f"""
+                SELECT id, airline, category, log_time, message
+                FROM log
+                {where_clause}
+                ORDER BY id {order}
+                LIMIT %s
+            """, params + [limit + 1])
+            logs = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
         
-        for log in logs:
-            if log['log_time']:
-                log['log_time'] = log['log_time'].isoformat()
+        has_more = len(logs) > limit
+        logs = logs[:limit]
+        if order == "ASC":
+            logs.reverse()
         
-        return jsonify({'logs': logs})
+        last_id = logs[0]['id'] if logs else since_id
+        return jsonify({'logs': logs, 'last_id': last_id, 'has_more': has_more})
     except Exception as e:
         return jsonify({'error': str(e), 'logs': []}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+@app.route('/api/logs/export')
+def export_logs():
+    """Stream a log range as chunked NDJSON without building it in memory"""
+    try:
+        max_rows = min(int_arg(request.args, 'max_rows', LOG_EXPORT_MAX_ROWS), LOG_EXPORT_MAX_ROWS)
+        conditions, params = build_log_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    
+    if not log_table_exists():
+        return jsonify({'error': 'Log table not found'}), 404
+    
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    def generate():
+        conn = get_read_connection()
+        # Unbuffered cursor: rows are pulled from the server batch by batch
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        finished = False
+        try:
+            cursor.execute(f"""
+                SELECT id, airline, category, log_time, message
+                FROM log
+                {where_clause}
+                ORDER BY id
+                LIMIT %s
+            """, params + [max_rows])
+            while True:
+                rows = cursor.fetchmany(LOG_EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                lines = []
+                for row in rows:
+                    if row['log_time']:
+                        row['log_time'] = row['log_time'].isoformat()
+                    lines.append(json.dumps(row))
+                yield '\n'.join(lines) + '\n'
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+                conn.close()
+            else:
+                # The client went away mid-stream; don't drain the rest of the result
+                conn.invalidate()
+    
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=logs.ndjson'})
+
+EXPORT_MAX_ROWS = int(os.getenv('EXPORT_MAX_ROWS', 5000000))
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+# Each running export holds one read connection for its whole duration
+export_slots = threading.BoundedSemaphore(int(os.getenv('EXPORT_MAX_CONCURRENT', 2)))
+
+@app.route('/api/export')
+def list_exports():
+    """Get the exportable datasets, their filters and the available formats"""
+    return jsonify({
+        'datasets': {
+            name: {'columns': [column for column, _ in spec['columns']], 'filters': sorted(spec['filters'])}
+            for name, spec in EXPORTS.items()
+        },
+        'formats': available_formats(),
+        'max_rows': EXPORT_MAX_ROWS
+    })
+
+@app.route('/api/export/<dataset>')
+def export_dataset(dataset):
+    """Stream a whole table (or a filtered slice) as CSV, NDJSON, Arrow or Parquet"""
+    fmt = request.args.get('format', 'csv')
+    if dataset not in EXPORTS:
+        return jsonify({'error': 'Unknown dataset'}), 404
+    if fmt not in available_formats():
+        return jsonify({'error': f'Unsupported format: {fmt}', 'formats': available_formats()}), 400
+    
+    try:
+        max_rows = min(int(request.args.get('max_rows', EXPORT_MAX_ROWS)), EXPORT_MAX_ROWS)
+        chunks = stream_export(get_read_connection, dataset, request.args, max_rows, EXPORT_BATCH_SIZE, fmt)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    
+    if not export_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many exports running, try again later'}), 503, {'Retry-After': '30'}
+    
+    mimetype, extension, _, _ = FORMATS[fmt]
+    response = Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={dataset}.{extension}',
+        'X-Export-Row-Cap': str(max_rows)
+    })
+    # Runs when the response is finished or the client disconnects
+    response.call_on_close(export_slots.release)
+    return response
 
 @app.route('/api/alerts')
 def get_alerts():
@@ -574,8 +1397,10 @@ def get_alerts():
     alerts = []
     
     try:
+        snapshot = system_sampler.latest()
+        
         # Check CPU usage
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = snapshot['cpu_percent']
         if cpu_percent > 90:
             alerts.append({
                 'level': 'critical',
@@ -590,39 +1415,38 @@ def get_alerts():
             })
         
         # Check memory usage
-        memory = psutil.virtual_memory()
-        if memory.percent > 90:
+        memory_percent = snapshot['memory_percent']
+        if memory_percent > 90:
             alerts.append({
                 'level': 'critical',
-                'message': f'Memory usage is critically high: {memory.percent}%',
+                'message': f'Memory usage is critically high: {memory_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
-        elif memory.percent > 75:
+        elif memory_percent > 75:
             alerts.append({
                 'level': 'warning',
-                'message': f'Memory usage is high: {memory.percent}%',
+                'message': f'Memory usage is high: {memory_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
         
         # Check disk usage
-        disk = psutil.disk_usage('/')
-        if disk.percent > 90:
+        disk_percent = snapshot['disk_percent']
+        if disk_percent > 90:
             alerts.append({
                 'level': 'critical',
-                'message': f'Disk usage is critically high: {disk.percent}%',
+                'message': f'Disk usage is critically high: {disk_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
-        elif disk.percent > 80:
+        elif disk_percent > 80:
             alerts.append({
                 'level': 'warning',
-                'message': f'Disk usage is high: {disk.percent}%',
+                'message': f'Disk usage is high: {disk_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
         
         # Check database connection
         try:
-            conn = get_db_connection()
-            conn.close()
+            db_pool.ping()
         except Exception as e:
             alerts.append({
                 'level': 'critical',
@@ -630,6 +1454,43 @@ def get_alerts():
                 'timestamp': datetime.now().isoformat()
             })
         
+        # Check the read replica
+        replica = read_router.status()
+        if replica['replica_configured'] and not replica['using_replica']:
+            alerts.append({
+                'level': 'warning',
+                'message': f"Reads fell back to the primary: {replica['fallback_reason']}",
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        # Check the agent hosts
+        for host in fleet.hosts():
+            if host['status'] == 'down':
+                alerts.append({
+                    'level': 'critical',
+                    'message': f"Host {host['host']} stopped reporting {host['seconds_since_seen']:.0f}s ago",
+                    'timestamp': datetime.now().isoformat()
+                })
+                continue
+            latest = host['latest'] or {}
+            for key, label in (('cpu_percent', 'CPU'), ('memory_percent', 'Memory'), ('disk_percent', 'Disk')):
+                value = sample_number(latest, key)
+                if value is not None and value > 90:
+                    alerts.append({
+                        'level': 'critical',
+                        'message': f"{label} usage on {host['host']} is critically high: {round(value, 2)}%",
+                        'timestamp': datetime.now().isoformat()
+                    })
+        
+        # Check the database circuit breaker
+        breaker = db_breaker.stats()
+        if breaker['state'] != 'closed':
+            alerts.append({
+                'level': 'critical',
+                'message': f"Database circuit breaker is {breaker['state']}: serving last-known-good data",
+                'timestamp': datetime.now().isoformat()
+            })
+        
         if not alerts:
             alerts.append({
                 'level': 'info',
@@ -644,7 +1505,8 @@ def get_alerts():
 @app.route('/api/bots')
 def get_bots():
     """Get all bot airlines with their status"""
-    conn = get_db_connection()
+    airport_index.refresh()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -657,10 +1519,7 @@ def get_bots():
                 a.airline_type,
                 COALESCE(ai.balance, 0) as balance,
                 COALESCE(ai.reputation, 0) as reputation,
-                COALESCE(ai.service_quality, 0) as service_quality,
-                (SELECT COUNT(*) FROM link WHERE airline = a.id) as route_count,
-                (SELECT COUNT(*) FROM airplane WHERE owner = a.id) as aircraft_count,
-                (SELECT COUNT(*) FROM airline_base WHERE airline = a.id) as base_count
+                COALESCE(ai.service_quality, 0) as service_quality
             FROM airline a
             LEFT JOIN airline_info ai ON a.id = ai.airline
             WHERE a.airline_type = 2
@@ -668,68 +1527,106 @@ def get_bots():
         """)
         bots = cursor.fetchall()
         
-        # Enhance each bot with personality and additional stats
+        # Everything below is loaded for all bots at once (a fixed number of
+        # queries regardless of bot count) and stitched together by airline id
+        by_id = {}
+        classify_rows(bots)
         for bot in bots:
-            # Determine personality based on cash, reputation, service quality
-            bot['personality'] = determine_personality(
-                bot.get('balance', 0), 
-                bot.get('reputation', 0), 
-                bot.get('service_quality', 0)
-            )
-            
-            # Get route details
-            cursor.execute("""
+            bot['route_count'] = 0
+            bot['aircraft_count'] = 0
+            bot['base_count'] = 0
+            bot['routes'] = []
+            bot['fleet'] = []
+            bot['bases'] = []
+            by_id[bot['id']] = bot
+        
+        if not bots:
+            return jsonify({'bots': bots})
+        
+        # Route counts
+        cursor.execute("""
+            SELECT airline, COUNT(*) as route_count
+            FROM link
+            WHERE airline IN (SELECT id FROM airline WHERE airline_type = 2)
+            GROUP BY airline
+        """)
+        for row in cursor.fetchall():
+            if row['airline'] in by_id:
+                by_id[row['airline']]['route_count'] = row['route_count']
+        
+        # Latest 10 routes per bot. The airport checks are primary key probes
+        # only; they keep routes the index would drop from taking up the 10
+        cursor.execute("""
+            SELECT 
+                r.airline,
+                r.id,
+                r.from_airport,
+                r.to_airport,
+                r.distance,
+                r.frequency,
+                r.price_economy,
+                r.price_business,
+                r.price_first,
+                r.quality,
+                r.capacity_economy,
+                r.capacity_business,
+                r.capacity_first
+            FROM (
                 SELECT 
-                    l.id,
-                    from_airport.iata as from_iata,
-                    from_airport.city as from_city,
-                    to_airport.iata as to_iata,
-                    to_airport.city as to_city,
-                    l.distance,
-                    l.frequency,
-                    l.price_economy,
-                    l.price_business,
-                    l.price_first,
-                    l.quality,
-                    l.capacity_economy,
-                    l.capacity_business,
-                    l.capacity_first
+                    l.*,
+                    ROW_NUMBER() OVER (PARTITION BY l.airline ORDER BY l.id DESC) as rn
                 FROM link l
-                JOIN airport from_airport ON l.from_airport = from_airport.id
-                JOIN airport to_airport ON l.to_airport = to_airport.id
-                WHERE l.airline = %s
-                ORDER BY l.id DESC
-                LIMIT 10
-            """, (bot['id'],))
-            bot['routes'] = cursor.fetchall()
-            
-            # Get aircraft fleet
-            cursor.execute("""
-                SELECT 
-                    model as name,
-                    COUNT(*) as count,
-                    AVG(airplane_condition) as avg_condition,
-                    SUM(CASE WHEN is_sold = 0 THEN 1 ELSE 0 END) as available
-                FROM airplane
-                WHERE owner = %s
-                GROUP BY model
-                ORDER BY count DESC
-            """, (bot['id'],))
-            bot['fleet'] = cursor.fetchall()
-            
-            # Get bases
-            cursor.execute("""
-                SELECT 
-                    ap.iata,
-                    ap.city,
-                    ap.name as airport_name,
-                    ab.scale,
-                    ab.founded_cycle
-                FROM airline_base ab
-                JOIN airport ap ON ab.airport = ap.id
-                WHERE ab.airline = %s
-            """, (bot['id'],))
-            bot['bases'] = cursor.fetchall()
+                WHERE l.airline IN (SELECT id FROM airline WHERE airline_type = 2)
+                  AND l.from_airport IN (SELECT id FROM airport)
+                  AND l.to_airport IN (SELECT id FROM airport)
+            ) r
+            WHERE r.rn <= 10
+            ORDER BY r.airline, r.id DESC
+        """)
+        for route in airport_index.resolve(cursor.fetchall(), fields=('iata', 'city')):
+            bot = by_id.get(route.pop('airline'))
+            # The airport ids were only needed for the lookup
+            del route['from_airport'], route['to_airport']
+            if bot is not None:
+                bot['routes'].append(route)
+        
+        # Aircraft fleet by model
+        cursor.execute("""
+            SELECT 
+                owner,
+                model as name,
+                COUNT(*) as count,
+                AVG(airplane_condition) as avg_condition,
+                SUM(CASE WHEN is_sold = 0 THEN 1 ELSE 0 END) as available
+            FROM airplane
+            WHERE owner IN (SELECT id FROM airline WHERE airline_type = 2)
+            GROUP BY owner, model
+            ORDER BY owner, count DESC
+        """)
+        for model in cursor.fetchall():
+            bot = by_id.get(model.pop('owner'))
+            if bot is not None:
+                bot['fleet'].append(model)
+                bot['aircraft_count'] += model['count']
+        
+        # Bases
+        cursor.execute("""
+            SELECT 
+                ab.airline,
+                ab.airport,
+                ab.scale,
+                ab.founded_cycle
+            FROM airline_base ab
+            WHERE ab.airline IN (SELECT id FROM airline WHERE airline_type = 2)
+        """)
+        bases = airport_index.resolve(cursor.fetchall(), columns=(('airport', ''),), fields=('iata', 'city', 'name'))
+        for base in bases:
+            base['airport_name'] = base.pop('name')
+            del base['airport']
+            bot = by_id.get(base.pop('airline'))
+            if bot is not None:
+                bot['bases'].append(base)
+                bot['base_count'] += 1
             
         return jsonify({'bots': bots})
     finally:
@@ -753,154 +1650,452 @@ def determine_personality(balance, reputation, service_quality):
     else:
         return "BALANCED"
 
-@app.route('/api/bots/<int:bot_id>/routes')
-def get_bot_routes(bot_id):
-    """Get detailed routes for a specific bot"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+# The SQL and vectorized classifiers are generated from personality.RULES;
+# refuse to start if they no longer match determine_personality
+check_rules(determine_personality)
+BOT_PERSONALITY_SQL = case_expression({
+    'balance': 'ai.balance',
+    'reputation': 'ai.reputation',
+    'service_quality': 'ai.service_quality'
+})
+
+LINK_SEATS_SOLD = "COALESCE(l.sold_seats_economy, 0) + COALESCE(l.sold_seats_business, 0) + COALESCE(l.sold_seats_first, 0)"
+LINK_CAPACITY = "COALESCE(l.capacity_economy, 0) + COALESCE(l.capacity_business, 0) + COALESCE(l.capacity_first, 0)"
+
+BOT_ROUTE_FIELDS = FieldSet(
+    [('id', 'l.id'), ('from_airport', 'l.from_airport'), ('to_airport', 'l.to_airport')]
+    + [(column, f'l.{column}') for column in (
+        'distance', 'frequency', 'duration', 'price_economy', 'price_business', 'price_first', 'quality',
+        'capacity_economy', 'capacity_business', 'capacity_first',
+        'sold_seats_economy', 'sold_seats_business', 'sold_seats_first', 'flight_type')]
+    # 0E0 makes the division floating point in MySQL, like it was in Python
+    + [('load_factor', f"COALESCE(({LINK_SEATS_SOLD} + 0E0) * 100 / NULLIF({LINK_CAPACITY}, 0), 0)")],
+    derived={
+        f'{side}_{field}': (f'{side}_airport', field)
+        for side in ('from', 'to') for field in ('iata', 'name', 'city', 'country')
+    },
+    # The response the airport join gave; the airport ids are opt-in
+    default=['id'] + [
+        f'{side}_{field}' for side in ('from', 'to') for field in ('iata', 'name', 'city', 'country')
+    ] + [
+        'distance', 'frequency', 'duration', 'price_economy', 'price_business', 'price_first', 'quality',
+        'capacity_economy', 'capacity_business', 'capacity_first',
+        'sold_seats_economy', 'sold_seats_business', 'sold_seats_first', 'flight_type', 'load_factor'
+    ]
+)
+
+BOT_AIRCRAFT_FIELDS = FieldSet([
+    ('id', 'id'),
+    ('name', 'model'),
+    ('condition', 'airplane_condition'),
+    ('depreciation_rate', 'depreciation_rate'),
+    ('value', 'value'),
+    ('purchase_date', 'purchase_date'),
+    ('is_sold', 'is_sold'),
+    ('dealer_ratio', 'dealer_ratio'),
+    ('configuration', 'configuration')
+])
+
+def bot_list_response(key, field_set, query, params, derive=None, require=None):
+    """Run a list query selecting only the requested fields and shape it per format="""
+    # require=(fields, known): drop rows where known(values) is false for any
+    # of those fields, whether or not they were requested
+    try:
+        names = field_set.parse(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'fields': field_set.names}), 400
+    sql_fields = field_set.sql_fields(names)
+    if require is not None:
+        sql_fields += [name for name in require[0] if name not in sql_fields]
     
+    conn = get_read_connection()
+    # Tuple rows: no per-row dicts until (unless) the response needs them
+    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT 
-                l.id,
-                from_airport.iata as from_iata,
-                from_airport.name as from_name,
-                from_airport.city as from_city,
-                from_airport.country_code as from_country,
-                to_airport.iata as to_iata,
-                to_airport.name as to_name,
-                to_airport.city as to_city,
-                to_airport.country_code as to_country,
-                l.distance,
-                l.frequency,
-                l.duration,
-                l.price_economy,
-                l.price_business,
-                l.price_first,
-                l.quality,
-                l.capacity_economy,
-                l.capacity_business,
-                l.capacity_first,
-                l.sold_seats_economy,
-                l.sold_seats_business,
-                l.sold_seats_first,
-                l.flight_type
-            FROM link l
-            JOIN airport from_airport ON l.from_airport = from_airport.id
-            JOIN airport to_airport ON l.to_airport = to_airport.id
-            WHERE l.airline = %s
-            ORDER BY l.id DESC
-        """, (bot_id,))
-        routes = cursor.fetchall()
-        
-        # Calculate load factors
-        for route in routes:
-            total_capacity = (route['capacity_economy'] or 0) + (route['capacity_business'] or 0) + (route['capacity_first'] or 0)
-            total_sold = (route['sold_seats_economy'] or 0) + (route['sold_seats_business'] or 0) + (route['sold_seats_first'] or 0)
-            route['load_factor'] = (total_sold / total_capacity * 100) if total_capacity > 0 else 0
-        
-        return jsonify({'routes': routes})
+        cursor.execute(query.format(select=field_set.select_list(sql_fields)), params)
+        columns = columns_from_rows(sql_fields, cursor.fetchall())
     finally:
         cursor.close()
         conn.close()
+    
+    if require is not None:
+        fields, known = require
+        keep = [all(flags) for flags in zip(*(known(columns[name]) for name in fields))]
+        if not all(keep):
+            columns = {name: [value for value, kept in zip(values, keep) if kept] for name, values in columns.items()}
+    for name in names:
+        if name in field_set.derived:
+            source, field = field_set.derived[name]
+            columns[name] = derive(columns[source], field)
+    return jsonify(shape_rows(key, names, columns, request.args.get('format'), request.args.get('orient')))
+
+@app.route('/api/bots/<int:bot_id>/routes')
+def get_bot_routes(bot_id):
+    """Get detailed routes for a specific bot (fields= and format=columnar supported)"""
+    airport_index.refresh()
+    return bot_list_response('routes', BOT_ROUTE_FIELDS, """
+        SELECT {select}
+        FROM link l
+        WHERE l.airline = %s
+        ORDER BY l.id DESC
+    """, (bot_id,), derive=airport_index.column,
+        # Routes to airports no longer in the table are left out, as the airport join did
+        require=(('from_airport', 'to_airport'), airport_index.known))
 
 @app.route('/api/bots/<int:bot_id>/aircraft')
 def get_bot_aircraft(bot_id):
-    """Get detailed aircraft for a specific bot"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT 
-                id,
-                model as name,
-                airplane_condition as condition,
-                depreciation_rate,
-                value,
-                purchase_date,
-                is_sold,
-                dealer_ratio,
-                configuration
-            FROM airplane
-            WHERE owner = %s
-            ORDER BY model, id
-        """, (bot_id,))
-        aircraft = cursor.fetchall()
-        
-        return jsonify({'aircraft': aircraft})
-    finally:
-        cursor.close()
-        conn.close()
+    """Get detailed aircraft for a specific bot (fields= and format=columnar supported)"""
+    return bot_list_response('aircraft', BOT_AIRCRAFT_FIELDS, """
+        SELECT {select}
+        FROM airplane
+        WHERE owner = %s
+        ORDER BY model, id
+    """, (bot_id,))
 
-@app.route('/api/bots/summary')
-def get_bots_summary():
-    """Get summary statistics for all bots"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
+def compute_bots_summary():
+    """Compute summary statistics for all bots"""
+    result = query_fanout.run({
         # Total bots - Fixed to use airline_type = 2
-        cursor.execute("SELECT COUNT(*) as total FROM airline WHERE airline_type = 2")
-        total_bots = cursor.fetchone()['total']
-        
+        'total_bots': fetch_value("SELECT COUNT(*) as total FROM airline WHERE airline_type = 2"),
         # Total routes
-        cursor.execute("""
+        'total_routes': fetch_value("""
             SELECT COUNT(*) as total 
             FROM link l
             JOIN airline a ON l.airline = a.id
             WHERE a.airline_type = 2
-        """)
-        total_routes = cursor.fetchone()['total']
-        
+        """),
         # Total aircraft
-        cursor.execute("""
+        'total_aircraft': fetch_value("""
             SELECT COUNT(*) as total 
             FROM airplane ap
             JOIN airline a ON ap.owner = a.id
             WHERE a.airline_type = 2 AND ap.is_sold = 0
-        """)
-        total_aircraft = cursor.fetchone()['total']
-        
-        # Personality distribution - Fixed to JOIN airline_info
-        cursor.execute("""
-            SELECT 
-                a.id,
-                COALESCE(ai.balance, 0) as balance,
-                COALESCE(ai.reputation, 0) as reputation,
-                COALESCE(ai.service_quality, 0) as service_quality
+        """),
+        # Personality distribution, classified and counted in the database
+        'personality_rows': fetch_all(f"""
+            SELECT {BOT_PERSONALITY_SQL} as personality, COUNT(*) as count
             FROM airline a
             LEFT JOIN airline_info ai ON a.id = ai.airline
             WHERE a.airline_type = 2
+            GROUP BY personality
         """)
-        bots_data = cursor.fetchall()
-        
-        personality_counts = {
-            'AGGRESSIVE': 0,
-            'CONSERVATIVE': 0,
-            'BALANCED': 0,
-            'REGIONAL': 0,
-            'PREMIUM': 0,
-            'BUDGET': 0
-        }
-        
-        for bot in bots_data:
-            personality = determine_personality(
-                bot['balance'],
-                bot['reputation'],
-                bot['service_quality']
-            )
-            personality_counts[personality] += 1
-        
-        return jsonify({
-            'total_bots': total_bots,
-            'total_routes': total_routes,
-            'total_aircraft': total_aircraft,
-            'personality_distribution': personality_counts
-        })
+    }, deadline=QUERY_DEADLINES['bots_summary'])
+    
+    personality_counts = dict.fromkeys(PERSONALITIES, 0)
+    for row in result.get('personality_rows', []):
+        personality_counts[row['personality']] = row['count']
+    
+    return result.annotate({
+        'total_bots': result.get('total_bots', 0),
+        'total_routes': result.get('total_routes', 0),
+        'total_aircraft': result.get('total_aircraft', 0),
+        'personality_distribution': personality_counts
+    })
+
+@app.route('/api/bots/summary')
+def get_bots_summary():
+    """Get summary statistics for all bots"""
+    return cached_response('bots_summary', snapshot_section('bots_summary'), tags=('cycle',))
+
+def compute_bot_counts():
+    """Compute route, aircraft and base counts for every bot"""
+    conn = get_read_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        counts = {}
+        
+        cursor.execute("SELECT id FROM airline WHERE airline_type = 2")
+        for row in cursor.fetchall():
+            counts[row['id']] = {'route_count': 0, 'aircraft_count': 0, 'base_count': 0}
+        
+        for column, query in (
+            ('route_count', """
+                SELECT airline as id, COUNT(*) as count FROM link
+                WHERE airline IN (SELECT id FROM airline WHERE airline_type = 2)
+                GROUP BY airline
+            """),
+            ('aircraft_count', """
+                SELECT owner as id, COUNT(*) as count FROM airplane
+                WHERE owner IN (SELECT id FROM airline WHERE airline_type = 2)
+                GROUP BY owner
+            """),
+            ('base_count', """
+                SELECT airline as id, COUNT(*) as count FROM airline_base
+                WHERE airline IN (SELECT id FROM airline WHERE airline_type = 2)
+                GROUP BY airline
+            """)
+        ):
+            cursor.execute(query)
+            for row in cursor.fetchall():
+                if row['id'] in counts:
+                    counts[row['id']][column] = row['count']
+        
+        # JSON object keys are strings; keep them that way in fresh snapshots too
+        return {str(bot_id): bot_counts for bot_id, bot_counts in counts.items()}
     finally:
         cursor.close()
         conn.close()
 
+def compute_cycle_snapshot(cycle):
+    """Compute every cycle-scoped aggregate for one snapshot"""
+    with collect_reads() as reads:
+        data = {
+            'database_stats': compute_database_stats(),
+            'game_activity': compute_game_activity(),
+            'bots_summary': compute_bots_summary(),
+            'bot_counts': compute_bot_counts()
+        }
+    data['_source'] = summarize_reads(reads)
+    return data
+
+# Per-cycle snapshots of game statistics, persisted locally so every worker
+# and every restart reuses them
+cycle_snapshots = CycleSnapshots(
+    SnapshotStore(
+        os.getenv('SNAPSHOT_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshots.sqlite3')),
+        retention=int(os.getenv('SNAPSHOT_RETENTION', 2000))
+    ),
+    read_current_cycle,
+    compute_cycle_snapshot,
+    check_interval=float(os.getenv('SNAPSHOT_CYCLE_CHECK_INTERVAL', 10))
+)
+
+def snapshot_section(name):
+    """Compute function reading one section of the current cycle snapshot"""
+    def compute():
+        data = cycle_snapshots.current()['data']
+        source = data.get('_source')
+        if source:
+            note_read(source['source'], source['as_of'])
+        return data[name]
+    return compute
+
+@app.route('/api/snapshots/current')
+def get_current_snapshot():
+    """Get the full snapshot for the current cycle"""
+    try:
+        return jsonify(cycle_snapshots.current())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/snapshots/history')
+def get_snapshot_history():
+    """Get per-cycle trend series from stored snapshots"""
+    limit = min(int(request.args.get('limit', 100)), 2000)
+    history = []
+    for snapshot in cycle_snapshots.history(limit):
+        data = snapshot['data']
+        history.append({
+            'cycle': snapshot['cycle'],
+            'computed_at': datetime.fromtimestamp(snapshot['computed_at']).isoformat(),
+            'last_cycle_passengers': data['database_stats'].get('last_cycle_passengers'),
+            'total_links': data['database_stats'].get('total_links'),
+            'active_airplanes': data['database_stats'].get('active_airplanes'),
+            'active_airlines': data['database_stats'].get('active_airlines'),
+            'bot_routes': data['bots_summary'].get('total_routes'),
+            'bot_aircraft': data['bots_summary'].get('total_aircraft'),
+            'personality_distribution': data['bots_summary'].get('personality_distribution')
+        })
+    return jsonify({'history': history})
+
+@app.route('/api/bots/personality/history')
+def get_personality_history():
+    """Get the bot personality distribution per cycle, as one series per personality"""
+    limit = min(int(request.args.get('limit', 100)), 2000)
+    cycles = []
+    series = {personality: [] for personality in PERSONALITIES}
+    for snapshot in cycle_snapshots.history(limit):
+        distribution = snapshot['data']['bots_summary'].get('personality_distribution') or {}
+        cycles.append(snapshot['cycle'])
+        for personality in PERSONALITIES:
+            series[personality].append(distribution.get(personality, 0))
+    return jsonify({'cycles': cycles, 'series': series})
+
+# Long-term metric history in fixed-size ring files, written by whichever
+# worker holds the history directory's lock
+HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+HISTORY_SYSTEM_METRICS = ('cpu_percent', 'memory_percent', 'swap_percent', 'disk_percent',
+                          'net_sent_rate', 'net_recv_rate', 'process_count')
+history_store = TimeSeriesStore(
+    os.getenv('HISTORY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'history')),
+    tiers=parse_tiers(os.getenv('HISTORY_TIERS')) if os.getenv('HISTORY_TIERS') else DEFAULT_TIERS,
+    max_points=int(os.getenv('HISTORY_MAX_POINTS', 2000))
+)
+history_state = {'cycle': None, 'checked_at': 0.0}
+
+def record_history(snapshot):
+    """System sampler listener writing each sample, and each new cycle's passengers"""
+    if not history_store.record({key: snapshot[key] for key in HISTORY_SYSTEM_METRICS}, snapshot['timestamp']):
+        return
+    # Passenger counts come from the stored cycle snapshots, not the game database
+    if snapshot['timestamp'] - history_state['checked_at'] < cycle_snapshots.check_interval:
+        return
+    history_state['checked_at'] = snapshot['timestamp']
+    latest = cycle_snapshots.store.latest()
+    if latest is None or latest['cycle'] == history_state['cycle']:
+        return
+    history_state['cycle'] = latest['cycle']
+    passengers = latest['data']['database_stats'].get('last_cycle_passengers')
+    history_store.record({'cycle_passengers': passengers}, latest['computed_at'])
+
+if HISTORY_ENABLED:
+    system_sampler.add_listener(record_history)
+    system_sampler.start()
+
+def parse_history_time(value, now, default):
+    """Epoch seconds, negative seconds relative to now, or an ISO 8601 timestamp"""
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    return now + number if number < 0 else number
+
+@app.route('/api/history')
+def get_history_metrics():
+    """Get the metrics with stored history and the rollup tiers"""
+    return jsonify(history_store.stats())
+
+@app.route('/api/history/<metric>')
+def get_metric_history(metric):
+    """Get min/max/avg points for one metric over a time range"""
+    now = time.time()
+    try:
+        end = parse_history_time(request.args.get('to'), now, now)
+        start = parse_history_time(request.args.get('from'), now, end - 3600)
+        step = int(request.args['step']) if request.args.get('step') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time range: {e}'}), 400
+    if start >= end:
+        return jsonify({'error': 'from must be before to'}), 400
+    if metric not in history_store.metrics():
+        return jsonify({'error': 'Unknown metric'}), 404
+    return jsonify(history_store.query(metric, start, end, step))
+
+def collect_runtime_metrics():
+    """Point-in-time pool, cache, stream and system gauges for /metrics"""
+    pool = db_pool.stats()
+    for key in ('size', 'open', 'idle', 'in_use', 'waiters'):
+        yield f'admin_db_pool_{key}', 'gauge', f'Connection pool {key.replace("_", " ")}', [({}, pool[key])]
+    for key in ('checkouts', 'timeouts', 'created', 'recycled', 'ping_failures'):
+        yield f'admin_db_pool_{key}_total', 'counter', f'Connection pool {key.replace("_", " ")}', [({}, pool[key])]
+    yield 'admin_db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a pooled connection', [({}, pool['wait_time_total'])]
+    
+    replica = read_router.status()
+    yield 'admin_db_reads_total', 'counter', 'Routed read connections by source', [
+        ({'source': 'replica'}, replica['replica_reads']),
+        ({'source': 'primary'}, replica['primary_reads'])
+    ]
+    if replica['replica_configured']:
+        yield 'admin_db_replica_lag_seconds', 'gauge', 'Read replica replication lag', [({}, replica['lag_seconds'])]
+        yield 'admin_db_replica_in_use', 'gauge', 'Whether reads currently go to the replica', [({}, int(replica['using_replica']))]
+    
+    fanout = query_fanout.stats()
+    for key in ('runs', 'queries', 'failures', 'timeouts', 'kills'):
+        yield f'admin_fanout_{key}_total', 'counter', f'Concurrent query fan-out {key}', [({}, fanout[key])]
+    
+    cache = result_cache.stats()
+    for key in ('hits', 'misses', 'stale_hits', 'coalesced', 'refreshes', 'errors', 'invalidations', 'evictions'):
+        yield f'admin_cache_{key}_total', 'counter', f'Result cache {key.replace("_", " ")}', [({}, cache[key])]
+    yield 'admin_cache_entries', 'gauge', 'Result cache entries', [({}, cache['entries'])]
+    
+    pipeline = response_pipeline.stats()
+    yield 'admin_http_not_modified_total', 'counter', 'Responses answered with 304 Not Modified', [({}, pipeline['not_modified'])]
+    yield 'admin_http_compressed_total', 'counter', 'Response bodies compressed', [({}, pipeline['compressed'])]
+    yield 'admin_http_compressed_cache_hits_total', 'counter', 'Compressed bodies reused from the cache', [({}, pipeline['compressed_cache_hits'])]
+    
+    breaker = db_breaker.stats()
+    yield 'admin_db_breaker_open', 'gauge', 'Whether the database circuit breaker is open (1) or half open (0.5)', [({}, {'closed': 0, 'half_open': 0.5, 'open': 1}[breaker['state']])]
+    yield 'admin_db_breaker_opened_total', 'counter', 'Times the database circuit breaker opened', [({}, breaker['opened'])]
+    yield 'admin_db_breaker_rejected_total', 'counter', 'Requests refused while the circuit breaker was open', [({}, breaker['rejected'])]
+    limiter = db_limiter.stats()
+    yield 'admin_db_requests_in_flight', 'gauge', 'Database-backed requests running', [({}, limiter['in_flight'])]
+    yield 'admin_db_requests_shed_total', 'counter', 'Database-backed requests shed by the concurrency limiter', [({}, limiter['shed'])]
+    
+    hosts = fleet.hosts()
+    yield 'admin_fleet_hosts', 'gauge', 'Metrics agent hosts by status', [
+        ({'status': status}, sum(1 for host in hosts if host['status'] == status)) for status in ('up', 'down')
+    ]
+    yield 'admin_fleet_seconds_since_seen', 'gauge', 'Seconds since each agent host last pushed', [
+        ({'host': host['host']}, host['seconds_since_seen']) for host in hosts
+    ]
+    for key in ('cpu_percent', 'memory_percent', 'disk_percent'):
+        yield f'admin_fleet_{key}', 'gauge', f'Agent host {key.replace("_", " ")}', [
+            ({'host': host['host']}, sample_number(host['latest'], key)) for host in hosts
+            if host['latest'] and sample_number(host['latest'], key) is not None
+        ]
+    
+    yield 'admin_stream_subscribers', 'gauge', 'Connected panel stream clients', [({}, panel_broadcaster.stats()['subscribers'])]
+    
+    snapshot = system_sampler.latest()
+    for key in ('cpu_percent', 'memory_percent', 'swap_percent', 'disk_percent'):
+        yield f'admin_system_{key}', 'gauge', f'System {key.replace("_", " ")}', [({}, snapshot[key])]
+    yield 'admin_system_memory_used_bytes', 'gauge', 'System memory used', [({}, snapshot['memory_used'])]
+    yield 'admin_system_network_sent_bytes_total', 'counter', 'Bytes sent on all interfaces', [({}, snapshot['net_bytes_sent'])]
+    yield 'admin_system_network_received_bytes_total', 'counter', 'Bytes received on all interfaces', [({}, snapshot['net_bytes_recv'])]
+    yield 'admin_system_processes', 'gauge', 'Running processes', [({}, snapshot['process_count'])]
+
+metrics.add_collector(collect_runtime_metrics)
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of request, query, pool, cache and system metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def render_panel(path):
+    """Run a GET endpoint in-process and return (status, body)"""
+    with app.test_request_context(path):
+        response = app.full_dispatch_request()
+        return response.status_code, response.get_data(as_text=True)
+
+def alerts_fingerprint(data):
+    """Alerts without their timestamps, which change on every render"""
+    return [
+        {key: value for key, value in alert.items() if key != 'timestamp'}
+        for alert in data.get('alerts', [])
+    ] if isinstance(data, dict) else data
+
+# Dashboard panels pushed over /api/stream, at the dashboard's polling intervals.
+# One worker (whichever holds the state directory's lock) renders them and the
+# others relay its results; each worker serves at most STREAM_MAX_CLIENTS streams
+panel_broadcaster = PanelBroadcaster(
+    render_panel,
+    heartbeat=float(os.getenv('STREAM_HEARTBEAT', 15)),
+    max_subscribers=int(os.getenv('STREAM_MAX_CLIENTS', max(1, int(os.getenv('WEB_THREADS', 8)) // 2))),
+    state_dir=os.getenv('STREAM_STATE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'stream'))
+)
+panel_broadcaster.register('stats', 60, '/api/stats')
+panel_broadcaster.register('server_resources', 5, '/api/server/resources')
+panel_broadcaster.register('alerts', 30, '/api/alerts', fingerprint=alerts_fingerprint)
+panel_broadcaster.register('database_stats', 60, '/api/database/stats')
+panel_broadcaster.register('game_activity', 60, '/api/game/activity')
+panel_broadcaster.register('bots_summary', 60, '/api/bots/summary')
+panel_broadcaster.register('bots', 60, '/api/bots')
+panel_broadcaster.register('containers', 10, '/api/containers')
+panel_broadcaster.register('logs', 30, '/api/logs/recent')
+
+@app.route('/api/stream')
+def stream_panels():
+    """Server-Sent Events stream of dashboard panels, sent when they change"""
+    try:
+        subscriber = panel_broadcaster.subscribe()
+    except StreamFull as e:
+        # The dashboard falls back to polling when its stream is refused
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+    return Response(
+        panel_broadcaster.stream(subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/stream/stats')
+def get_stream_stats():
+    """Get panel stream subscriber and broadcast counters"""
+    return jsonify(panel_broadcaster.stats())
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=9001, debug=True)
+    # Development server; production runs through gunicorn (see wsgi.py)
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 9001)), debug=debug, threaded=True)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Query-count benchmark for /api/bots
+
+Serves the endpoint from an in-memory stand-in database and reports how many
+queries one request issues as the number of bot airlines grows. The count
+should stay flat; before batching it grew by three per bot.
+
+Usage: python benchmarks/bench_bots.py [bot counts...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as admin_app
+
+ROUTES_PER_BOT = 25
+MODELS_PER_BOT = 3
+BASES_PER_BOT = 2
+
+
+class FakeCursor:
+    """Cursor that answers the /api/bots queries with synthetic rows"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.db.queries += 1
+        self.rows = self.db.answer(' '.join(query.split()))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Synthetic bot airlines with routes, fleets and bases"""
+
+    def __init__(self, bot_count):
+        self.bot_ids = list(range(1, bot_count + 1))
+        self.queries = 0
+
+    def answer(self, sql):
+        if 'ROW_NUMBER()' in sql:
+            return [
+                {'airline': bot, 'id': bot * 1000 + n, 'from_airport': 1, 'to_airport': 2,
+                 'distance': 500, 'frequency': 7,
+                 'price_economy': 100, 'price_business': 300, 'price_first': 900, 'quality': 50,
+                 'capacity_economy': 150, 'capacity_business': 20, 'capacity_first': 0}
+                for bot in self.bot_ids for n in range(min(ROUTES_PER_BOT, 10))
+            ]
+        if 'FROM link' in sql and 'GROUP BY' in sql:
+            return [{'airline': bot, 'route_count': ROUTES_PER_BOT} for bot in self.bot_ids]
+        if 'FROM airplane' in sql:
+            return [
+                {'owner': bot, 'name': f'Model {m}', 'count': 4, 'avg_condition': 90.0, 'available': 4}
+                for bot in self.bot_ids for m in range(MODELS_PER_BOT)
+            ]
+        if 'FROM airline_base' in sql:
+            return [
+                {'airline': bot, 'airport': 1, 'scale': 1, 'founded_cycle': 1}
+                for bot in self.bot_ids for _ in range(BASES_PER_BOT)
+            ]
+        if 'FROM airport' in sql:
+            # Airport index: signature, then the full load (tuple rows)
+            if 'COUNT(*)' in sql:
+                return [(2, 2)]
+            return [(1, 'AAA', 'A Intl', 'A', 'AA', 0.0, 0.0), (2, 'BBB', 'B Intl', 'B', 'BB', 1.0, 1.0)]
+        if 'FROM airline a' in sql:
+            return [
+                {'id': bot, 'name': f'Bot {bot}', 'airline_type': 2, 'balance': 5e7,
+                 'reputation': 50, 'service_quality': 50}
+                for bot in self.bot_ids
+            ]
+        return []
+
+
+class FakeConnection:
+    in_transaction = False
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.db)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def run(bot_count):
+    db = FakeDatabase(bot_count)
+    # Point the app's pool at this run's fake database
+    admin_app.db_pool.close_all()
+    admin_app.db_pool._connect = lambda **kwargs: FakeConnection(db)
+    # The airport index is loaded once per process, not per request
+    admin_app.airport_index.refresh(force=True)
+    db.queries = 0
+    client = admin_app.app.test_client()
+
+    started = time.perf_counter()
+    response = client.get('/api/bots')
+    elapsed = time.perf_counter() - started
+
+    bots = response.get_json()['bots']
+    assert len(bots) == bot_count
+    assert all(len(bot['routes']) == min(ROUTES_PER_BOT, 10) for bot in bots)
+    assert all(bot['base_count'] == BASES_PER_BOT for bot in bots)
+    return db.queries, elapsed
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100, 500, 1000]
+    print(f"{'bots':>6} {'queries':>8} {'ms':>10}")
+    results = []
+    for count in counts:
+        queries, elapsed = run(count)
+        results.append(queries)
+        print(f"{count:>6} {queries:>8} {elapsed * 1000:>10.1f}")
+
+    if len(set(results)) != 1:
+        print('Query count grows with bot count')
+        sys.exit(1)
+    print(f'Query count constant at {results[0]} per request')
+
+
+if __name__ == '__main__':
+    main()
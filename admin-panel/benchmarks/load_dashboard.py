@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Dashboard load benchmark
+
+Seeds a database at a chosen scale, then simulates N browser tabs against
+the app in-process in two modes, reported separately:
+
+  polling  replays the polling fallback's mix (the intervals in
+           templates/dashboard.html); reports p50/p95/p99 latency, queries
+           per request and, against MySQL, rows examined per endpoint
+  stream   holds one /api/stream Server-Sent Events connection per tab, as
+           the dashboard does by default; reports time until a tab has every
+           panel, events and bytes per tab, and the panel renders and
+           queries the server spent for all tabs together
+
+Results are written as JSON so runs can be compared.
+
+Two backends:
+  standin  in-memory SQLite stand-in, no server needed (default)
+  mysql    a local MySQL server, e.g. `docker run -e MYSQL_ROOT_PASSWORD=bench
+           -p 3306:3306 mysql:8`; rows examined come from performance_schema
+
+Usage:
+  python benchmarks/load_dashboard.py --tabs 20 --duration 120
+  python benchmarks/load_dashboard.py --mode stream --tabs 50
+  python benchmarks/load_dashboard.py --backend mysql --scale medium --output before.json
+  python benchmarks/load_dashboard.py --backend mysql --skip-seed --compare before.json
+"""
+
+import argparse
+import heapq
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+import seed as seeding
+
+# (endpoint, path, interval in seconds) of the dashboard's polling fallback
+POLLING_MIX = [
+    ('server_resources', '/api/server/resources', 5),
+    ('containers', '/api/containers', 10),
+    ('alerts', '/api/alerts', 30),
+    ('logs', '/api/logs/recent', 30),
+    ('stats', '/api/stats', 60),
+    ('database_stats', '/api/database/stats', 60),
+    ('game_activity', '/api/game/activity', 60),
+    ('bots_summary', '/api/bots/summary', 60),
+    ('bots', '/api/bots', 60)
+]
+# Requested once when a tab opens
+PAGE_LOAD = [
+    ('users', '/api/users?page=1&per_page=50&search=')
+]
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class MySQLBackend:
+    """Seeds a database on a local MySQL server and reads rows examined from performance_schema"""
+
+    def __init__(self, host, port, user, password, database):
+        import mysql.connector
+        self._connect = mysql.connector.connect
+        self.config = {'host': host, 'port': port, 'user': user, 'password': password}
+        self.database = database
+
+    def seed(self, scale, seed_value):
+        admin = self._connect(**self.config)
+        cursor = admin.cursor()
+        try:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.database}`")
+        finally:
+            cursor.close()
+            admin.close()
+        conn = self._connect(database=self.database, **self.config)
+        try:
+            return seeding.seed(conn, scale, seed_value)
+        finally:
+            conn.close()
+
+    def configure_app(self, admin_app):
+        pass
+
+    def _statement_totals(self, reset=False):
+        # Connected without a default schema so our own statements are not counted
+        conn = self._connect(**self.config)
+        cursor = conn.cursor()
+        try:
+            if reset:
+                cursor.execute("TRUNCATE TABLE performance_schema.events_statements_summary_by_digest")
+                return None
+            cursor.execute("""
+                SELECT COALESCE(SUM(SUM_ROWS_EXAMINED), 0), COALESCE(SUM(COUNT_STAR), 0)
+                FROM performance_schema.events_statements_summary_by_digest
+                WHERE SCHEMA_NAME = %s
+            """, (self.database,))
+            rows_examined, statements = cursor.fetchone()
+            return int(rows_examined), int(statements)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def reset_counters(self):
+        self._statement_totals(reset=True)
+
+    def rows_examined(self):
+        return self._statement_totals()[0]
+
+
+class StandInBackend:
+    """In-process SQLite stand-in; rows examined are not available"""
+
+    def __init__(self, database):
+        import standin
+        self.database = database
+        self.db = standin.StandInDatabase(database)
+
+    def seed(self, scale, seed_value):
+        conn = self.db.connect()
+        try:
+            counts = seeding.seed(conn, scale, seed_value)
+        finally:
+            conn.close()
+        self.db.refresh_information_schema()
+        return counts
+
+    def configure_app(self, admin_app):
+        admin_app.db_pool._connect = self.db.connect
+
+    def reset_counters(self):
+        pass
+
+    def rows_examined(self):
+        return None
+
+
+class Recorder:
+    """Thread-safe per-endpoint samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, endpoint, seconds, status, queries, cache_state):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status, queries, cache_state))
+
+
+def timed_get(client, path):
+    started = time.perf_counter()
+    response = client.get(path)
+    # Drain streamed bodies so their queries are part of the measurement
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    match = _SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+    queries = int(match.group(1)) if match else None
+    return elapsed, response.status_code, queries, response.headers.get('X-Cache')
+
+
+def calibrate(admin_app, backend, endpoints):
+    """Rows examined and queries for one cold and one warm request per endpoint, run serially"""
+    client = admin_app.app.test_client()
+    results = {}
+    for phase in ('cold', 'warm'):
+        for endpoint, path in endpoints:
+            backend.reset_counters()
+            _, status, queries, _ = timed_get(client, path)
+            entry = results.setdefault(endpoint, {})
+            entry[f'{phase}_queries'] = queries
+            entry[f'{phase}_rows_examined'] = backend.rows_examined()
+            entry[f'{phase}_status'] = status
+    return results
+
+
+def run_load(admin_app, polling_mix, page_load, tabs, duration, time_scale, ramp, workers, rng):
+    """Replay the polling mix for `tabs` tabs over `duration` seconds of wall time"""
+    recorder = Recorder()
+    local = threading.local()
+
+    def request(endpoint, path):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = admin_app.app.test_client()
+        try:
+            recorder.add(endpoint, *timed_get(client, path))
+        except Exception as e:
+            print(f'{endpoint} raised: {e}')
+            recorder.add(endpoint, 0.0, 599, None, None)
+
+    # (due, sequence, tab, endpoint, path, interval) ordered by due time
+    schedule = []
+    sequence = 0
+    for tab in range(tabs):
+        opened = rng.uniform(0, ramp)
+        for endpoint, path in page_load:
+            heapq.heappush(schedule, (opened, sequence, tab, endpoint, path, None))
+            sequence += 1
+        for endpoint, path, interval in polling_mix:
+            # Every panel loads on open, then refreshes on its interval
+            heapq.heappush(schedule, (opened, sequence, tab, endpoint, path, interval / time_scale))
+            sequence += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tab') as executor:
+        while schedule:
+            due, _, tab, endpoint, path, interval = heapq.heappop(schedule)
+            if due >= duration:
+                break
+            delay = started + due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(request, endpoint, path)
+            if interval is not None:
+                heapq.heappush(schedule, (due + interval, sequence, tab, endpoint, path, interval))
+                sequence += 1
+    return recorder, time.monotonic() - started
+
+
+def run_streams(admin_app, tabs, duration, ramp, rng):
+    """Hold one panel stream open per tab for `duration` seconds, like the shipped dashboard"""
+    broadcaster = admin_app.panel_broadcaster
+    panels = set(broadcaster.stats()['panels'])
+    query_count = [0]
+    count_lock = threading.Lock()
+
+    def count_query(*args):
+        with count_lock:
+            query_count[0] += 1
+
+    for pool in admin_app.database_pools:
+        pool.add_query_listener(count_query)
+    before = broadcaster.stats()
+    stop = threading.Event()
+
+    def tab(opened):
+        time.sleep(opened)
+        client = admin_app.app.test_client()
+        connected = time.perf_counter()
+        response = client.get('/api/stream', buffered=False)
+        result = {'status': response.status_code, 'events': 0, 'bytes': 0, 'full_load_ms': None}
+        if response.status_code != 200:
+            response.close()
+            return result
+        seen = set()
+        buffer = ''
+        try:
+            for chunk in response.response:
+                text = chunk.decode() if isinstance(chunk, bytes) else chunk
+                result['bytes'] += len(text)
+                buffer += text
+                while '\n\n' in buffer:
+                    message, buffer = buffer.split('\n\n', 1)
+                    if not message.startswith('event: panel'):
+                        continue
+                    result['events'] += 1
+                    data = message.split('\ndata: ', 1)[1]
+                    seen.add(json.loads(data)['panel'])
+                    if result['full_load_ms'] is None and seen >= panels:
+                        result['full_load_ms'] = (time.perf_counter() - connected) * 1000
+                if stop.is_set():
+                    break
+        finally:
+            # Closing the body unsubscribes the stream, as a closed tab does
+            response.close()
+        return result
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=tabs, thread_name_prefix='stream') as executor:
+        futures = [executor.submit(tab, rng.uniform(0, ramp)) for _ in range(tabs)]
+        time.sleep(max(0.0, duration - (time.monotonic() - started)))
+        stop.set()
+        results = [future.result() for future in futures]
+    elapsed = time.monotonic() - started
+
+    for pool in admin_app.database_pools:
+        pool.query_listeners.remove(count_query)
+    after = broadcaster.stats()
+    connected = [result for result in results if result['status'] == 200]
+    full_loads = [result['full_load_ms'] for result in connected if result['full_load_ms'] is not None]
+    events = [result['events'] for result in connected]
+    return {
+        'tabs': tabs,
+        'connected': len(connected),
+        'rejected': len(results) - len(connected),
+        'full_load_ms': {
+            'p50': round(percentile(full_loads, 50), 3) if full_loads else None,
+            'p95': round(percentile(full_loads, 95), 3) if full_loads else None,
+            'max': round(max(full_loads), 3) if full_loads else None,
+            'incomplete': len(connected) - len(full_loads)
+        },
+        'events_per_tab': round(sum(events) / len(events), 3) if events else None,
+        'bytes_per_tab': round(sum(result['bytes'] for result in connected) / len(connected)) if connected else None,
+        'panel_renders': after['computations'] - before['computations'],
+        'broadcasts': after['broadcasts'] - before['broadcasts'],
+        'queries': query_count[0],
+        'queries_per_second': round(query_count[0] / elapsed, 3) if elapsed else None,
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+
+def summarize(recorder, calibration, elapsed):
+    endpoints = {}
+    paths = {endpoint: (path, interval) for endpoint, path, interval in POLLING_MIX}
+    paths.update({endpoint: (path, None) for endpoint, path in PAGE_LOAD})
+    total_requests = total_queries = total_errors = 0
+
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = [seconds * 1000 for seconds, _, _, _ in samples]
+        queries = [count for _, _, count, _ in samples if count is not None]
+        statuses = {}
+        cache = {}
+        for _, status, _, cache_state in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if cache_state:
+                cache[cache_state] = cache.get(cache_state, 0) + 1
+        errors = sum(1 for _, status, _, _ in samples if status >= 500)
+        path, interval = paths.get(endpoint, (None, None))
+        endpoints[endpoint] = {
+            'path': path,
+            'interval': interval,
+            'requests': len(samples),
+            'errors': errors,
+            'status_codes': statuses,
+            'cache': cache,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(max(latencies), 3),
+                'mean': round(sum(latencies) / len(latencies), 3)
+            },
+            'queries_per_request': {
+                'mean': round(sum(queries) / len(queries), 3) if queries else None,
+                'max': max(queries) if queries else None
+            },
+            'rows_examined': {
+                'cold': calibration.get(endpoint, {}).get('cold_rows_examined'),
+                'warm': calibration.get(endpoint, {}).get('warm_rows_examined')
+            },
+            'calibration': calibration.get(endpoint)
+        }
+        total_requests += len(samples)
+        total_queries += sum(queries)
+        total_errors += errors
+
+    return endpoints, {
+        'requests': total_requests,
+        'errors': total_errors,
+        'queries': total_queries,
+        'queries_per_request': round(total_queries / total_requests, 3) if total_requests else None,
+        'throughput_rps': round(total_requests / elapsed, 3) if elapsed else None,
+        'elapsed_seconds': round(elapsed, 3)
+    }
+
+
+def print_report(results):
+    print(f"\n{'endpoint':<18} {'reqs':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'q/req':>6} {'rows cold':>10} {'rows warm':>10}")
+    for endpoint, stats in results['endpoints'].items():
+        latency = stats['latency_ms']
+        rows = stats['rows_examined']
+        queries = stats['queries_per_request']['mean']
+        print(f"{endpoint:<18} {stats['requests']:>6} {stats['errors']:>4} {latency['p50']:>9.2f} "
+              f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} "
+              f"{'-' if queries is None else f'{queries:.1f}':>6} "
+              f"{'-' if rows['cold'] is None else rows['cold']:>10} "
+              f"{'-' if rows['warm'] is None else rows['warm']:>10}")
+    totals = results['totals']
+    print(f"\n{totals['requests']} requests, {totals['errors']} errors, "
+          f"{totals['throughput_rps']} req/s, {totals['queries_per_request']} queries/request"
+          + (f", {totals['rows_examined']} rows examined" if totals.get('rows_examined') is not None else ''))
+
+
+def print_stream_report(stream):
+    full_load = stream['full_load_ms']
+    print(f"\nstream: {stream['connected']}/{stream['tabs']} tabs connected ({stream['rejected']} refused), "
+          f"all panels after p50 {full_load['p50']} ms / p95 {full_load['p95']} ms "
+          f"({full_load['incomplete']} incomplete)")
+    print(f"{stream['events_per_tab']} events and {stream['bytes_per_tab']} bytes per tab; "
+          f"server: {stream['panel_renders']} panel renders, {stream['broadcasts']} broadcasts, "
+          f"{stream['queries']} queries ({stream['queries_per_second']}/s) for all tabs")
+
+
+def print_comparison(results, baseline):
+    print(f"\nCompared with {baseline.get('git_revision')} ({baseline.get('started_at')}):")
+    print(f"{'endpoint':<18} {'p95 ms':>20} {'q/req':>16} {'rows cold':>20}")
+
+    def change(old, new):
+        if old is None or new is None:
+            return f'{old} -> {new}'
+        return f'{old:g} -> {new:g}'
+
+    for endpoint, stats in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if before is None:
+            continue
+        print(f"{endpoint:<18} "
+              f"{change(before['latency_ms']['p95'], stats['latency_ms']['p95']):>20} "
+              f"{change(before['queries_per_request']['mean'], stats['queries_per_request']['mean']):>16} "
+              f"{change(before['rows_examined']['cold'], stats['rows_examined']['cold']):>20}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay the dashboard polling mix against a seeded database')
+    parser.add_argument('--backend', choices=('standin', 'mysql'), default='standin')
+    parser.add_argument('--mode', choices=('polling', 'stream', 'both'), default='both',
+                        help='polling fallback mix, panel streams, or both one after the other')
+    parser.add_argument('--tabs', type=int, default=10, help='simulated dashboard tabs')
+    parser.add_argument('--duration', type=float, default=120, help='seconds of load')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='divide polling intervals by this (cache TTLs are not scaled)')
+    parser.add_argument('--ramp', type=float, default=5, help='seconds over which tabs open')
+    parser.add_argument('--workers', type=int, help='concurrent requests (default: 2 per tab, max 64)')
+    parser.add_argument('--exclude', nargs='*', default=[], metavar='ENDPOINT',
+                        help='endpoints to leave out of the mix, e.g. containers without Docker')
+    parser.add_argument('--seed', type=int, default=42, help='RNG seed for data and schedule')
+    parser.add_argument('--scale', choices=sorted(seeding.SCALES), default='small')
+    for key in seeding.SCALES['small']:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key, help=f'override scale {key}')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already seeded MySQL database')
+    parser.add_argument('--no-calibrate', action='store_true', help='skip the serial cold/warm pass')
+    parser.add_argument('--mysql-host', default='127.0.0.1')
+    parser.add_argument('--mysql-port', type=int, default=3306)
+    parser.add_argument('--mysql-user', default=os.getenv('BENCH_DB_USER', 'root'))
+    parser.add_argument('--mysql-password', default=os.getenv('BENCH_DB_PASSWORD', 'bench'))
+    parser.add_argument('--database', default='airline_bench')
+    parser.add_argument('--allow-any-database', action='store_true',
+                        help='allow seeding a database whose name does not end in _bench')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/dashboard-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.backend == 'mysql' and not args.skip_seed and not args.database.endswith('_bench') \
+            and not args.allow_any_database:
+        sys.exit(f'Refusing to drop and reseed {args.database!r}; use a *_bench database')
+
+    scale = seeding.resolve_scale(args.scale, **{key: getattr(args, key) for key in seeding.SCALES['small']})
+    if args.backend == 'mysql':
+        backend = MySQLBackend(args.mysql_host, args.mysql_port, args.mysql_user,
+                               args.mysql_password, args.database)
+    else:
+        backend = StandInBackend(args.database)
+
+    rows_seeded = None
+    if not args.skip_seed or args.backend == 'standin':
+        print(f'Seeding {args.backend} at scale {scale} ...')
+        started = time.perf_counter()
+        rows_seeded = backend.seed(scale, args.seed)
+        print(f'Seeded {sum(rows_seeded.values())} rows in {time.perf_counter() - started:.1f}s')
+
+    # The app reads its configuration at import time; keep its local state out of data/
+    state_dir = tempfile.mkdtemp(prefix='admin-bench-')
+    os.environ.update({
+        'DB_HOST': f'{args.mysql_host}:{args.mysql_port}',
+        'DB_NAME': args.database,
+        'DB_USER': args.mysql_user,
+        'DB_PASSWORD': args.mysql_password,
+        'SNAPSHOT_DB_PATH': os.path.join(state_dir, 'snapshots.sqlite3'),
+        'HISTORY_DIR': os.path.join(state_dir, 'history'),
+        'ACCOUNT_LINKS_CACHE_PATH': os.path.join(state_dir, 'account_links.json'),
+        'FLEET_DB_PATH': os.path.join(state_dir, 'fleet.sqlite3'),
+        'ACTIVITY_DB_PATH': os.path.join(state_dir, 'activity.sqlite3'),
+        'STREAM_STATE_DIR': os.path.join(state_dir, 'stream'),
+        # Every simulated tab gets a stream, and idle streams wake up often
+        # enough to stop promptly at the end of the run
+        'STREAM_MAX_CLIENTS': str(max(1, args.tabs)),
+        'STREAM_HEARTBEAT': '1'
+    })
+    import app as admin_app
+    backend.configure_app(admin_app)
+
+    polling_mix = [entry for entry in POLLING_MIX if entry[0] not in args.exclude]
+    page_load = [entry for entry in PAGE_LOAD if entry[0] not in args.exclude]
+    endpoints = [(endpoint, path) for endpoint, path, _ in polling_mix] + page_load
+    calibration = {} if args.no_calibrate else calibrate(admin_app, backend, endpoints)
+    if not args.no_calibrate:
+        # Start the load from a cold cache, like a freshly deployed panel
+        admin_app.result_cache.clear()
+
+    workers = args.workers or min(64, args.tabs * 2)
+    endpoint_results, totals = {}, {}
+    if args.mode in ('polling', 'both'):
+        print(f'Replaying polling mix for {args.tabs} tabs over {args.duration:g}s ...')
+        backend.reset_counters()
+        recorder, elapsed = run_load(admin_app, polling_mix, page_load, args.tabs, args.duration, args.time_scale,
+                                     args.ramp, workers, random.Random(args.seed))
+        endpoint_results, totals = summarize(recorder, calibration, elapsed)
+        totals['rows_examined'] = backend.rows_examined()
+
+    stream = None
+    if args.mode in ('stream', 'both'):
+        # Streams start from a cold cache too
+        admin_app.result_cache.clear()
+        print(f'Holding {args.tabs} panel streams open for {args.duration:g}s ...')
+        stream = run_streams(admin_app, args.tabs, args.duration, args.ramp, random.Random(args.seed))
+    results = {
+        'benchmark': 'admin-panel-dashboard',
+        'format': 1,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'mode': args.mode,
+        'seed': args.seed,
+        'scale': scale,
+        'rows_seeded': rows_seeded,
+        'tabs': args.tabs,
+        'duration': args.duration,
+        'time_scale': args.time_scale,
+        'workers': workers,
+        'excluded': args.exclude,
+        'endpoints': endpoint_results,
+        'totals': totals,
+        'stream': stream,
+        'pool': admin_app.db_pool.stats()
+    }
+
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"dashboard-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+
+    if endpoint_results:
+        print_report(results)
+    if stream is not None:
+        print_stream_report(stream)
+    if args.compare and endpoint_results:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    print(f'\nResults written to {output}')
+
+
+if __name__ == '__main__':
+    main()
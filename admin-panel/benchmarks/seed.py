@@ -0,0 +1,347 @@
+"""
+Deterministic seed data for admin panel benchmarks
+
+Creates the tables the admin panel reads, with the columns and indexes of
+the game schema (airline-data Meta.scala) plus the extra columns the panel
+queries, and fills them from a seeded RNG so two runs at the same scale see
+identical data. The DDL sticks to the subset MySQL and SQLite both accept
+and every row is inserted with an explicit id.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+SCALES = {
+    'small': {
+        'users': 1000, 'ips_per_user': 3, 'uuids_per_user': 2, 'bots': 20, 'airports': 300,
+        'links_per_airline': 10, 'airplanes_per_airline': 8, 'bases_per_airline': 2,
+        'cycles': 5, 'logs': 5000
+    },
+    'medium': {
+        'users': 10000, 'ips_per_user': 4, 'uuids_per_user': 2, 'bots': 100, 'airports': 1500,
+        'links_per_airline': 15, 'airplanes_per_airline': 12, 'bases_per_airline': 3,
+        'cycles': 10, 'logs': 100000
+    },
+    'large': {
+        'users': 100000, 'ips_per_user': 5, 'uuids_per_user': 3, 'bots': 500, 'airports': 4000,
+        'links_per_airline': 20, 'airplanes_per_airline': 15, 'bases_per_airline': 3,
+        'cycles': 20, 'logs': 1000000
+    }
+}
+
+# Share of human users that own an airline, and that reuse another user's IP
+AIRLINE_OWNER_RATIO = 0.8
+ALT_ACCOUNT_RATIO = 0.05
+BATCH_SIZE = 1000
+
+SCHEMA = [
+    ('user', """
+        CREATE TABLE user (
+            id INTEGER PRIMARY KEY, user_name VARCHAR(100) UNIQUE, email VARCHAR(256) NOT NULL,
+            status VARCHAR(256) NOT NULL, admin_status VARCHAR(256), creation_time DATETIME,
+            level INTEGER NOT NULL DEFAULT 0, last_active DATETIME
+        )
+    """),
+    ('user_ip', """
+        CREATE TABLE user_ip (
+            user INTEGER, ip VARCHAR(256) NOT NULL, occurrence INTEGER DEFAULT 0,
+            last_update DATETIME, PRIMARY KEY (user, ip)
+        )
+    """),
+    ('user_uuid', """
+        CREATE TABLE user_uuid (
+            user INTEGER, uuid VARCHAR(256) NOT NULL, occurrence INTEGER DEFAULT 0,
+            last_update DATETIME, PRIMARY KEY (user, uuid)
+        )
+    """),
+    ('user_modifier', """
+        CREATE TABLE user_modifier (
+            user INTEGER, modifier_name CHAR(20), creation INTEGER, PRIMARY KEY (user, modifier_name)
+        )
+    """),
+    ('airline', """
+        CREATE TABLE airline (
+            id INTEGER PRIMARY KEY, name VARCHAR(256), airline_type INTEGER, balance BIGINT
+        )
+    """),
+    ('airline_info', """
+        CREATE TABLE airline_info (
+            airline INTEGER PRIMARY KEY, balance BIGINT, service_quality DECIMAL(5,2),
+            reputation DECIMAL(6,2), country_code CHAR(2), airline_code CHAR(2)
+        )
+    """),
+    ('user_airline', """
+        CREATE TABLE user_airline (airline INTEGER PRIMARY KEY, user_name VARCHAR(100))
+    """),
+    ('airport', """
+        CREATE TABLE airport (
+            id INTEGER PRIMARY KEY, iata VARCHAR(256), icao VARCHAR(256), name VARCHAR(256),
+            latitude DOUBLE, longitude DOUBLE, country_code VARCHAR(256), city VARCHAR(256),
+            airport_size INTEGER, population BIGINT
+        )
+    """),
+    ('airline_base', """
+        CREATE TABLE airline_base (
+            airport INTEGER, airline INTEGER, scale INTEGER, founded_cycle INTEGER,
+            headquarter INTEGER, country CHAR(2), PRIMARY KEY (airport, airline)
+        )
+    """),
+    ('link', """
+        CREATE TABLE link (
+            id INTEGER PRIMARY KEY, from_airport INTEGER, to_airport INTEGER, airline INTEGER,
+            price_economy INTEGER, price_business INTEGER, price_first INTEGER, distance DOUBLE,
+            capacity_economy INTEGER, capacity_business INTEGER, capacity_first INTEGER,
+            sold_seats_economy INTEGER, sold_seats_business INTEGER, sold_seats_first INTEGER,
+            quality INTEGER, duration INTEGER, frequency INTEGER, flight_type INTEGER
+        )
+    """),
+    ('link_consumption', """
+        CREATE TABLE link_consumption (
+            link INTEGER, airline INTEGER, cycle INTEGER, passenger_count INTEGER,
+            sold_seats_economy INTEGER, sold_seats_business INTEGER, sold_seats_first INTEGER,
+            revenue INTEGER, profit INTEGER
+        )
+    """),
+    ('airplane', """
+        CREATE TABLE airplane (
+            id INTEGER PRIMARY KEY, model INTEGER, owner INTEGER, constructed_cycle INTEGER,
+            airplane_condition DECIMAL(7,4), depreciation_rate INTEGER, value INTEGER,
+            is_sold INTEGER, dealer_ratio DECIMAL(7,6), purchase_date DATETIME, configuration INTEGER
+        )
+    """),
+    ('cycle', """
+        CREATE TABLE cycle (id INTEGER PRIMARY KEY, cycle INTEGER)
+    """),
+    ('log', """
+        CREATE TABLE log (
+            id INTEGER PRIMARY KEY, airline INTEGER, message VARCHAR(512), category INTEGER,
+            severity INTEGER, cycle INTEGER, log_time DATETIME
+        )
+    """)
+]
+
+INDEXES = [
+    "CREATE UNIQUE INDEX link_index_1 ON link (from_airport, to_airport, airline)",
+    "CREATE INDEX link_index_2 ON link (from_airport)",
+    "CREATE INDEX link_index_3 ON link (to_airport)",
+    "CREATE INDEX link_index_4 ON link (airline)",
+    "CREATE INDEX link_consumption_index_1 ON link_consumption (link)",
+    "CREATE INDEX link_consumption_index_2 ON link_consumption (airline)",
+    "CREATE INDEX link_consumption_index_3 ON link_consumption (cycle DESC)",
+    "CREATE INDEX airplane_index_1 ON airplane (owner)",
+    "CREATE INDEX airplane_index_2 ON airplane (model)",
+    "CREATE INDEX log_index_1 ON log (airline)"
+]
+
+
+def resolve_scale(name='small', **overrides):
+    """Scale parameters for a named preset with per-table overrides applied"""
+    scale = dict(SCALES[name])
+    scale.update({key: int(value) for key, value in overrides.items() if value is not None})
+    return scale
+
+
+def _timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _insert(cursor, table, columns, rows):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def create_schema(cursor):
+    """Drop and recreate the benchmark tables"""
+    for table, _ in reversed(SCHEMA):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for _, ddl in SCHEMA:
+        cursor.execute(ddl)
+    for ddl in INDEXES:
+        cursor.execute(ddl)
+
+
+def seed(conn, scale, seed_value=42, now=None):
+    """Create the schema and fill it; returns the row count per table"""
+    rng = random.Random(seed_value)
+    now = now or datetime.now().replace(microsecond=0)
+    cursor = conn.cursor()
+    counts = {}
+    try:
+        create_schema(cursor)
+
+        users = scale['users']
+        statuses = ['ACTIVE'] * 18 + ['INACTIVE', 'BANNED']
+        counts['user'] = _insert(cursor, 'user', (
+            'id', 'user_name', 'email', 'status', 'admin_status', 'creation_time', 'level', 'last_active'
+        ), (
+            (user_id, f'player{user_id}', f'player{user_id}@example.com', rng.choice(statuses),
+             'ADMIN' if user_id == 1 else None,
+             _timestamp(now - timedelta(days=rng.randint(0, 720))), rng.randint(0, 50),
+             _timestamp(now - timedelta(minutes=int(rng.expovariate(1 / 14400)))))
+            for user_id in range(1, users + 1)
+        ))
+
+        # Most users have their own IPs; a few reuse another user's, forming alt clusters
+        def user_ips():
+            for user_id in range(1, users + 1):
+                shared = rng.random() < ALT_ACCOUNT_RATIO and user_id > 1
+                for n in range(rng.randint(1, scale['ips_per_user'])):
+                    if shared and n == 0:
+                        other = rng.randint(1, user_id - 1)
+                        ip = f'10.{other // 65536 % 256}.{other // 256 % 256}.{other % 256}'
+                    else:
+                        ip = f'172.{rng.randint(16, 31)}.{user_id // 256 % 256}.{(user_id + n * 97) % 256}'
+                    yield (user_id, ip, rng.randint(1, 500),
+                           _timestamp(now - timedelta(hours=rng.randint(0, 2000))))
+        # Primary key (user, ip) must stay unique even if the RNG repeats an address
+        counts['user_ip'] = _insert(cursor, 'user_ip', ('user', 'ip', 'occurrence', 'last_update'),
+                                    _unique(user_ips(), key=lambda row: row[:2]))
+        counts['user_uuid'] = _insert(cursor, 'user_uuid', ('user', 'uuid', 'occurrence', 'last_update'), (
+            (user_id, f'{seed_value:08x}-{user_id:08x}-{n:04x}', rng.randint(1, 300),
+             _timestamp(now - timedelta(hours=rng.randint(0, 2000))))
+            for user_id in range(1, users + 1) for n in range(rng.randint(1, scale['uuids_per_user']))
+        ))
+        counts['user_modifier'] = _insert(cursor, 'user_modifier', ('user', 'modifier_name', 'creation'), (
+            (user_id, 'WARNED', rng.randint(1, 1000)) for user_id in range(1, users + 1, 50)
+        ))
+
+        airports = scale['airports']
+        counts['airport'] = _insert(cursor, 'airport', (
+            'id', 'iata', 'icao', 'name', 'latitude', 'longitude', 'country_code', 'city',
+            'airport_size', 'population'
+        ), (
+            (airport_id, _code(airport_id, 3), 'K' + _code(airport_id, 3), f'Airport {airport_id}',
+             rng.uniform(-60, 70), rng.uniform(-180, 180), _code(airport_id % 150, 2),
+             f'City {airport_id}', rng.randint(1, 8), rng.randint(10000, 20000000))
+            for airport_id in range(1, airports + 1)
+        ))
+
+        # Human airlines first, then bots (airline_type = 2)
+        human_airlines = int(users * AIRLINE_OWNER_RATIO)
+        airline_types = [0, 0, 0, 1, 3, 4]
+        airlines = []
+        for airline_id in range(1, human_airlines + scale['bots'] + 1):
+            bot = airline_id > human_airlines
+            airlines.append((airline_id, 2 if bot else rng.choice(airline_types), rng.randint(-5000000, 900000000)))
+        counts['airline'] = _insert(cursor, 'airline', ('id', 'name', 'airline_type', 'balance'), (
+            (airline_id, f'{"Bot" if airline_type == 2 else "Airline"} {airline_id}', airline_type, balance)
+            for airline_id, airline_type, balance in airlines
+        ))
+        counts['airline_info'] = _insert(cursor, 'airline_info', (
+            'airline', 'balance', 'service_quality', 'reputation', 'country_code', 'airline_code'
+        ), (
+            (airline_id, balance, round(rng.uniform(10, 95), 2), round(rng.uniform(0, 100), 2),
+             _code(airline_id % 150, 2), _code(airline_id, 2))
+            for airline_id, _, balance in airlines
+        ))
+        counts['user_airline'] = _insert(cursor, 'user_airline', ('airline', 'user_name'), (
+            (airline_id, f'player{airline_id}') for airline_id in range(1, human_airlines + 1)
+        ))
+
+        counts['airline_base'] = _insert(cursor, 'airline_base', (
+            'airport', 'airline', 'scale', 'founded_cycle', 'headquarter', 'country'
+        ), _unique((
+            (rng.randint(1, airports), airline_id, rng.randint(1, 10), rng.randint(1, 500),
+             1 if n == 0 else 0, 'US')
+            for airline_id, _, _ in airlines for n in range(scale['bases_per_airline'])
+        ), key=lambda row: row[:2]))
+
+        # Only what link_consumption needs is kept in memory: (link, airline, sold seats)
+        consumption_basis = []
+
+        def links():
+            link_id = 0
+            routes = set()
+            for airline_id, _, _ in airlines:
+                hub = rng.randint(1, airports)
+                for _ in range(scale['links_per_airline']):
+                    destination = rng.randint(1, airports)
+                    if destination == hub or (hub, destination, airline_id) in routes:
+                        continue
+                    routes.add((hub, destination, airline_id))
+                    link_id += 1
+                    capacity = (rng.randint(50, 3000), rng.randint(0, 400), rng.randint(0, 80))
+                    sold = tuple(int(seats * rng.uniform(0.3, 1.0)) for seats in capacity)
+                    consumption_basis.append((link_id, airline_id) + sold)
+                    yield (link_id, hub, destination, airline_id,
+                           rng.randint(50, 2000), rng.randint(200, 6000), rng.randint(500, 15000),
+                           rng.uniform(100, 15000)) + capacity + sold + (
+                           rng.randint(20, 100), rng.randint(30, 1000), rng.randint(1, 42), rng.randint(0, 3))
+        counts['link'] = _insert(cursor, 'link', (
+            'id', 'from_airport', 'to_airport', 'airline', 'price_economy', 'price_business',
+            'price_first', 'distance', 'capacity_economy', 'capacity_business', 'capacity_first',
+            'sold_seats_economy', 'sold_seats_business', 'sold_seats_first', 'quality', 'duration',
+            'frequency', 'flight_type'
+        ), links())
+
+        cycles = scale['cycles']
+        counts['link_consumption'] = _insert(cursor, 'link_consumption', (
+            'link', 'airline', 'cycle', 'passenger_count', 'sold_seats_economy',
+            'sold_seats_business', 'sold_seats_first', 'revenue', 'profit'
+        ), (
+            (link_id, airline_id, cycle, economy + business + first, economy, business, first,
+             rng.randint(1000, 2000000), rng.randint(-500000, 800000))
+            for cycle in range(1, cycles + 1)
+            for link_id, airline_id, economy, business, first in consumption_basis
+        ))
+        # The rows are written; free the list (the links() closure still refers to it)
+        consumption_basis.clear()
+
+        counts['airplane'] = _insert(cursor, 'airplane', (
+            'id', 'model', 'owner', 'constructed_cycle', 'airplane_condition', 'depreciation_rate',
+            'value', 'is_sold', 'dealer_ratio', 'purchase_date', 'configuration'
+        ), (
+            (index * scale['airplanes_per_airline'] + n + 1, rng.randint(1, 120), airline_id,
+             rng.randint(1, cycles), round(rng.uniform(20, 100), 4), rng.randint(1, 10),
+             rng.randint(1000000, 300000000), 1 if rng.random() < 0.05 else 0,
+             round(rng.uniform(0.5, 1), 6), _timestamp(now - timedelta(days=rng.randint(0, 900))),
+             rng.randint(1, 5))
+            for index, (airline_id, _, _) in enumerate(airlines)
+            for n in range(scale['airplanes_per_airline'])
+        ))
+
+        counts['cycle'] = _insert(cursor, 'cycle', ('id', 'cycle'), [(1, cycles)])
+
+        airline_count = len(airlines)
+        log_count = scale['logs']
+        counts['log'] = _insert(cursor, 'log', (
+            'id', 'airline', 'message', 'category', 'severity', 'cycle', 'log_time'
+        ), (
+            (log_id, rng.randint(1, airline_count), f'Event {log_id} for airline', rng.randint(0, 12),
+             rng.randint(0, 3), cycles - (log_count - log_id) * cycles // log_count,
+             _timestamp(now - timedelta(seconds=(log_count - log_id) * 7)))
+            for log_id in range(1, log_count + 1)
+        ))
+
+        conn.commit()
+        return counts
+    finally:
+        cursor.close()
+
+
+def _code(number, length):
+    letters = []
+    for _ in range(length):
+        number, remainder = divmod(number, 26)
+        letters.append(chr(ord('A') + remainder))
+    return ''.join(reversed(letters))
+
+
+def _unique(rows, key):
+    seen = set()
+    for row in rows:
+        marker = key(row)
+        if marker not in seen:
+            seen.add(marker)
+            yield row
@@ -0,0 +1,153 @@
+"""
+In-process SQLite stand-in for the game's MySQL database
+
+Speaks the part of the mysql-connector interface the admin panel uses
+(dictionary cursors, %s parameters, ping, autocommit) and rewrites the few
+MySQL-only constructs the panel's queries contain. It lets the benchmark
+run without a MySQL server; latencies are SQLite's, not MySQL's, and rows
+examined are not available, so compare stand-in runs only with each other.
+"""
+
+import re
+import sqlite3
+from datetime import date, datetime
+
+_INTERVAL = re.compile(r'DATE_SUB\(\s*NOW\(\)\s*,\s*INTERVAL\s+(\d+|%s)\s+DAY\s*\)', re.IGNORECASE)
+_NOW = re.compile(r'\bNOW\(\)', re.IGNORECASE)
+_OPTIMIZER_HINT = re.compile(r'/\*\+.*?\*/', re.DOTALL)
+_DATETIME_TEXT = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+_DATE_TEXT = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def translate(query):
+    """Rewrite MySQL-only syntax into its SQLite equivalent"""
+    query = _OPTIMIZER_HINT.sub('', query)
+
+    def interval(match):
+        days = match.group(1)
+        if days == '%s':
+            return "datetime('now', 'localtime', '-' || %s || ' days')"
+        return f"datetime('now', 'localtime', '-{days} days')"
+
+    query = _INTERVAL.sub(interval, query)
+    query = _NOW.sub("datetime('now', 'localtime')", query)
+    return query.replace('%s', '?')
+
+
+def _convert(value):
+    # MySQL hands back date/datetime objects where SQLite has text
+    if isinstance(value, str):
+        if _DATETIME_TEXT.match(value):
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        if _DATE_TEXT.match(value):
+            return date.fromisoformat(value)
+    return value
+
+
+class StandInCursor:
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, query, params=None):
+        self._cursor.execute(translate(query), tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(translate(query), [tuple(params) for params in seq_params])
+
+    def _row(self, row):
+        values = [_convert(value) for value in row]
+        if not self._dictionary:
+            return tuple(values)
+        return dict(zip((column[0] for column in self._cursor.description), values))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, uri):
+        self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                           isolation_level=None)
+        self.autocommit = True
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def cursor(self, dictionary=False, **kwargs):
+        return StandInCursor(self._connection, dictionary)
+
+    def ping(self, reconnect=False):
+        self._connection.execute('SELECT 1')
+
+    def commit(self):
+        if self._connection.in_transaction:
+            self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+class StandInDatabase:
+    """Shared-cache in-memory SQLite database with an information_schema.TABLES view"""
+
+    def __init__(self, name='airline_bench'):
+        self.name = name
+        self.uri = f'file:{name}?mode=memory&cache=shared'
+        # Keeps the shared in-memory databases alive for the stand-in's lifetime
+        self._keeper = self.connect()
+
+    def connect(self, **kwargs):
+        """Drop-in for mysql.connector.connect; connection settings are ignored"""
+        connection = StandInConnection(self.uri)
+        self._attach_information_schema(connection)
+        return connection
+
+    def _attach_information_schema(self, connection):
+        raw = connection._connection
+        raw.execute("ATTACH DATABASE 'file:information_schema?mode=memory&cache=shared' AS information_schema")
+        raw.execute("""
+            CREATE TABLE IF NOT EXISTS information_schema.TABLES (
+                table_schema TEXT, table_name TEXT, data_length INTEGER, index_length INTEGER
+            )
+        """)
+
+    def refresh_information_schema(self):
+        """Record every table with a rough size so the panel's size queries have data"""
+        connection = self.connect()
+        raw = connection._connection
+        try:
+            raw.execute("DELETE FROM information_schema.TABLES")
+            tables = [row[0] for row in raw.execute(
+                "SELECT name FROM main.sqlite_master WHERE type = 'table'")]
+            for table in tables:
+                rows = raw.execute(f'SELECT COUNT(*) FROM main."{table}"').fetchone()[0]
+                raw.execute("INSERT INTO information_schema.TABLES VALUES (?, ?, ?, ?)",
+                            (self.name, table, rows * 100, rows * 30))
+        finally:
+            connection.close()
@@ -0,0 +1,210 @@
+"""
+In-process result cache for aggregate endpoints
+
+Entries live for a per-key TTL and may then be served stale for a while
+longer while a single background refresh recomputes them. Concurrent misses
+for the same key share one computation (single-flight). Entries can carry
+tags that are invalidated when a watched version (e.g. the game cycle)
+changes.
+"""
+
+import threading
+import time
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at', 'expires_at', 'stale_until', 'tags')
+
+    def __init__(self, value, ttl, stale_ttl, tags):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.tags = frozenset(tags)
+
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """TTL cache with single-flight recomputation and stale-while-revalidate"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = {}
+        self._watches = {}
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'errors': 0,
+            'invalidations': 0,
+            'evictions': 0
+        }
+        self._key_counters = {}
+
+    def _count(self, key, name):
+        self._counters[name] += 1
+        per_key = self._key_counters.setdefault(key, {'hits': 0, 'misses': 0, 'stale_hits': 0})
+        if name in per_key:
+            per_key[name] += 1
+
+    def fetch(self, key, compute, ttl, stale_ttl=0, tags=()):
+        """Return (value, state) where state is 'hit', 'stale' or 'miss'"""
+        self._check_watches(tags)
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._count(key, 'hits')
+                return entry.value, 'hit'
+            if entry is not None and now < entry.stale_until:
+                self._count(key, 'stale_hits')
+                if key not in self._flights:
+                    flight = _Flight()
+                    self._flights[key] = flight
+                    threading.Thread(
+                        target=self._refresh,
+                        args=(key, flight, compute, ttl, stale_ttl, tags),
+                        name=f'cache-refresh-{key}',
+                        daemon=True
+                    ).start()
+                return entry.value, 'stale'
+
+            self._count(key, 'misses')
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._counters['coalesced'] += 1
+
+        if leader:
+            return self._compute(key, flight, compute, ttl, stale_ttl, tags), 'miss'
+
+        flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value, 'miss'
+
+    def _compute(self, key, flight, compute, ttl, stale_ttl, tags):
+        try:
+            value = compute()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._counters['errors'] += 1
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._entries[key] = _Entry(value, ttl, stale_ttl, tags)
+                if len(self._entries) > self.max_entries:
+                    self._evict_oldest()
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _refresh(self, key, flight, compute, ttl, stale_ttl, tags):
+        with self._lock:
+            self._counters['refreshes'] += 1
+        try:
+            self._compute(key, flight, compute, ttl, stale_ttl, tags)
+        except Exception as e:
+            print(f'Cache refresh for {key} failed: {e}')
+
+    def _evict_oldest(self):
+        oldest = min(self._entries, key=lambda key: self._entries[key].stored_at)
+        del self._entries[oldest]
+        self._key_counters.pop(oldest, None)
+        self._counters['evictions'] += 1
+
+    def peek(self, key):
+        """Last stored value for a key regardless of age, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._counters['invalidations'] += 1
+
+    def invalidate_tag(self, tag):
+        """Drop every entry carrying `tag`"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if tag in entry.tags]
+            for key in keys:
+                del self._entries[key]
+            self._counters['invalidations'] += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._counters['invalidations'] += len(self._entries)
+            self._entries.clear()
+
+    def watch(self, tag, read_version, interval=10.0):
+        """Invalidate `tag` whenever read_version() changes, checking at most every `interval` seconds"""
+        with self._lock:
+            self._watches[tag] = {
+                'read_version': read_version,
+                'interval': interval,
+                'last_check': 0.0,
+                'version': None,
+                'checking': False
+            }
+
+    def _check_watches(self, tags):
+        for tag in tags:
+            with self._lock:
+                watch = self._watches.get(tag)
+                if watch is None or watch['checking']:
+                    continue
+                if time.monotonic() - watch['last_check'] < watch['interval']:
+                    continue
+                watch['checking'] = True
+
+            try:
+                version = watch['read_version']()
+            except Exception as e:
+                print(f'Cache version check for {tag} failed: {e}')
+                version = watch['version']
+
+            with self._lock:
+                previous = watch['version']
+                watch['version'] = version
+                watch['last_check'] = time.monotonic()
+                watch['checking'] = False
+            if previous is not None and version != previous:
+                self.invalidate_tag(tag)
+
+    def stats(self):
+        """Hit/miss counters overall and per key"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'watches': {tag: watch['version'] for tag, watch in self._watches.items()},
+                'keys': {
+                    key: {
+                        **counters,
+                        'age': round(now - self._entries[key].stored_at, 1) if key in self._entries else None
+                    }
+                    for key, counters in self._key_counters.items()
+                }
+            }
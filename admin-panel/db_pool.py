@@ -0,0 +1,305 @@
+"""
+Bounded MySQL connection pool for the admin panel
+
+Connections are created lazily up to a fixed size, checked for liveness
+before being handed out and recycled once they get too old. A statement
+timeout set with statement_timeout() is added to every SELECT run in that
+context as a MAX_EXECUTION_TIME hint, so the server aborts it in time.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+
+_statement_timeout = contextvars.ContextVar('statement_timeout', default=None)
+_SELECT = re.compile(r'^(\s*(?:/\*(?!\+).*?\*/\s*)*SELECT)\b(?!\s*/\*\+)', re.IGNORECASE | re.DOTALL)
+
+
+@contextmanager
+def statement_timeout(seconds):
+    """Limit SELECTs run in this context (and tasks copying it) to `seconds`; None for no limit"""
+    token = _statement_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _statement_timeout.reset(token)
+
+
+def set_statement_timeout(seconds):
+    """Set the statement timeout for the current context; returns a token for reset_statement_timeout"""
+    return _statement_timeout.set(seconds)
+
+
+def reset_statement_timeout(token):
+    _statement_timeout.reset(token)
+
+
+def with_execution_limit(query, seconds):
+    """Add a MAX_EXECUTION_TIME hint to a SELECT that has no optimizer hint yet"""
+    if not seconds or not isinstance(query, str):
+        return query
+    return _SELECT.sub(lambda match: f'{match.group(1)} /*+ MAX_EXECUTION_TIME({int(seconds * 1000)}) */',
+                       query, count=1)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time"""
+
+
+class TimedCursor:
+    """Cursor wrapper applying the statement timeout and reporting every execute() to listeners"""
+
+    def __init__(self, pool, cursor):
+        self._pool = pool
+        self._cursor = cursor
+
+    def _timed(self, method, query, params, *args, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            if params is None and not args and not kwargs:
+                return method(query)
+            return method(query, params, *args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._pool.notify_query(query, params, time.perf_counter() - started, self._cursor, error)
+
+    def execute(self, query, params=None, *args, **kwargs):
+        query = with_execution_limit(query, _statement_timeout.get())
+        return self._timed(self._cursor.execute, query, params, *args, **kwargs)
+
+    def executemany(self, query, seq_params):
+        return self._timed(self._cursor.executemany, query, seq_params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Connection handed out by the pool; close() returns it instead of closing it"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    @property
+    def pool(self):
+        """The pool (and so the server) this connection belongs to"""
+        return self._pool
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def created_at(self):
+        return self._created_at
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.query_listeners or _statement_timeout.get():
+            return TimedCursor(self._pool, cursor)
+        return cursor
+
+    def close(self):
+        """Return the connection to the pool"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self)
+
+    def invalidate(self):
+        """Close the underlying connection instead of returning it, e.g. with unread rows left"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self, discard=True)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of at most `size` MySQL connections"""
+
+    def __init__(self, db_config, size=5, timeout=10.0, recycle=1800, pre_ping=True,
+                 connect=None):
+        self.db_config = dict(db_config)
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect = connect or mysql.connector.connect
+        # Called as listener(query, params, seconds, cursor, error) after every execute
+        self.query_listeners = []
+
+        self._lock = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+        self._waiters = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _new_raw(self):
+        raw = self._connect(**self.db_config)
+        try:
+            raw.autocommit = True
+        except Exception:
+            pass
+        return raw
+
+    def _is_stale(self, conn):
+        if self.recycle and time.monotonic() - conn.created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return True
+        if self.pre_ping:
+            try:
+                conn.raw.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._ping_failures += 1
+                return True
+        return False
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def get_connection(self, timeout=None):
+        """Check out a live connection, waiting up to `timeout` seconds for a free slot"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._lock:
+            self._waiters += 1
+            try:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection available after {timeout:.1f}s '
+                            f'(pool size {self.size})')
+                    self._lock.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+            waited = time.monotonic() - started
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._checkouts += 1
+            self._in_use += 1
+            candidate = self._idle.pop() if self._idle else None
+            if candidate is None:
+                self._open += 1
+
+        # Liveness checks and connects happen outside the lock
+        try:
+            if candidate is not None and self._is_stale(candidate):
+                self._discard(candidate)
+                candidate = None
+            if candidate is None:
+                raw = self._new_raw()
+                with self._lock:
+                    self._created += 1
+                return PooledConnection(self, raw, time.monotonic())
+            return PooledConnection(self, candidate.raw, candidate.created_at)
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._open -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Put a checked-out connection back into the idle set (or close it if `discard`)"""
+        healthy = not discard
+        try:
+            if healthy and conn.raw.in_transaction:
+                conn.raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(PooledConnection(self, conn.raw, conn.created_at))
+            else:
+                self._open -= 1
+            self._lock.notify()
+
+        if not healthy:
+            self._discard(conn)
+
+    def add_query_listener(self, listener):
+        self.query_listeners.append(listener)
+
+    def notify_query(self, query, params, seconds, cursor, error):
+        for listener in self.query_listeners:
+            try:
+                listener(query, params, seconds, cursor, error)
+            except Exception as e:
+                print(f'Query listener failed: {e}')
+
+    def ping(self, timeout=None):
+        """Check that the database answers, using a pooled connection"""
+        conn = self.get_connection(timeout=timeout)
+        try:
+            conn.raw.ping(reconnect=False)
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiters': self._waiters,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+                'wait_time_total': round(self._wait_total, 4),
+                'wait_time_max': round(self._wait_max, 4),
+                'wait_time_avg': round(self._wait_total / self._checkouts, 4) if self._checkouts else 0
+            }
@@ -0,0 +1,160 @@
+"""
+Read routing between the primary game database and an optional replica
+
+Analytic reads go to the replica while its replication lag stays under a
+threshold and fall back to the primary when the replica lags, stops
+replicating or cannot be reached. Writes always use the primary pool. Every
+routed checkout is recorded in the current context so responses can report
+which source served them and how old the data was.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_reads = contextvars.ContextVar('db_reads', default=None)
+
+
+def note_read(source, as_of):
+    """Record that data as of `as_of` (epoch seconds) came from `source`"""
+    reads = _reads.get()
+    if reads is not None:
+        reads.append({'source': source, 'as_of': as_of})
+
+
+def summarize_reads(reads):
+    """Collapse recorded reads into {'source', 'as_of'}, or None if there were none"""
+    if not reads:
+        return None
+    sources = {read['source'] for read in reads}
+    return {
+        'source': sources.pop() if len(sources) == 1 else 'mixed',
+        'as_of': min(read['as_of'] for read in reads)
+    }
+
+
+def start_collecting():
+    """Start collecting reads in the current context; returns (reads, token)"""
+    reads = []
+    return reads, _reads.set(reads)
+
+
+def stop_collecting(token):
+    _reads.reset(token)
+
+
+@contextmanager
+def collect_reads():
+    """Collect the reads made in this block (and tasks copying its context) into a list"""
+    reads, token = start_collecting()
+    try:
+        yield reads
+    finally:
+        stop_collecting(token)
+
+
+class ReadRouter:
+    """Hands out replica connections for reads while the replica is healthy and current"""
+
+    def __init__(self, primary, replica=None, max_lag=30.0, check_interval=5.0):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = float(max_lag)
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._checking = False
+        self._checked_at = 0.0
+        self._lag = None
+        self._reason = 'replica lag not checked yet' if replica is not None else 'no replica configured'
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    def _read_lag(self):
+        conn = self.replica.get_connection(timeout=2.0)
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Exception:
+                # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        if not rows:
+            return None, 'replication is not configured on the replica'
+        lag = rows[0].get('Seconds_Behind_Source', rows[0].get('Seconds_Behind_Master'))
+        if lag is None:
+            return None, 'replication is stopped'
+        if float(lag) > self.max_lag:
+            return float(lag), f'replica is {lag}s behind (limit {self.max_lag:g}s)'
+        return float(lag), None
+
+    def _check(self):
+        """Refresh the lag reading at most every check_interval; one thread checks at a time"""
+        with self._lock:
+            if self._checking or time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self._checking = True
+        try:
+            lag, reason = self._read_lag()
+        except Exception as e:
+            lag, reason = None, f'replica unavailable: {e}'
+        with self._lock:
+            self._lag = lag
+            self._reason = reason
+            self._checked_at = time.monotonic()
+            self._checking = False
+
+    def _use_replica(self):
+        if self.replica is None:
+            return False, None
+        self._check()
+        with self._lock:
+            return self._reason is None, self._lag
+
+    def get_connection(self, timeout=None):
+        """Connection for analytic reads: the replica when usable, otherwise the primary"""
+        use_replica, lag = self._use_replica()
+        if use_replica:
+            try:
+                conn = self.replica.get_connection(timeout=timeout)
+            except Exception as e:
+                with self._lock:
+                    self._reason = f'replica unavailable: {e}'
+                    self._checked_at = time.monotonic()
+            else:
+                with self._lock:
+                    self.replica_reads += 1
+                note_read('replica', time.time() - (lag or 0))
+                return conn
+
+        conn = self.primary.get_connection(timeout=timeout)
+        with self._lock:
+            self.primary_reads += 1
+            if self.replica is not None:
+                self.fallbacks += 1
+        note_read('primary', time.time())
+        return conn
+
+    def get_write_connection(self, timeout=None):
+        """Connection for writes, always on the primary"""
+        return self.primary.get_connection(timeout=timeout)
+
+    def status(self):
+        self._use_replica()
+        with self._lock:
+            return {
+                'replica_configured': self.replica is not None,
+                'using_replica': self.replica is not None and self._reason is None,
+                'lag_seconds': self._lag,
+                'max_lag_seconds': self.max_lag,
+                'fallback_reason': self._reason,
+                'replica_reads': self.replica_reads,
+                'primary_reads': self.primary_reads,
+                'fallbacks': self.fallbacks
+            }
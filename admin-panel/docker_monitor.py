@@ -0,0 +1,298 @@
+"""
+Docker container monitor over the Engine API unix socket
+
+Keeps a cached container list that is reloaded when the Docker events
+stream reports a container change, and samples per-container CPU, memory,
+network and block I/O into ring buffers. Requests reuse one persistent
+HTTP connection to the daemon instead of spawning `docker` processes.
+"""
+
+import http.client
+import json
+import socket
+import threading
+import time
+from collections import deque
+from urllib.parse import quote
+
+CONTAINER_EVENTS = {'create', 'start', 'restart', 'die', 'stop', 'kill', 'pause', 'unpause',
+                    'destroy', 'rename', 'health_status'}
+
+
+class DockerUnavailable(Exception):
+    """Raised when the Docker daemon cannot be reached"""
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 connection over a unix domain socket"""
+
+    def __init__(self, socket_path, timeout=5.0):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerClient:
+    """Minimal Engine API client holding one keep-alive connection"""
+
+    def __init__(self, socket_path, timeout=5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """GET a JSON resource, reconnecting once if the kept-alive connection went away"""
+        with self._lock:
+            for attempt in range(2):
+                if self._conn is None:
+                    self._conn = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+                try:
+                    self._conn.request('GET', path)
+                    response = self._conn.getresponse()
+                    body = response.read()
+                except (OSError, http.client.HTTPException) as e:
+                    self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise DockerUnavailable(str(e))
+                    continue
+                if response.status >= 400:
+                    raise DockerUnavailable(f'{path} returned HTTP {response.status}')
+                return json.loads(body)
+
+    def events(self, filters):
+        """Yield decoded events from the streaming /events endpoint on a dedicated connection"""
+        conn = UnixHTTPConnection(self.socket_path, timeout=None)
+        try:
+            conn.request('GET', f'/events?filters={quote(json.dumps(filters))}')
+            response = conn.getresponse()
+            if response.status >= 400:
+                raise DockerUnavailable(f'/events returned HTTP {response.status}')
+            # Events arrive as newline-delimited JSON over a chunked response
+            while True:
+                line = response.readline()
+                if not line:
+                    return
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def format_ports(ports):
+    """Render Engine API port mappings the way `docker ps` does"""
+    rendered = []
+    for port in ports or []:
+        private = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        if port.get('PublicPort'):
+            rendered.append(f"{port.get('IP', '0.0.0.0')}:{port['PublicPort']}->{private}")
+        else:
+            rendered.append(private)
+    return ', '.join(sorted(set(rendered)))
+
+
+def summarize_stats(stats, previous=None):
+    """Reduce a one-shot stats document to CPU %, memory, network and block I/O"""
+    cpu_stats = stats.get('cpu_stats') or {}
+    total_usage = (cpu_stats.get('cpu_usage') or {}).get('total_usage', 0)
+    system_usage = cpu_stats.get('system_cpu_usage', 0)
+    online_cpus = cpu_stats.get('online_cpus') or len((cpu_stats.get('cpu_usage') or {}).get('percpu_usage') or []) or 1
+
+    # One-shot samples carry no precpu_stats, so diff against our own previous sample
+    cpu_percent = 0.0
+    if previous is not None:
+        cpu_delta = total_usage - previous['cpu_total']
+        system_delta = system_usage - previous['system_total']
+        if cpu_delta > 0 and system_delta > 0:
+            cpu_percent = cpu_delta / system_delta * online_cpus * 100
+
+    memory = stats.get('memory_stats') or {}
+    memory_cache = (memory.get('stats') or {}).get('inactive_file', (memory.get('stats') or {}).get('cache', 0))
+    memory_usage = max(0, memory.get('usage', 0) - memory_cache)
+    memory_limit = memory.get('limit', 0)
+
+    rx_bytes = tx_bytes = 0
+    for network in (stats.get('networks') or {}).values():
+        rx_bytes += network.get('rx_bytes', 0)
+        tx_bytes += network.get('tx_bytes', 0)
+
+    read_bytes = write_bytes = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            read_bytes += entry.get('value', 0)
+        elif op == 'write':
+            write_bytes += entry.get('value', 0)
+
+    return {
+        'timestamp': time.time(),
+        'cpu_percent': round(cpu_percent, 2),
+        'cpu_total': total_usage,
+        'system_total': system_usage,
+        'memory_usage': memory_usage,
+        'memory_limit': memory_limit,
+        'memory_percent': round(memory_usage / memory_limit * 100, 2) if memory_limit else 0,
+        'net_rx_bytes': rx_bytes,
+        'net_tx_bytes': tx_bytes,
+        'block_read_bytes': read_bytes,
+        'block_write_bytes': write_bytes,
+        'pids': (stats.get('pids_stats') or {}).get('current', 0)
+    }
+
+
+class DockerMonitor:
+    """Event-driven container list plus periodic per-container stats"""
+
+    def __init__(self, socket_path='/var/run/docker.sock', stats_interval=10.0, history_size=360,
+                 containers=None):
+        self.client = DockerClient(socket_path)
+        self.stats_interval = float(stats_interval)
+        self.history_size = int(history_size)
+        # Only these container names get stats sampled (all running ones if empty)
+        self.watched = set(containers or [])
+
+        self._lock = threading.Lock()
+        self._containers = None
+        self._stats = {}
+        self._error = None
+        self._threads = []
+        self.list_refreshes = 0
+        self.events_seen = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads and all(thread.is_alive() for thread in self._threads):
+                return
+            self._threads = [
+                threading.Thread(target=self._watch_events, name='docker-events', daemon=True),
+                threading.Thread(target=self._collect_stats, name='docker-stats', daemon=True)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def refresh_containers(self):
+        """Reload the container list from the daemon"""
+        try:
+            # Running containers only, like `docker ps`
+            raw = self.client.get('/containers/json?all=0')
+        except DockerUnavailable as e:
+            with self._lock:
+                self._error = str(e)
+            raise
+
+        containers = {}
+        for item in raw:
+            name = (item.get('Names') or ['/unknown'])[0].lstrip('/')
+            containers[item['Id']] = {
+                'id': item['Id'][:12],
+                'full_id': item['Id'],
+                'name': name,
+                'image': item.get('Image', 'Unknown'),
+                'state': item.get('State', ''),
+                'status': item.get('Status', 'Unknown'),
+                'ports': format_ports(item.get('Ports'))
+            }
+        with self._lock:
+            self._containers = containers
+            self._error = None
+            self.list_refreshes += 1
+            for container_id in list(self._stats):
+                if container_id not in containers:
+                    del self._stats[container_id]
+
+    def _watch_events(self):
+        backoff = 1.0
+        while True:
+            try:
+                self.refresh_containers()
+                for event in self.client.events({'type': ['container']}):
+                    backoff = 1.0
+                    with self._lock:
+                        self.events_seen += 1
+                    if event.get('Action', event.get('status', '')).split(':')[0] in CONTAINER_EVENTS:
+                        self.refresh_containers()
+            except Exception as e:
+                with self._lock:
+                    self._error = str(e)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def _collect_stats(self):
+        while True:
+            self.sample_stats()
+            time.sleep(self.stats_interval)
+
+    def sample_stats(self):
+        """Take one stats sample of every watched running container"""
+        with self._lock:
+            running = [
+                container for container in (self._containers or {}).values()
+                if container['state'] == 'running'
+                and (not self.watched or container['name'] in self.watched)
+            ]
+        for container in running:
+            try:
+                raw = self.client.get(f"/containers/{container['full_id']}/stats?stream=false&one-shot=true")
+            except DockerUnavailable:
+                continue
+            with self._lock:
+                history = self._stats.setdefault(container['full_id'], deque(maxlen=self.history_size))
+                history.append(summarize_stats(raw, history[-1] if history else None))
+
+    def _public_sample(self, sample):
+        return {key: value for key, value in sample.items() if key not in ('cpu_total', 'system_total')}
+
+    def containers(self):
+        """Cached containers with their latest stats sample; loads the list on first use"""
+        self.start()
+        with self._lock:
+            loaded = self._containers is not None
+        if not loaded:
+            self.refresh_containers()
+
+        with self._lock:
+            result = []
+            for container_id, container in self._containers.items():
+                history = self._stats.get(container_id)
+                item = {key: value for key, value in container.items() if key != 'full_id'}
+                item['stats'] = self._public_sample(history[-1]) if history else None
+                result.append(item)
+        return sorted(result, key=lambda container: container['name'])
+
+    def history(self, name, limit=None):
+        """Stats samples for one container, oldest first, or None if unknown"""
+        with self._lock:
+            for container_id, container in (self._containers or {}).items():
+                if container['name'] == name or container['id'] == name:
+                    samples = list(self._stats.get(container_id, []))
+                    break
+            else:
+                return None
+        if limit is not None:
+            samples = samples[-limit:]
+        return [self._public_sample(sample) for sample in samples]
+
+    def status(self):
+        with self._lock:
+            return {
+                'connected': self._containers is not None and self._error is None,
+                'error': self._error,
+                'containers': len(self._containers or {}),
+                'sampled': len(self._stats),
+                'list_refreshes': self.list_refreshes,
+                'events_seen': self.events_seen,
+                'stats_interval': self.stats_interval
+            }
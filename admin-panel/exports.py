@@ -0,0 +1,206 @@
+"""
+Streaming bulk exports of game tables
+
+Each dataset is read through an unbuffered cursor in fetchmany batches and
+encoded batch by batch as CSV, NDJSON or (when pyarrow is installed) Arrow
+IPC or Parquet, so an export of millions of rows uses the memory of one
+batch. The WSGI server only asks for the next chunk once the previous one
+has been written to the client, which paces the cursor to the client.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# name -> table, (column, type) pairs, filters {arg: (clause, cast)}, ORDER BY
+EXPORTS = {
+    'users': {
+        'table': 'user',
+        'columns': [('id', 'int'), ('user_name', 'str'), ('email', 'str'), ('status', 'str'),
+                    ('admin_status', 'str'), ('level', 'int'), ('creation_time', 'datetime'),
+                    ('last_active', 'datetime')],
+        'filters': {'status': ('status = %s', str), 'min_id': ('id >= %s', int)},
+        'order': 'id'
+    },
+    'user_ips': {
+        'table': 'user_ip',
+        'columns': [('user', 'int'), ('ip', 'str'), ('occurrence', 'int'), ('last_update', 'datetime')],
+        'filters': {'user': ('user = %s', int)},
+        'order': 'user, ip'
+    },
+    'links': {
+        'table': 'link',
+        'columns': [('id', 'int'), ('airline', 'int'), ('from_airport', 'int'), ('to_airport', 'int'),
+                    ('distance', 'float'), ('flight_type', 'int'), ('frequency', 'int'),
+                    ('duration', 'int'), ('quality', 'int'),
+                    ('price_economy', 'int'), ('price_business', 'int'), ('price_first', 'int'),
+                    ('capacity_economy', 'int'), ('capacity_business', 'int'), ('capacity_first', 'int'),
+                    ('sold_seats_economy', 'int'), ('sold_seats_business', 'int'),
+                    ('sold_seats_first', 'int')],
+        'filters': {'airline': ('airline = %s', int), 'min_id': ('id >= %s', int)},
+        'order': 'id'
+    },
+    'fleets': {
+        'table': 'airplane',
+        'columns': [('id', 'int'), ('owner', 'int'), ('model', 'int'), ('constructed_cycle', 'int'),
+                    ('airplane_condition', 'float'), ('depreciation_rate', 'int'), ('value', 'int'),
+                    ('is_sold', 'int'), ('dealer_ratio', 'float'), ('purchase_date', 'datetime'),
+                    ('configuration', 'int')],
+        'filters': {'airline': ('owner = %s', int), 'min_id': ('id >= %s', int)},
+        'order': 'id'
+    },
+    'link_consumption': {
+        'table': 'link_consumption',
+        'columns': [('cycle', 'int'), ('link', 'int'), ('airline', 'int'), ('passenger_count', 'int'),
+                    ('sold_seats_economy', 'int'), ('sold_seats_business', 'int'),
+                    ('sold_seats_first', 'int'), ('revenue', 'int'), ('profit', 'int')],
+        'filters': {'cycle': ('cycle = %s', int), 'from_cycle': ('cycle >= %s', int),
+                    'to_cycle': ('cycle <= %s', int), 'airline': ('airline = %s', int)},
+        # Without a cycle filter, export the latest cycle only
+        'default_filter': 'cycle = (SELECT MAX(cycle) FROM link_consumption)',
+        # No unique key to order by without a filesort; rows come in index order
+        'order': None
+    }
+}
+
+
+def build_export_query(name, args, max_rows):
+    """SQL and parameters for one export; raises KeyError/ValueError on bad input"""
+    spec = EXPORTS[name]
+    conditions, params = [], []
+    for arg, (clause, cast) in spec['filters'].items():
+        value = args.get(arg)
+        if value not in (None, ''):
+            conditions.append(clause)
+            params.append(cast(value))
+    if not conditions and spec.get('default_filter'):
+        conditions.append(spec['default_filter'])
+
+    columns = ', '.join(f'`{column}`' for column, _ in spec['columns'])
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order_clause = f"ORDER BY {spec['order']}" if spec['order'] else ""
+    return f"SELECT {columns} FROM `{spec['table']}` {where_clause} {order_clause} LIMIT %s", params + [max_rows]
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_ndjson(columns, batches):
+    for rows in batches:
+        yield ''.join(json.dumps({key: _plain(value) for key, value in row.items()}) + '\n'
+                      for row in rows).encode()
+
+
+def encode_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _ in columns])
+    for rows in batches:
+        for row in rows:
+            writer.writerow([_plain(row[column]) for column, _ in columns])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _arrow_schema(columns):
+    types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string(),
+             'datetime': pyarrow.timestamp('s')}
+    return pyarrow.schema([(column, types[kind]) for column, kind in columns])
+
+
+def _arrow_batch(schema, rows):
+    data = [{key: float(value) if isinstance(value, Decimal) else value for key, value in row.items()}
+            for row in rows]
+    return pyarrow.RecordBatch.from_pylist(data, schema=schema)
+
+
+def _drain(sink):
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return chunk
+
+
+def encode_arrow(columns, batches):
+    schema = _arrow_schema(columns)
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_arrow_batch(schema, rows))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def encode_parquet(columns, batches):
+    schema = _arrow_schema(columns)
+    sink = io.BytesIO()
+    # One row group per batch, handed to the client as soon as it is written
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_arrow_batch(schema, rows))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+# format -> (mimetype, file extension, encoder, needs pyarrow)
+FORMATS = {
+    'csv': ('text/csv', 'csv', encode_csv, False),
+    'ndjson': ('application/x-ndjson', 'ndjson', encode_ndjson, False),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows', encode_arrow, True),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', encode_parquet, True)
+}
+
+
+def available_formats():
+    return [name for name, (_, _, _, needs_arrow) in FORMATS.items() if pyarrow is not None or not needs_arrow]
+
+
+def stream_export(get_connection, name, args, max_rows, batch_size, fmt):
+    """Generator of encoded chunks for one export, holding one connection while it runs"""
+    sql, params = build_export_query(name, args, max_rows)
+    columns = EXPORTS[name]['columns']
+    encoder = FORMATS[fmt][2]
+
+    def batches(cursor):
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    def generate():
+        conn = get_connection()
+        # Unbuffered cursor: rows are pulled from the server batch by batch
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        finished = False
+        try:
+            cursor.execute(sql, params)
+            yield from encoder(columns, batches(cursor))
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+                conn.close()
+            else:
+                # Stopped mid-result (client went away or an error): draining the
+                # rest of an unbuffered result could take minutes, so drop the connection
+                conn.invalidate()
+
+    return generate()
@@ -0,0 +1,178 @@
+"""
+Concurrent fan-out of independent queries
+
+Multi-query endpoints hand a dict of named queries to QueryFanout, which
+runs each one on its own pooled connection over a bounded thread pool. The
+caller waits at most until the endpoint's deadline and gets back whatever
+finished; queries that failed or ran past the deadline are reported by name
+instead of failing the whole panel, and overrunning statements are killed
+on the server.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def fetch_value(sql, params=None):
+    """Query reducing to the first column of the first row (None if no rows)"""
+    def run(cursor):
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return next(iter(row.values())) if isinstance(row, dict) else row[0]
+    return run
+
+
+def fetch_one(sql, params=None):
+    """Query reducing to its first row"""
+    def run(cursor):
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+    return run
+
+
+def fetch_all(sql, params=None):
+    """Query reducing to all of its rows"""
+    def run(cursor):
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    return run
+
+
+class FanoutResult:
+    """Values of the queries that finished, and errors for the ones that did not"""
+
+    def __init__(self, values, errors, elapsed):
+        self.values = values
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def partial(self):
+        return bool(self.errors)
+
+    def get(self, name, default=None):
+        value = self.values.get(name)
+        return default if value is None else value
+
+    def annotate(self, data):
+        """Add partial-result markers to a response dict"""
+        if self.errors:
+            data['partial'] = True
+            data['errors'] = dict(self.errors)
+        return data
+
+
+class _Task:
+    __slots__ = ('connection_id', 'pool', 'finished')
+
+    def __init__(self):
+        self.connection_id = None
+        # Pool the task's connection came from; a KILL must go to the same server
+        self.pool = None
+        self.finished = False
+
+
+class QueryFanout:
+    """Runs named queries concurrently on pooled connections under a deadline"""
+
+    def __init__(self, get_connection, workers=4):
+        self._get_connection = get_connection
+        self.workers = max(1, int(workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fanout')
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.queries = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.kills = 0
+
+    def _execute(self, task, query, deadline):
+        conn = self._get_connection(timeout=max(0.0, deadline - time.monotonic()))
+        try:
+            task.connection_id = getattr(conn, 'connection_id', None)
+            task.pool = getattr(conn, 'pool', None)
+            cursor = conn.cursor(dictionary=True)
+            try:
+                return query(cursor)
+            finally:
+                cursor.close()
+        finally:
+            task.finished = True
+            conn.close()
+
+    def run(self, queries, deadline=10.0):
+        """Run {name: query(cursor)} concurrently; wait at most `deadline` seconds"""
+        started = time.monotonic()
+        until = started + deadline
+        tasks = {}
+        futures = {}
+        for name, query in queries.items():
+            task = _Task()
+            # Each task runs in a copy of the caller's context so query
+            # listeners still attribute its queries to the current request
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._execute, task, query, until)
+            tasks[name] = task
+            futures[future] = name
+
+        done, pending = wait(futures, timeout=max(0.0, until - time.monotonic()))
+
+        values = {}
+        errors = {}
+        for future in done:
+            name = futures[future]
+            try:
+                values[name] = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+        for future in pending:
+            name = futures[future]
+            errors[name] = f'timed out after {deadline:g}s'
+            if not future.cancel():
+                self._kill(tasks[name])
+
+        with self._lock:
+            self.runs += 1
+            self.queries += len(queries)
+            self.timeouts += len(pending)
+            self.failures += len(errors) - len(pending)
+        return FanoutResult(values, errors, time.monotonic() - started)
+
+    def _kill(self, task):
+        """Best-effort KILL QUERY for a statement that outlived its deadline"""
+        if task.connection_id is None or task.pool is None or task.finished:
+            return
+        try:
+            # Not the fan-out's own get_connection: a read router may hand out
+            # a connection to another server, where the id is someone else's
+            conn = task.pool.get_connection(timeout=1.0)
+        except Exception:
+            # Better to let the statement run out than to kill a guessed thread
+            return
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f'KILL QUERY {int(task.connection_id)}')
+            finally:
+                cursor.close()
+            with self._lock:
+                self.kills += 1
+        except Exception as e:
+            print(f'Could not kill overrunning query: {e}')
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'runs': self.runs,
+                'queries': self.queries,
+                'failures': self.failures,
+                'timeouts': self.timeouts,
+                'kills': self.kills
+            }
@@ -0,0 +1,65 @@
+"""
+Sparse fieldsets and columnar payloads for list endpoints
+
+A FieldSet names the fields a list endpoint can return and the SQL
+expression behind each, so `fields=` only selects what the client asked
+for. Some fields are derived after the query from another field (airport
+codes from airport ids). Rows are read as tuples and shaped once at the
+end, either as the usual list of objects or, with `format=columnar`, as
+column names plus row arrays (`orient=columns` gives one array per column).
+"""
+
+
+class FieldSet:
+    """Selectable fields of one endpoint: SQL-backed fields plus derived ones"""
+
+    def __init__(self, fields, derived=None, default=None):
+        # name -> SQL expression
+        self.fields = dict(fields)
+        # name -> (source field, derivation key)
+        self.derived = dict(derived or {})
+        self.names = list(self.fields) + list(self.derived)
+        # Returned when `fields=` is empty; other fields are opt-in
+        self.default = list(default or self.names)
+
+    def parse(self, value):
+        """Requested field names in request order (the default fields if none); ValueError on unknown"""
+        if not value:
+            return list(self.default)
+        names = []
+        for name in value.split(','):
+            name = name.strip()
+            if not name or name in names:
+                continue
+            if name not in self.fields and name not in self.derived:
+                raise ValueError(f'Unknown field: {name}')
+            names.append(name)
+        return names or list(self.default)
+
+    def sql_fields(self, names):
+        """SQL-backed fields to select for `names`, including sources of derived fields"""
+        needed = []
+        for name in names:
+            source = self.derived[name][0] if name in self.derived else name
+            if source not in needed:
+                needed.append(source)
+        return needed
+
+    def select_list(self, sql_fields):
+        return ', '.join(f'{self.fields[name]} as `{name}`' for name in sql_fields)
+
+
+def shape_rows(key, names, columns, fmt=None, orient=None):
+    """Response body for `columns` ({name: values}) restricted to `names`"""
+    if fmt == 'columnar':
+        if orient == 'columns':
+            return {'columns': {name: columns[name] for name in names}}
+        return {'columns': names, 'data': [list(row) for row in zip(*(columns[name] for name in names))]}
+    return {key: [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))]}
+
+
+def columns_from_rows(sql_fields, rows):
+    """Transpose tuple rows into {field: values}"""
+    if not rows:
+        return {name: [] for name in sql_fields}
+    return {name: list(values) for name, values in zip(sql_fields, zip(*rows))}
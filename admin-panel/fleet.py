@@ -0,0 +1,161 @@
+"""
+Resource samples pushed by metrics agents on other hosts
+
+Each game host (database, simulation, airline-web) runs system_metrics.py in
+agent mode and pushes batches of samples here. Hosts register first, and
+every push doubles as a heartbeat; a host that has not pushed for its
+heartbeat timeout is reported as down. Samples are kept in a fixed number
+of slots per host in a local SQLite file, so every gunicorn worker sees the
+same ring buffers whichever worker received the push.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+class UnknownHost(Exception):
+    """Raised when samples arrive for a host that has not registered"""
+
+
+class FleetRegistry:
+    """Registered hosts and a ring buffer of `history_size` samples for each"""
+
+    def __init__(self, path, history_size=3600, heartbeat_timeout=30.0):
+        self.path = path
+        self.history_size = int(history_size)
+        self.heartbeat_timeout = float(heartbeat_timeout)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fleet_host (
+                    host TEXT PRIMARY KEY,
+                    registered_at REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    push_interval REAL NOT NULL,
+                    samples INTEGER NOT NULL DEFAULT 0,
+                    info TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fleet_sample (
+                    host TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (host, slot)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def register(self, host, info=None, push_interval=10.0):
+        """Add or update a host; registering again keeps its samples"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO fleet_host (host, registered_at, last_seen, push_interval, info)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (host) DO UPDATE SET
+                    registered_at = excluded.registered_at,
+                    last_seen = excluded.last_seen,
+                    push_interval = excluded.push_interval,
+                    info = excluded.info
+            """, (host, now, now, float(push_interval), json.dumps(info or {})))
+
+    def push(self, host, samples):
+        """Store samples (oldest first) in the host's ring buffer; raises UnknownHost"""
+        now = time.time()
+        samples = samples[-self.history_size:]
+        with self._connect() as conn:
+            # Claim the slots first: the UPDATE takes the write lock, so
+            # concurrent pushes from several workers get consecutive slots
+            updated = conn.execute(
+                "UPDATE fleet_host SET samples = samples + ?, last_seen = ? WHERE host = ?",
+                (len(samples), now, host)
+            ).rowcount
+            if not updated:
+                raise UnknownHost(host)
+            total = conn.execute("SELECT samples FROM fleet_host WHERE host = ?", (host,)).fetchone()[0]
+            first = total - len(samples)
+            conn.executemany(
+                "INSERT OR REPLACE INTO fleet_sample (host, slot, timestamp, data) VALUES (?, ?, ?, ?)",
+                [(host, (first + i) % self.history_size, sample['timestamp'], json.dumps(sample))
+                 for i, sample in enumerate(samples)]
+            )
+        return len(samples)
+
+    def forget(self, host):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fleet_sample WHERE host = ?", (host,))
+            return conn.execute("DELETE FROM fleet_host WHERE host = ?", (host,)).rowcount > 0
+
+    def _host_status(self, row, now):
+        host, registered_at, last_seen, push_interval, samples, info = row
+        # Allow a few missed pushes for agents that batch over long intervals
+        timeout = max(self.heartbeat_timeout, 3 * push_interval)
+        return {
+            'host': host,
+            'status': 'up' if now - last_seen <= timeout else 'down',
+            'registered_at': registered_at,
+            'last_seen': last_seen,
+            'seconds_since_seen': round(now - last_seen, 1),
+            'heartbeat_timeout': timeout,
+            'samples_received': samples,
+            'info': json.loads(info)
+        }
+
+    def host(self, host):
+        """Registration and liveness of one host, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT host, registered_at, last_seen, push_interval, samples, info FROM fleet_host WHERE host = ?",
+                (host,)
+            ).fetchone()
+        return self._host_status(row, time.time()) if row else None
+
+    def hosts(self):
+        """Every registered host with its status and latest sample, by host name"""
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT host, registered_at, last_seen, push_interval, samples, info FROM fleet_host ORDER BY host"
+            ).fetchall()
+            latest = dict(conn.execute("""
+                SELECT s.host, s.data FROM fleet_sample s
+                JOIN (SELECT host, MAX(timestamp) AS timestamp FROM fleet_sample GROUP BY host) m
+                  ON m.host = s.host AND m.timestamp = s.timestamp
+            """).fetchall())
+        result = []
+        for row in rows:
+            status = self._host_status(row, now)
+            status['latest'] = json.loads(latest[row[0]]) if row[0] in latest else None
+            result.append(status)
+        return result
+
+    def latest(self, host):
+        """Most recent sample from `host`, or None"""
+        samples = self.history(host, 1)
+        return samples[0] if samples else None
+
+    def history(self, host, limit=None):
+        """Up to `limit` most recent samples from `host`, oldest first"""
+        limit = self.history_size if limit is None else max(0, int(limit))
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM fleet_sample WHERE host = ? ORDER BY timestamp DESC LIMIT ?",
+                (host, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
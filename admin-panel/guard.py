@@ -0,0 +1,205 @@
+"""
+Load protection between the admin panel and the game database
+
+ConcurrencyLimiter caps how many database-backed requests run at once,
+overall and per endpoint, queueing briefly before shedding the rest.
+CircuitBreaker opens after repeated timeout-class database errors, lets a
+single probe through once it has cooled down, and closes again when the
+probe succeeds. While it is open, or a request is shed, LastKnownGood holds
+the last successful response for each URL so it can be served marked stale
+instead of adding load to a struggling database.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from db_pool import PoolTimeout
+
+# MySQL errors that mean the database is slow or unreachable rather than the
+# query being wrong: statement timeout, interrupted (killed), lock wait
+# timeout, can't connect, server gone away, lost connection
+OVERLOAD_ERRNOS = {3024, 1317, 1205, 2003, 2006, 2013}
+
+
+def is_overload_error(error):
+    """Whether `error` says the database is overloaded or unreachable"""
+    return isinstance(error, PoolTimeout) or getattr(error, 'errno', None) in OVERLOAD_ERRNOS
+
+
+class Overloaded(Exception):
+    """Raised when a request could not get a concurrency slot in time"""
+
+
+class ConcurrencyLimiter:
+    """Global and per-endpoint caps on concurrent requests, with a bounded wait"""
+
+    def __init__(self, max_concurrent, queue_timeout=2.0, endpoint_limits=None):
+        self.max_concurrent = int(max_concurrent)
+        self.queue_timeout = float(queue_timeout)
+        self._global = threading.BoundedSemaphore(self.max_concurrent)
+        self._endpoint_limits = dict(endpoint_limits or {})
+        self._endpoints = {
+            endpoint: threading.BoundedSemaphore(limit)
+            for endpoint, limit in self._endpoint_limits.items() if limit
+        }
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def acquire(self, endpoint):
+        """Wait up to queue_timeout for an endpoint slot and a global slot; raises Overloaded"""
+        deadline = time.monotonic() + self.queue_timeout
+        endpoint_slot = self._endpoints.get(endpoint)
+        with self._lock:
+            self.queued += 1
+        try:
+            if endpoint_slot is not None and not endpoint_slot.acquire(timeout=self.queue_timeout):
+                raise Overloaded(f'{endpoint} is at its limit of {self._endpoint_limits[endpoint]} concurrent requests')
+            if not self._global.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                if endpoint_slot is not None:
+                    endpoint_slot.release()
+                raise Overloaded(f'{self.max_concurrent} database requests already running')
+        except Overloaded:
+            with self._lock:
+                self.shed += 1
+            raise
+        finally:
+            with self._lock:
+                self.queued -= 1
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self, endpoint):
+        self._global.release()
+        endpoint_slot = self._endpoints.get(endpoint)
+        if endpoint_slot is not None:
+            endpoint_slot.release()
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'queue_timeout': self.queue_timeout,
+                'endpoint_limits': self._endpoint_limits,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'shed': self.shed
+            }
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` failures within `window` seconds"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, window=30.0, reset_timeout=30.0):
+        self.failure_threshold = int(failure_threshold)
+        self.window = float(window)
+        self.reset_timeout = float(reset_timeout)
+        self._lock = threading.Lock()
+        self._failures = deque()
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """(allowed, probe): whether a request may use the database, and if it is the probe"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True, False
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True, True
+            self.rejected += 1
+            return False, False
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self.opened += 1
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if self._state == self.CLOSED and len(self._failures) >= self.failure_threshold:
+                self._failures.clear()
+                self._open()
+
+    def end_probe(self):
+        """The probe ran its queries without error; close unless it recorded a failure"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures.clear()
+            self._probing = False
+
+    def abort_probe(self):
+        """The probe finished without testing the database; the next request probes instead"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'recent_failures': len(self._failures),
+                'failure_threshold': self.failure_threshold,
+                'window': self.window,
+                'reset_timeout': self.reset_timeout,
+                'open_for': round(time.monotonic() - self._opened_at, 1) if self._state != self.CLOSED else None,
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
+
+class LastKnownGood:
+    """Most recent successful response body per URL, bounded by total size"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = (body, mimetype, time.time())
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (old_body, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(old_body)
+
+    def get(self, key):
+        """(body, mimetype, stored_at) or None"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for the admin panel production server
+
+Every setting can be overridden with an environment variable so the same
+image works for small and large deployments.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '9001')}"
+
+# Threaded workers: slow endpoints (/api/bots, /api/containers) occupy one
+# thread while the rest of the dashboard keeps being served
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_WORKERS', min(4, multiprocessing.cpu_count() * 2)))
+threads = int(os.getenv('WEB_THREADS', 8))
+
+# Seconds a request may run before its worker is restarted
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+# Seconds in-flight requests get to finish on SIGTERM / restart
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+# Seconds to hold idle keep-alive connections open for the dashboard's polling
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
@@ -0,0 +1,117 @@
+"""
+Bot personality classification from a single rule table
+
+The thresholds from BotAISimulation.scala live in RULES. The same table
+renders a SQL CASE expression (so counts come back from one GROUP BY), a
+NumPy classifier over column arrays, and a plain per-row classifier.
+check_rules() compares every path with the reference function over the
+rule boundaries, so the Python and SQL versions cannot silently drift.
+"""
+
+import itertools
+import sqlite3
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PERSONALITIES = ('AGGRESSIVE', 'CONSERVATIVE', 'BALANCED', 'REGIONAL', 'PREMIUM', 'BUDGET')
+DEFAULT_PERSONALITY = 'BALANCED'
+FIELDS = ('balance', 'reputation', 'service_quality')
+
+# Balances are compared in units of 10M (the simulation's cash ratio)
+CASH_UNIT = 10000000
+
+# First matching rule wins. Conditions are (field, operator, threshold);
+# "!= 0" mirrors the simulation treating a zero stat as missing.
+RULES = (
+    ('PREMIUM', (('service_quality', '>', 70),)),
+    ('BUDGET', (('balance', '<', 2 * CASH_UNIT), ('reputation', '!=', 0), ('reputation', '<', 30))),
+    ('CONSERVATIVE', (('reputation', '>', 70),)),
+    ('AGGRESSIVE', (('balance', '>', 10 * CASH_UNIT),)),
+    ('REGIONAL', (('service_quality', '!=', 0), ('service_quality', '<', 40))),
+)
+
+_OPERATORS = {
+    '>': lambda value, threshold: value > threshold,
+    '<': lambda value, threshold: value < threshold,
+    '!=': lambda value, threshold: value != threshold
+}
+
+
+def classify(balance, reputation, service_quality):
+    """Personality of one bot (missing stats count as 0)"""
+    values = {'balance': float(balance or 0), 'reputation': float(reputation or 0),
+              'service_quality': float(service_quality or 0)}
+    for personality, conditions in RULES:
+        if all(_OPERATORS[op](values[field], threshold) for field, op, threshold in conditions):
+            return personality
+    return DEFAULT_PERSONALITY
+
+
+def case_expression(columns):
+    """SQL CASE over `columns` ({field: SQL expression}) yielding the personality name"""
+    branches = []
+    for personality, conditions in RULES:
+        test = ' AND '.join(f'COALESCE({columns[field]}, 0) {op} {threshold}'
+                            for field, op, threshold in conditions)
+        branches.append(f"WHEN {test} THEN '{personality}'")
+    return f"CASE {' '.join(branches)} ELSE '{DEFAULT_PERSONALITY}' END"
+
+
+def classify_arrays(balance, reputation, service_quality):
+    """Personalities for whole columns at once; NumPy when installed, else row by row"""
+    if numpy is None:
+        return [classify(*row) for row in zip(balance, reputation, service_quality)]
+    values = {
+        field: numpy.nan_to_num(numpy.array(column, dtype=float))
+        for field, column in zip(FIELDS, (balance, reputation, service_quality))
+    }
+    conditions = [
+        numpy.logical_and.reduce([_OPERATORS[op](values[field], threshold) for field, op, threshold in rule])
+        for _, rule in RULES
+    ]
+    labels = numpy.select(conditions, [personality for personality, _ in RULES], DEFAULT_PERSONALITY)
+    return labels.tolist()
+
+
+def classify_rows(rows):
+    """Add a 'personality' key to each row dict, classifying all of them in one pass"""
+    labels = classify_arrays(*([row.get(field) for row in rows] for field in FIELDS))
+    for row, label in zip(rows, labels):
+        row['personality'] = label
+    return rows
+
+
+def _boundary_cases():
+    """Stat combinations on and around every threshold in RULES"""
+    points = {field: {0, 1, -1} for field in FIELDS}
+    for _, conditions in RULES:
+        for field, _, threshold in conditions:
+            points[field].update((threshold - 1, threshold - 0.01, threshold, threshold + 0.01, threshold + 1))
+    return list(itertools.product(*(sorted(points[field]) for field in FIELDS)))
+
+
+def check_rules(reference):
+    """Raise AssertionError if any classifier path disagrees with `reference`"""
+    cases = _boundary_cases()
+    expected = [reference(*case) for case in cases]
+
+    if [classify(*case) for case in cases] != expected:
+        raise AssertionError('personality RULES disagree with the reference classifier')
+    if classify_arrays(*zip(*cases)) != expected:
+        raise AssertionError('vectorized personality classifier disagrees with the reference classifier')
+
+    # The CASE expression is plain SQL, so SQLite can evaluate it without the game database
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute('CREATE TABLE bots (n INTEGER, balance REAL, reputation REAL, service_quality REAL)')
+        conn.executemany('INSERT INTO bots VALUES (?, ?, ?, ?)',
+                         [(n,) + case for n, case in enumerate(cases)])
+        expression = case_expression({field: field for field in FIELDS})
+        labels = [row[0] for row in conn.execute(f'SELECT {expression} FROM bots ORDER BY n')]
+    finally:
+        conn.close()
+    if labels != expected:
+        raise AssertionError('SQL personality CASE expression disagrees with the reference classifier')
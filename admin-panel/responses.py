@@ -0,0 +1,165 @@
+"""
+Response pipeline: native JSON encoding, compression and ETag revalidation
+
+FastJSONProvider serializes with orjson when it is installed (stdlib json
+otherwise) and writes datetimes as ISO 8601 and Decimals as numbers, so
+endpoints can jsonify database rows as they come. ResponsePipeline then
+gives every complete GET response a strong ETag, answers a matching
+If-None-Match with 304, and compresses larger bodies with brotli (when
+installed) or gzip, whichever the client accepts.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/html', 'text/css',
+                      'text/plain', 'text/javascript')
+
+
+def json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider writing ISO datetimes and numeric Decimals, via orjson when available"""
+
+    def _pretty(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', json_default)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=self._options()).decode()
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._pretty():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # Bytes straight into the response, without a str round trip
+        body = orjson.dumps(obj, default=json_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class ResponsePipeline:
+    """after_request hook adding ETags, 304 revalidation and negotiated compression"""
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, cache_size=128):
+        self.min_size = int(min_size)
+        self.gzip_level = int(gzip_level)
+        self.brotli_quality = int(brotli_quality)
+        self.cache_size = int(cache_size)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.compressed = 0
+        self.compressed_cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        app.json = FastJSONProvider(app)
+        # after_request hooks run in reverse registration order; register this
+        # before any other hook so it sees each response last
+        app.after_request(self.process)
+
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _negotiate(self):
+        accepted = request.accept_encodings
+        for encoding in self.encodings():
+            if accepted[encoding] > 0:
+                return encoding
+        return None
+
+    def _compress(self, tag, encoding, body):
+        key = (tag, encoding)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.compressed_cache_hits += 1
+                return cached
+        if encoding == 'br':
+            data = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            data = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(data)
+        return data
+
+    def process(self, response):
+        if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        body = response.get_data()
+        tag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        encoding = self._negotiate() if len(body) >= self.min_size else None
+        # Strong ETags are per representation, so each encoding gets its own
+        response.set_etag(tag if encoding is None else f'{tag}-{encoding}')
+        response.vary.add('Accept-Encoding')
+        if 'Cache-Control' not in response.headers:
+            # Let browsers keep the body but revalidate on every poll
+            response.headers['Cache-Control'] = 'no-cache'
+
+        response.make_conditional(request)
+        if response.status_code == 304:
+            with self._lock:
+                self.not_modified += 1
+            return response
+
+        if encoding is not None:
+            response.set_data(self._compress(tag, encoding, body))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'json_encoder': 'orjson' if orjson is not None else 'json',
+                'encodings': self.encodings(),
+                'min_size': self.min_size,
+                'not_modified': self.not_modified,
+                'compressed': self.compressed,
+                'compressed_cache_hits': self.compressed_cache_hits,
+                'compression_ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None
+            }
@@ -0,0 +1,160 @@
+"""
+Cycle-keyed snapshot store for game statistics
+
+Most game aggregates only change when the simulation advances a cycle.
+CycleSnapshots notices a new cycle, computes every cycle-scoped aggregate
+once and persists the result in a local SQLite file keyed by cycle, so
+endpoints read a precomputed snapshot and trend charts read the stored
+history instead of rescanning link_consumption.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class SnapshotStore:
+    """SQLite table of one JSON snapshot per cycle, pruned to `retention` cycles"""
+
+    def __init__(self, path, retention=2000):
+        self.path = path
+        self.retention = int(retention)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cycle_snapshot (
+                    cycle INTEGER PRIMARY KEY,
+                    computed_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row_to_snapshot(self, row):
+        if row is None:
+            return None
+        cycle, computed_at, data = row
+        return {'cycle': cycle, 'computed_at': computed_at, 'data': json.loads(data)}
+
+    def get(self, cycle):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cycle, computed_at, data FROM cycle_snapshot WHERE cycle = ?", (cycle,)
+            ).fetchone()
+        return self._row_to_snapshot(row)
+
+    def latest(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cycle, computed_at, data FROM cycle_snapshot ORDER BY cycle DESC LIMIT 1"
+            ).fetchone()
+        return self._row_to_snapshot(row)
+
+    def history(self, limit=100):
+        """Most recent `limit` snapshots, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT cycle, computed_at, data FROM cycle_snapshot ORDER BY cycle DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._row_to_snapshot(row) for row in reversed(rows)]
+
+    def save(self, cycle, data):
+        snapshot = {'cycle': cycle, 'computed_at': time.time(), 'data': data}
+        payload = json.dumps(data, default=_json_default)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cycle_snapshot (cycle, computed_at, data) VALUES (?, ?, ?)",
+                (cycle, snapshot['computed_at'], payload)
+            )
+            conn.execute(
+                "DELETE FROM cycle_snapshot WHERE cycle <= ?", (cycle - self.retention,)
+            )
+        # Round-trip so callers see the same types whether fresh or loaded
+        snapshot['data'] = json.loads(payload)
+        return snapshot
+
+
+class CycleSnapshots:
+    """Computes one snapshot per simulation cycle and serves it from the store"""
+
+    def __init__(self, store, read_cycle, compute, check_interval=10.0):
+        self.store = store
+        self._read_cycle = read_cycle
+        self._compute = compute
+        self.check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+        self._cycle = None
+        self._checked_at = 0.0
+        self._snapshot = None
+        self.computations = 0
+
+    def _current_cycle(self):
+        with self._lock:
+            if self._cycle is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._cycle
+        cycle = self._read_cycle()
+        with self._lock:
+            self._cycle = cycle
+            self._checked_at = time.monotonic()
+        return cycle
+
+    def _usable(self, cycle):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot['cycle'] != cycle:
+            return False
+        # Partial snapshots are only reused until the next retry
+        return not snapshot.get('partial') or time.time() - snapshot['computed_at'] < self.check_interval
+
+    def current(self):
+        """Snapshot for the current cycle, computing it if this is a new cycle"""
+        cycle = self._current_cycle()
+        with self._lock:
+            if self._usable(cycle):
+                return self._snapshot
+
+        # Only one thread computes; the others wait and pick up its result
+        with self._compute_lock:
+            with self._lock:
+                if self._usable(cycle):
+                    return self._snapshot
+            snapshot = self.store.get(cycle)
+            if snapshot is None:
+                data = self._compute(cycle)
+                self.computations += 1
+                if any(isinstance(section, dict) and section.get('partial') for section in data.values()):
+                    # Some queries failed or timed out: serve it, but never persist it
+                    snapshot = {'cycle': cycle, 'computed_at': time.time(), 'data': data, 'partial': True}
+                else:
+                    snapshot = self.store.save(cycle, data)
+            with self._lock:
+                self._snapshot = snapshot
+            return snapshot
+
+    def history(self, limit=100):
+        return self.store.history(limit)
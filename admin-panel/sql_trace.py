@@ -0,0 +1,122 @@
+"""
+Per-request SQL tracing and slow-query capture
+
+Every query issued while handling a request is recorded with its normalized
+SQL, a parameter fingerprint, duration and row count. Queries slower than a
+threshold go into a bounded slow-query log, and the first time a statement
+shape is seen there its EXPLAIN FORMAT=JSON plan is captured once in the
+background.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(query):
+    """Collapse whitespace and literals so equal statement shapes compare equal"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    normalized = _WHITESPACE.sub(' ', query).strip()
+    normalized = _STRING_LITERAL.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = normalized.replace('%s', '?')
+    return _PLACEHOLDER_LIST.sub('(...)', normalized)
+
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode('utf-8', 'replace')).hexdigest()[:12]
+
+
+def params_fingerprint(params):
+    if params is None:
+        return None
+    return fingerprint(repr(params))
+
+
+class SqlTracer:
+    """Collects per-request query traces and a bounded slow-query log"""
+
+    def __init__(self, run_explain, slow_threshold=0.5, slow_log_size=200, max_plans=500,
+                 max_trace_queries=500):
+        self._run_explain = run_explain
+        self.slow_threshold = float(slow_threshold)
+        self.max_trace_queries = int(max_trace_queries)
+        self._lock = threading.Lock()
+        self._slow = deque(maxlen=int(slow_log_size))
+        self._plans = OrderedDict()
+        self.max_plans = int(max_plans)
+
+    def record(self, trace, route, query, params, seconds, cursor, error, pool=None):
+        """Add one executed query to `trace` (a list, or None outside requests); `pool` ran it"""
+        normalized = normalize_sql(query)
+        if normalized.upper().startswith('EXPLAIN'):
+            return
+        entry = {
+            'sql': normalized,
+            'fingerprint': fingerprint(normalized),
+            'params_fingerprint': params_fingerprint(params),
+            'ms': round(seconds * 1000, 3),
+            'rows': getattr(cursor, 'rowcount', None),
+            'error': str(error) if error is not None else None
+        }
+        if trace is not None and len(trace) < self.max_trace_queries:
+            trace.append(entry)
+
+        if seconds >= self.slow_threshold:
+            self._record_slow(entry, route, query, params, pool)
+
+    def _record_slow(self, entry, route, query, params, pool):
+        slow = dict(entry, route=route, at=time.time())
+        with self._lock:
+            self._slow.append(slow)
+            if entry['fingerprint'] in self._plans:
+                return
+            # Placeholder until the plan arrives so each shape is explained once
+            self._plans[entry['fingerprint']] = {'sql': entry['sql'], 'plan': None, 'error': None}
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+        if entry['sql'].upper().startswith(('SELECT', 'WITH')):
+            threading.Thread(
+                target=self._explain, args=(entry['fingerprint'], query, params, pool),
+                name='sql-explain', daemon=True
+            ).start()
+
+    def _explain(self, key, query, params, pool):
+        try:
+            # Explained where it ran: a replica can plan differently from the primary
+            plan = self._run_explain(query, params, pool)
+            if isinstance(plan, (str, bytes)):
+                plan = json.loads(plan)
+            error = None
+        except Exception as e:
+            plan, error = None, str(e)
+        with self._lock:
+            if key in self._plans:
+                self._plans[key]['plan'] = plan
+                self._plans[key]['error'] = error
+
+    def slow_queries(self, limit=50):
+        """Most recent slow queries (newest first) with any captured plans"""
+        limit = max(1, int(limit))
+        with self._lock:
+            recent = list(self._slow)[-limit:][::-1]
+            plans = {entry['fingerprint']: dict(self._plans[entry['fingerprint']])
+                     for entry in recent if entry['fingerprint'] in self._plans}
+        return {'threshold_ms': self.slow_threshold * 1000, 'queries': recent, 'plans': plans}
+
+    @staticmethod
+    def server_timing(trace, total_seconds):
+        """Server-Timing header value for a request's trace"""
+        db_ms = sum(entry['ms'] for entry in trace)
+        return (f'db;dur={db_ms:.2f};desc="{len(trace)} queries", '
+                f'app;dur={total_seconds * 1000:.2f}')
@@ -0,0 +1,274 @@
+"""
+Server-Sent Events fan-out for dashboard panels
+
+One scheduler computes each registered panel on its own interval and pushes
+it to every connected client only when its content hash changes, so the
+load on MySQL and psutil does not grow with the number of open dashboards.
+With a state directory, only the worker process holding its lock file
+renders panels; it writes each changed panel there and the other workers
+pick it up and push it to their own clients, so render load does not grow
+with the number of workers either.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StreamFull(Exception):
+    """Raised when this worker already serves its maximum number of streams"""
+
+
+class _Panel:
+    def __init__(self, name, interval, path, fingerprint=None):
+        self.name = name
+        self.interval = float(interval)
+        self.path = path
+        # Optional data -> value hashed instead of the body, to ignore volatile fields
+        self.fingerprint = fingerprint
+        self.file_mtime = None
+        self.next_run = 0.0
+        self.running = False
+        self.version = 0
+        self.hash = None
+        self.message = None
+        self.updated_at = None
+
+
+class PanelBroadcaster:
+    """Computes panels on a schedule and broadcasts changed ones to subscribers"""
+
+    def __init__(self, render, tick=0.5, workers=4, queue_size=64, heartbeat=15.0,
+                 max_subscribers=None, state_dir=None, demand_timeout=5.0):
+        self._render = render
+        self.tick = float(tick)
+        self.queue_size = int(queue_size)
+        self.heartbeat = float(heartbeat)
+        # Each stream holds a server thread for as long as it is open
+        self.max_subscribers = int(max_subscribers) if max_subscribers else None
+        self.state_dir = state_dir
+        self.demand_timeout = float(demand_timeout)
+        self._lock_fd = None
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._panels = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='panel')
+        self._thread = None
+        self.computations = 0
+        self.broadcasts = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def register(self, name, interval, path, fingerprint=None):
+        """Add a panel computed from `path` every `interval` seconds"""
+        self._panels[name] = _Panel(name, interval, path, fingerprint)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='panel-scheduler', daemon=True)
+            self._thread.start()
+
+    def _is_renderer(self):
+        """Whether this process renders panels; with a state_dir only the lock holder does"""
+        if self.state_dir is None or self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.state_dir, 'renderer.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Held until this process exits; another worker then takes over
+        self._lock_fd = fd
+        return True
+
+    def _demand_path(self):
+        return os.path.join(self.state_dir, 'demand')
+
+    def _run(self):
+        while True:
+            try:
+                with self._lock:
+                    watched = bool(self._subscribers)
+                if self.state_dir is not None and watched:
+                    # Tell the renderer someone is watching in this worker
+                    with open(self._demand_path(), 'a'):
+                        os.utime(self._demand_path())
+                if self._is_renderer():
+                    self._schedule(watched or self._demanded())
+                else:
+                    self._follow()
+            except Exception as e:
+                print(f'Panel scheduler failed: {e}')
+            time.sleep(self.tick)
+
+    def _demanded(self):
+        if self.state_dir is None:
+            return False
+        try:
+            return time.time() - os.stat(self._demand_path()).st_mtime < self.demand_timeout
+        except FileNotFoundError:
+            return False
+
+    def _schedule(self, watched):
+        now = time.monotonic()
+        for panel in self._panels.values():
+            if not watched:
+                # Nobody is watching; recompute as soon as someone connects
+                panel.next_run = 0.0
+                continue
+            with self._lock:
+                if panel.running or now < panel.next_run:
+                    continue
+                panel.running = True
+                panel.next_run = now + panel.interval
+            self._executor.submit(self._compute, panel)
+
+    def _compute(self, panel):
+        try:
+            status, body = self._render(panel.path)
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = {'error': body}
+            content = body if panel.fingerprint is None else json.dumps(panel.fingerprint(data), sort_keys=True)
+            digest = hashlib.sha1(f'{status}:{content}'.encode()).hexdigest()
+            with self._lock:
+                self.computations += 1
+                if digest == panel.hash:
+                    return
+                self._publish(panel, panel.version + 1, digest, status, data, time.time())
+            if self.state_dir is not None:
+                self._write_panel(panel, status, data)
+        except Exception as e:
+            print(f'Panel {panel.name} failed: {e}')
+        finally:
+            with self._lock:
+                panel.running = False
+
+    def _publish(self, panel, version, digest, status, data, updated_at):
+        """Store a changed panel and broadcast it (caller holds the lock)"""
+        panel.version = version
+        panel.hash = digest
+        panel.updated_at = updated_at
+        payload = json.dumps({
+            'panel': panel.name,
+            'version': version,
+            'hash': digest,
+            'status': status,
+            'data': data
+        }, separators=(',', ':'))
+        panel.message = f'event: panel\nid: {panel.name}:{version}\ndata: {payload}\n\n'
+        self._broadcast(panel.message)
+
+    def _panel_path(self, panel):
+        return os.path.join(self.state_dir, f'panel-{panel.name}.json')
+
+    def _write_panel(self, panel, status, data):
+        with self._lock:
+            record = {'version': panel.version, 'hash': panel.hash, 'status': status,
+                      'data': data, 'updated_at': panel.updated_at}
+        path = self._panel_path(panel)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(record, f, separators=(',', ':'))
+        # Readers see the old or the new file, never half of one
+        os.replace(temporary, path)
+
+    def _follow(self):
+        """Broadcast panels the renderer process wrote since the last look"""
+        for panel in self._panels.values():
+            path = self._panel_path(panel)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if mtime == panel.file_mtime:
+                    continue
+                with open(path) as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            panel.file_mtime = mtime
+            with self._lock:
+                if record['hash'] != panel.hash:
+                    self._publish(panel, record['version'], record['hash'], record['status'],
+                                  record['data'], record['updated_at'])
+
+    def _broadcast(self, message):
+        """Queue a message for every subscriber (caller holds the lock)"""
+        self.broadcasts += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Slow client: drop it, the browser reconnects and gets a full refresh
+                self._subscribers.discard(subscriber)
+                self.dropped += 1
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(None)
+
+    def subscribe(self):
+        """Register a client; returns its message queue preloaded with current panels; raises StreamFull"""
+        self.start()
+        subscriber = queue.Queue(maxsize=self.queue_size + len(self._panels))
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                self.rejected += 1
+                raise StreamFull(f'{self.max_subscribers} streams already open in this worker')
+            for panel in self._panels.values():
+                if panel.message is not None:
+                    subscriber.put_nowait(panel.message)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, subscriber):
+        """Yield SSE text for one client until it disconnects or is dropped"""
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'renderer': self.state_dir is None or self._lock_fd is not None,
+                'computations': self.computations,
+                'broadcasts': self.broadcasts,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+                'panels': {
+                    panel.name: {
+                        'interval': panel.interval,
+                        'version': panel.version,
+                        'hash': panel.hash,
+                        'updated_at': panel.updated_at
+                    }
+                    for panel in self._panels.values()
+                }
+            }
@@ -0,0 +1,299 @@
+"""
+Background system metrics sampler
+
+A single daemon thread samples CPU, memory, swap, disk, network and process
+counts on a fixed interval into a ring buffer, so endpoints can answer from
+the latest snapshot instead of blocking on psutil.cpu_percent(interval=1).
+
+Run as a script, the module is a metrics agent for the other game hosts: it
+samples the same way and pushes batches of samples to the admin panel, which
+keeps them per host (see fleet.py).
+
+    python system_metrics.py --panel http://admin-panel:9001 --host db-1
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+GB = 1024 ** 3
+
+# Snapshot keys, in the order agents send them
+SAMPLE_FIELDS = (
+    'timestamp', 'cpu_percent', 'cpu_count', 'cpu_freq', 'memory_total', 'memory_used', 'memory_percent',
+    'swap_total', 'swap_used', 'swap_percent', 'disk_total', 'disk_used', 'disk_percent',
+    'net_bytes_sent', 'net_bytes_recv', 'net_sent_rate', 'net_recv_rate', 'process_count', 'boot_time'
+)
+
+
+def collect_snapshot(previous=None):
+    """Take one non-blocking system snapshot"""
+    now = time.time()
+    cpu_freq = psutil.cpu_freq()
+    memory = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    disk = psutil.disk_usage('/')
+    net_io = psutil.net_io_counters()
+
+    snapshot = {
+        'timestamp': now,
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'cpu_count': psutil.cpu_count(),
+        'cpu_freq': cpu_freq.current if cpu_freq else 0,
+        'memory_total': memory.total,
+        'memory_used': memory.used,
+        'memory_percent': memory.percent,
+        'swap_total': swap.total,
+        'swap_used': swap.used,
+        'swap_percent': swap.percent,
+        'disk_total': disk.total,
+        'disk_used': disk.used,
+        'disk_percent': disk.percent,
+        'net_bytes_sent': net_io.bytes_sent,
+        'net_bytes_recv': net_io.bytes_recv,
+        'net_sent_rate': 0.0,
+        'net_recv_rate': 0.0,
+        'process_count': len(psutil.pids()),
+        'boot_time': psutil.boot_time()
+    }
+
+    if previous:
+        elapsed = now - previous['timestamp']
+        if elapsed > 0:
+            snapshot['net_sent_rate'] = max(0, net_io.bytes_sent - previous['net_bytes_sent']) / elapsed
+            snapshot['net_recv_rate'] = max(0, net_io.bytes_recv - previous['net_bytes_recv']) / elapsed
+
+    return snapshot
+
+
+def format_resources(snapshot):
+    """Shape a snapshot like the /api/server/resources response"""
+    boot_time = datetime.fromtimestamp(snapshot['boot_time'])
+    uptime = datetime.fromtimestamp(snapshot['timestamp']) - boot_time
+    return {
+        'cpu': {
+            'percent': round(snapshot['cpu_percent'], 2),
+            'count': snapshot['cpu_count'],
+            'frequency': round(snapshot['cpu_freq'], 2)
+        },
+        'memory': {
+            'total': round(snapshot['memory_total'] / GB, 2),
+            'used': round(snapshot['memory_used'] / GB, 2),
+            'percent': round(snapshot['memory_percent'], 2)
+        },
+        'disk': {
+            'total': round(snapshot['disk_total'] / GB, 2),
+            'used': round(snapshot['disk_used'] / GB, 2),
+            'percent': round(snapshot['disk_percent'], 2)
+        },
+        'swap': {
+            'total': round(snapshot['swap_total'] / GB, 2),
+            'used': round(snapshot['swap_used'] / GB, 2),
+            'percent': round(snapshot['swap_percent'], 2)
+        },
+        'network': {
+            'sent': round(snapshot['net_bytes_sent'] / GB, 2),
+            'received': round(snapshot['net_bytes_recv'] / GB, 2),
+            'sent_rate': round(snapshot['net_sent_rate'], 2),
+            'received_rate': round(snapshot['net_recv_rate'], 2)
+        },
+        'system': {
+            'uptime': str(uptime).split('.')[0],  # Remove microseconds
+            'boot_time': boot_time.isoformat(),
+            'process_count': snapshot['process_count']
+        },
+        'sampled_at': datetime.fromtimestamp(snapshot['timestamp']).isoformat()
+    }
+
+
+class SystemMetricsSampler:
+    """Samples system metrics every `interval` seconds into a bounded history"""
+
+    def __init__(self, interval=1.0, history_size=3600, collect=collect_snapshot):
+        self.interval = float(interval)
+        self.history_size = int(history_size)
+        self._collect = collect
+        self._history = deque(maxlen=self.history_size)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the sampler thread if it is not already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # Prime cpu_percent so the first real sample covers a full interval
+            psutil.cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._run, name='system-metrics', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add_listener(self, listener):
+        """Call listener(snapshot) after every sample"""
+        self._listeners.append(listener)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f'System metrics sample failed: {e}')
+
+    def sample(self):
+        """Take a snapshot now and append it to the history"""
+        snapshot = self._collect(self.latest(start=False))
+        with self._lock:
+            self._history.append(snapshot)
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f'System metrics listener failed: {e}')
+        return snapshot
+
+    def latest(self, start=True):
+        """Most recent snapshot, sampling synchronously if none exists yet"""
+        if start:
+            self.start()
+        with self._lock:
+            if self._history:
+                return self._history[-1]
+        return self.sample() if start else None
+
+    def history(self, limit=None):
+        """Up to `limit` most recent snapshots, oldest first"""
+        self.start()
+        with self._lock:
+            samples = list(self._history)
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return samples
+
+
+class MetricsAgent:
+    """Samples this host and pushes batches of `batch_size` samples to the admin panel"""
+
+    def __init__(self, panel_url, host, interval=1.0, batch_size=10, timeout=5.0,
+                 token=None, max_pending=3600):
+        self.panel_url = panel_url.rstrip('/')
+        self.host = host
+        self.batch_size = max(1, int(batch_size))
+        self.timeout = float(timeout)
+        self.token = token
+        self.sampler = SystemMetricsSampler(interval=interval, history_size=1)
+        self.sampler.add_listener(self._collected)
+        # Samples not yet accepted by the panel; the oldest go first if it is unreachable for long
+        self._pending = deque(maxlen=int(max_pending))
+        self._lock = threading.Lock()
+        self.registered = False
+        self.pushed = 0
+        self.failures = 0
+
+    def _post(self, path, payload):
+        body = gzip.compress(json.dumps(payload, separators=(',', ':')).encode())
+        headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.panel_url + path, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read() or b'{}')
+
+    def register(self):
+        self._post('/api/fleet/register', {
+            'host': self.host,
+            'push_interval': self.sampler.interval * self.batch_size,
+            'info': {
+                'hostname': socket.gethostname(),
+                'platform': platform.system(),
+                'platform_release': platform.release(),
+                'cpu_count': psutil.cpu_count(),
+                'boot_time': psutil.boot_time(),
+                'interval': self.sampler.interval,
+                'pid': os.getpid()
+            }
+        })
+        self.registered = True
+
+    def _collected(self, snapshot):
+        with self._lock:
+            self._pending.append([snapshot[field] for field in SAMPLE_FIELDS])
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Push every pending sample; they stay pending if the panel cannot be reached"""
+        with self._lock:
+            batch = list(self._pending)
+        if not batch:
+            return 0
+        try:
+            if not self.registered:
+                self.register()
+            self._post('/api/fleet/push', {'host': self.host, 'fields': SAMPLE_FIELDS, 'samples': batch})
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                # The panel lost our registration (new state directory); register on the next push
+                self.registered = False
+            self.failures += 1
+            print(f'Metrics push to {self.panel_url} failed: {e}')
+            return 0
+        except Exception as e:
+            self.failures += 1
+            print(f'Metrics push to {self.panel_url} failed: {e}')
+            return 0
+        sent = {id(sample) for sample in batch}
+        with self._lock:
+            # The deque may have dropped some of the batch (and taken new
+            # samples) meanwhile; remove only samples that went out
+            while self._pending and id(self._pending[0]) in sent:
+                self._pending.popleft()
+        self.pushed += len(batch)
+        return len(batch)
+
+    def run(self):
+        """Sample and push until interrupted"""
+        self.sampler.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.sampler.stop()
+            self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Push this host\'s resource samples to the admin panel')
+    parser.add_argument('--panel', default=os.getenv('AGENT_PANEL_URL', 'http://localhost:9001'),
+                        help='admin panel base URL')
+    parser.add_argument('--host', default=os.getenv('AGENT_HOST', socket.gethostname()),
+                        help='name this host is listed under')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('AGENT_INTERVAL', 1)),
+                        help='seconds between samples')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('AGENT_BATCH_SIZE', 10)),
+                        help='samples per push')
+    args = parser.parse_args()
+    agent = MetricsAgent(args.panel, args.host, interval=args.interval, batch_size=args.batch_size,
+                         token=os.getenv('FLEET_AGENT_TOKEN') or None)
+    print(f'Pushing {args.host} metrics to {args.panel} every {args.interval * args.batch_size:g}s')
+    agent.run()
+
+
+if __name__ == '__main__':
+    main()
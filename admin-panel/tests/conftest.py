@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The admin panel is a flat set of modules, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app reads these at import; keep its local files and background jobs out of the way
+DATA_DIR = tempfile.mkdtemp()
+os.environ.update({
+    'HISTORY_ENABLED': 'false',
+    'ACTIVITY_ROLLUP_ENABLED': 'false',
+    'FLEET_DB_PATH': os.path.join(DATA_DIR, 'fleet.sqlite3'),
+    'SNAPSHOT_DB_PATH': os.path.join(DATA_DIR, 'snapshots.sqlite3'),
+    'ACTIVITY_DB_PATH': os.path.join(DATA_DIR, 'activity.sqlite3'),
+    'ACCOUNT_LINKS_CACHE_PATH': os.path.join(DATA_DIR, 'account_links.json'),
+    'STREAM_STATE_DIR': os.path.join(DATA_DIR, 'stream')
+})
+os.environ.pop('FLEET_AGENT_TOKEN', None)
+
+
+@pytest.fixture(scope='session')
+def standin_db():
+    """The app reading a seeded in-process SQLite stand-in of the game database"""
+    from benchmarks import seed
+    from benchmarks.standin import StandInDatabase
+    import app as admin_app
+
+    # Named after the configured schema, which information_schema lookups filter on
+    db = StandInDatabase(admin_app.DB_CONFIG['database'])
+    conn = db.connect()
+    try:
+        seed.seed(conn, seed.resolve_scale('small'))
+    finally:
+        conn.close()
+    db.refresh_information_schema()
+    admin_app.db_pool.close_all()
+    admin_app.db_pool._connect = db.connect
+    return db
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+
+from account_links import AccountLinkGraph
+
+# Users past the seeded ones, linked only by the rows these tests add
+USERS = (900001, 900002)
+IP = '203.0.113.77'
+
+
+def execute(db, query, params=()):
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@pytest.fixture
+def shared_ip(standin_db):
+    for user_id in USERS:
+        execute(standin_db, "INSERT INTO user_ip (user, ip, occurrence, last_update) VALUES (%s, %s, 1, %s)",
+                (user_id, IP, datetime.now().replace(microsecond=0)))
+    yield standin_db
+    execute(standin_db, "DELETE FROM user_ip WHERE ip = %s", (IP,))
+
+
+def cache_path():
+    return os.path.join(tempfile.mkdtemp(), 'account_links.json')
+
+
+def test_deleted_rows_leave_the_graph(shared_ip):
+    graph = AccountLinkGraph(shared_ip.connect)
+    graph.refresh()
+    assert graph.cluster_for_user(USERS[0])['size'] == 2
+    assert graph.stats()['full_reloads'] == 0
+
+    execute(shared_ip, "DELETE FROM user_ip WHERE user = %s AND ip = %s", (USERS[1], IP))
+    graph.refresh()
+    assert graph.cluster_for_user(USERS[0]) is None
+    assert graph.stats()['full_reloads'] == 1
+
+    # Counts match again, so the next refresh is incremental
+    graph.refresh()
+    assert graph.stats()['full_reloads'] == 1
+
+
+def test_one_writer_per_cache_file(shared_ip):
+    path = cache_path()
+
+    def no_database():
+        raise AssertionError('only the writer may query the database')
+
+    writer = AccountLinkGraph(shared_ip.connect, cache_path=path)
+    follower = AccountLinkGraph(no_database, cache_path=path)
+    writer.update()
+    follower.update()
+
+    assert writer.stats()['writer'] and not follower.stats()['writer']
+    assert follower.ready
+    assert follower.cluster_for_user(USERS[0]) == writer.cluster_for_user(USERS[0])
+    assert follower.stats()['users'] == writer.stats()['users']
+
+    # The follower picks up the writer's next refresh, deletions included
+    execute(shared_ip, "DELETE FROM user_ip WHERE user = %s AND ip = %s", (USERS[1], IP))
+    writer.update()
+    follower.update()
+    assert follower.cluster_for_user(USERS[0]) is None
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from activity import ActivityRollup
+
+
+class FakeCursor:
+    def __init__(self, users):
+        self.users = users
+        self.rows = []
+
+    def execute(self, query, params):
+        if 'GROUP BY DATE(creation_time)' in query:
+            by_day = {}
+            for user_id, last_active, created in self.users:
+                if user_id > params[0]:
+                    count, last_id = by_day.get(created.date(), (0, 0))
+                    by_day[created.date()] = (count + 1, max(last_id, user_id))
+            self.rows = [(day, count, last_id) for day, (count, last_id) in by_day.items()]
+        else:
+            after_time, _, after_id, limit = params
+            after_time = datetime.fromisoformat(after_time)
+            self.rows = sorted(
+                (user for user in self.users
+                 if user[1] > after_time or (user[1] == after_time and user[0] > after_id)),
+                key=lambda user: (user[1], user[0])
+            )[:limit]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, users):
+        self.users = users
+
+    def cursor(self):
+        return FakeCursor(self.users)
+
+    def close(self):
+        pass
+
+
+def test_backfill_counts_every_day():
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    # Two users last active on each of the last 30 days (today included)
+    users = [
+        (day * 2 + n + 1, now - timedelta(days=day), now - timedelta(days=40))
+        for day in range(30) for n in range(2)
+    ]
+    path = os.path.join(tempfile.mkdtemp(), 'activity.sqlite3')
+    # A retention below the backfill plus the MAU window is raised to cover it
+    rollup = ActivityRollup(path, lambda: FakeConnection(users), batch_size=7,
+                            backfill_days=30, raw_retention_days=45)
+    assert rollup.run(force=True)
+
+    rows = rollup.daily(31)
+    assert [row['date'] for row in rows] == [
+        (now - timedelta(days=day)).date().isoformat() for day in reversed(range(30))
+    ]
+    assert all(row['dau'] == 2 for row in rows)
+    assert [row['mau'] for row in rows] == [2 * (day + 1) for day in range(30)]
+    assert rows[-1]['wau'] == 14
+    assert rollup.stats()['user_days'] == 60
@@ -0,0 +1,51 @@
+import app as admin_app
+
+# Keys of /api/bots before the per-bot queries were batched
+BOT_KEYS = {'id', 'name', 'airline_type', 'balance', 'reputation', 'service_quality',
+            'route_count', 'aircraft_count', 'base_count', 'personality', 'routes', 'fleet', 'bases'}
+ROUTE_KEYS = {'id', 'from_iata', 'from_city', 'to_iata', 'to_city', 'distance', 'frequency',
+              'price_economy', 'price_business', 'price_first', 'quality',
+              'capacity_economy', 'capacity_business', 'capacity_first'}
+BASE_KEYS = {'iata', 'city', 'airport_name', 'scale', 'founded_cycle'}
+
+
+def add_route_to_unknown_airport(db, bot_id):
+    """Copy the bot's newest route to an airport id missing from the airport table"""
+    conn = db.connect()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM link WHERE airline = %s ORDER BY id DESC LIMIT 1", (bot_id,))
+        route = cursor.fetchone()
+        cursor.execute("SELECT MAX(id) + 1 AS id FROM link")
+        route['id'] = cursor.fetchone()['id']
+        cursor.execute("SELECT MAX(id) + 1000 AS id FROM airport")
+        route['to_airport'] = cursor.fetchone()['id']
+        columns = ', '.join(route)
+        cursor.execute(f"INSERT INTO link ({columns}) VALUES ({', '.join(['%s'] * len(route))})",
+                       tuple(route.values()))
+        return route['id']
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_bots_keep_their_json_shape(standin_db):
+    bots = admin_app.app.test_client().get('/api/bots').get_json()['bots']
+    assert bots
+    for bot in bots:
+        assert set(bot) == BOT_KEYS
+        for route in bot['routes']:
+            assert set(route) == ROUTE_KEYS
+        for base in bot['bases']:
+            assert set(base) == BASE_KEYS
+
+
+def test_routes_to_unknown_airports_do_not_take_up_the_top_ten(standin_db):
+    client = admin_app.app.test_client()
+    bot = max(client.get('/api/bots').get_json()['bots'], key=lambda bot: bot['route_count'])
+    assert bot['route_count'] >= 10
+    orphan = add_route_to_unknown_airport(standin_db, bot['id'])
+
+    bot = next(other for other in client.get('/api/bots').get_json()['bots'] if other['id'] == bot['id'])
+    assert len(bot['routes']) == 10
+    assert orphan not in [route['id'] for route in bot['routes']]
@@ -0,0 +1,115 @@
+import json
+import os
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from docker_monitor import DockerMonitor, DockerUnavailable
+
+CONTAINER_ID = 'a1b2c3d4e5f6' + '0' * 52
+
+CONTAINERS = [{
+    'Id': CONTAINER_ID,
+    'Names': ['/airline-db'],
+    'Image': 'mysql:8.0',
+    'State': 'running',
+    'Status': 'Up 2 hours',
+    'Ports': [{'IP': '0.0.0.0', 'PrivatePort': 3306, 'PublicPort': 3306, 'Type': 'tcp'}]
+}]
+
+
+def stats_document(cpu_total, system_total):
+    return {
+        'cpu_stats': {'cpu_usage': {'total_usage': cpu_total}, 'system_cpu_usage': system_total, 'online_cpus': 2},
+        'memory_stats': {'usage': 300, 'limit': 1000, 'stats': {'inactive_file': 100}},
+        'networks': {'eth0': {'rx_bytes': 10, 'tx_bytes': 20}},
+        'blkio_stats': {'io_service_bytes_recursive': [{'op': 'Read', 'value': 5}, {'op': 'Write', 'value': 7}]},
+        'pids_stats': {'current': 12}
+    }
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path.startswith('/containers/json'):
+            body = CONTAINERS
+        elif self.path.startswith(f'/containers/{CONTAINER_ID}/stats'):
+            self.server.stats_calls += 1
+            body = stats_document(1000 * self.server.stats_calls, 10000 * self.server.stats_calls)
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, FakeDockerHandler)
+        self.paths = []
+        self.stats_calls = 0
+
+
+@pytest.fixture
+def docker_socket():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'docker.sock')
+    server = FakeDockerServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+    os.rmdir(directory)
+
+
+def test_lists_running_containers_over_the_socket(docker_socket):
+    server, path = docker_socket
+    monitor = DockerMonitor(socket_path=path)
+    monitor.refresh_containers()
+
+    assert server.paths == ['/containers/json?all=0']
+    assert monitor.history('airline-db') == []
+    status = monitor.status()
+    assert status['connected'] and status['containers'] == 1
+
+
+def test_samples_stats_and_diffs_cpu_between_samples(docker_socket):
+    server, path = docker_socket
+    monitor = DockerMonitor(socket_path=path)
+    monitor.refresh_containers()
+    monitor.sample_stats()
+    monitor.sample_stats()
+
+    samples = monitor.history('airline-db')
+    assert len(samples) == 2
+    # The first one-shot sample has nothing to diff against
+    assert samples[0]['cpu_percent'] == 0
+    assert samples[1]['cpu_percent'] == 20.0
+    assert samples[1]['memory_usage'] == 200
+    assert samples[1]['memory_percent'] == 20.0
+    assert samples[1]['net_rx_bytes'] == 10 and samples[1]['block_write_bytes'] == 7
+    assert 'cpu_total' not in samples[1]
+    assert server.stats_calls == 2
+
+
+def test_reports_unreachable_daemon():
+    monitor = DockerMonitor(socket_path='/nonexistent/docker.sock')
+    with pytest.raises(DockerUnavailable):
+        monitor.refresh_containers()
+    assert not monitor.status()['connected']
@@ -0,0 +1,96 @@
+import threading
+
+from db_pool import ConnectionPool
+from fanout import QueryFanout
+
+
+class FakeCursor:
+    def __init__(self, server, release):
+        self.server = server
+        self.release = release
+
+    def execute(self, query, params=None):
+        self.server.statements.append(query)
+        if query.startswith('SELECT SLEEP'):
+            self.release.wait(5)
+
+    def fetchone(self):
+        return {'value': 1}
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    in_transaction = False
+
+    def __init__(self, server, connection_id):
+        self.server = server
+        self.connection_id = connection_id
+        self.autocommit = True
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.server, self.server.release)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    def __init__(self, name, first_id):
+        self.name = name
+        self.statements = []
+        self.release = threading.Event()
+        self._next_id = first_id
+
+    def connect(self, **config):
+        self._next_id += 1
+        return FakeConnection(self, self._next_id)
+
+
+def slow_query(cursor):
+    cursor.execute('SELECT SLEEP(10)')
+    return cursor.fetchone()
+
+
+def test_kill_goes_to_the_server_that_ran_the_query():
+    replica = FakeServer('replica', 100)
+    primary = FakeServer('primary', 200)
+    replica_pool = ConnectionPool({}, size=2, connect=replica.connect, pre_ping=False)
+    primary_pool = ConnectionPool({}, size=2, connect=primary.connect, pre_ping=False)
+    handed_out = []
+
+    def get_connection(timeout=None):
+        # Like the read router: the replica first, then the primary once it "failed"
+        pool = replica_pool if not handed_out else primary_pool
+        handed_out.append(pool)
+        return pool.get_connection(timeout=timeout)
+
+    fanout = QueryFanout(get_connection, workers=1)
+    try:
+        result = fanout.run({'slow': slow_query}, deadline=0.2)
+    finally:
+        replica.release.set()
+
+    assert result.partial
+    assert 'KILL QUERY 101' in replica.statements
+    assert not any(statement.startswith('KILL') for statement in primary.statements)
+    assert fanout.stats()['kills'] == 1
+
+
+def test_kill_is_skipped_when_the_pool_is_unreachable():
+    replica = FakeServer('replica', 100)
+    replica_pool = ConnectionPool({}, size=1, timeout=0.1, connect=replica.connect, pre_ping=False)
+    fanout = QueryFanout(replica_pool.get_connection, workers=1)
+    try:
+        # The only connection is busy with the overrunning query
+        result = fanout.run({'slow': slow_query}, deadline=0.2)
+    finally:
+        replica.release.set()
+
+    assert result.partial
+    assert fanout.stats()['kills'] == 0
+    assert not any(statement.startswith('KILL') for statement in replica.statements)
@@ -0,0 +1,110 @@
+import gzip
+import json
+import time
+
+import pytest
+
+import app as admin_app
+from system_metrics import SAMPLE_FIELDS, MetricsAgent
+
+HOST = 'db-host'
+
+
+def sample_row(**overrides):
+    sample = dict({field: 1 for field in SAMPLE_FIELDS}, timestamp=time.time(), cpu_percent=12.5)
+    sample.update(overrides)
+    return [sample[field] for field in SAMPLE_FIELDS]
+
+
+@pytest.fixture
+def client():
+    client = admin_app.app.test_client()
+    response = client.post('/api/fleet/register', data=json.dumps({'host': HOST, 'push_interval': 10}))
+    assert response.status_code == 200
+    yield client
+    admin_app.fleet.forget(HOST)
+
+
+def push(client, rows, fields=SAMPLE_FIELDS):
+    return client.post('/api/fleet/push', data=json.dumps({'host': HOST, 'fields': list(fields), 'samples': rows}))
+
+
+def test_push_stores_valid_samples(client):
+    response = push(client, [sample_row(), sample_row()])
+    assert response.status_code == 200
+    assert response.get_json()['stored'] == 2
+
+
+def test_push_rejects_malformed_samples(client):
+    bad_pushes = [
+        [sample_row(cpu_percent='x')],
+        [sample_row(memory_percent=True)],
+        [sample_row()[:-1]],
+        [sample_row() + [0]],
+        ['not a row']
+    ]
+    for rows in bad_pushes:
+        response = push(client, rows)
+        assert response.status_code == 400, rows
+        assert response.get_json()['error'].startswith('Invalid push')
+    # json.dumps writes NaN as a bare literal, which json.loads accepts
+    assert push(client, [sample_row(disk_percent=float('nan'))]).status_code == 400
+    assert push(client, [sample_row(cpu_percent=float('inf'))]).status_code == 400
+    assert admin_app.fleet.latest(HOST) is None
+
+
+def test_fleet_listing_skips_bad_stored_values(client):
+    # As stored by a push before samples were validated
+    sample = dict(zip(SAMPLE_FIELDS, sample_row()), cpu_percent='x')
+    admin_app.fleet.push(HOST, [sample])
+
+    response = client.get('/api/fleet')
+    assert response.status_code == 200
+    host = next(host for host in response.get_json()['hosts'] if host['host'] == HOST)
+    assert host['latest']['cpu_percent'] is None
+    assert host['latest']['memory_percent'] == 1
+    metrics = {name: points for name, kind, help_text, points in admin_app.collect_runtime_metrics()}
+    assert metrics['admin_fleet_cpu_percent'] == []
+    assert metrics['admin_fleet_memory_percent'] == [({'host': HOST}, 1)]
+
+
+def test_forget_requires_the_agent_token(client, monkeypatch):
+    monkeypatch.setattr(admin_app, 'FLEET_AGENT_TOKEN', 'secret')
+    assert client.delete(f'/api/fleet/{HOST}').status_code == 403
+    assert admin_app.fleet.host(HOST) is not None
+
+    response = client.delete(f'/api/fleet/{HOST}', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert admin_app.fleet.host(HOST) is None
+
+
+def test_gzip_bodies_are_capped_after_decompression(client, monkeypatch):
+    monkeypatch.setattr(admin_app, 'FLEET_MAX_BODY_BYTES', 4096)
+    headers = {'Content-Encoding': 'gzip'}
+    payload = json.dumps({'host': HOST, 'fields': list(SAMPLE_FIELDS), 'samples': [sample_row()]}).encode()
+    response = client.post('/api/fleet/push', data=gzip.compress(payload), headers=headers)
+    assert response.status_code == 200
+
+    # Compresses to well under the cap but inflates far past it
+    bomb = gzip.compress(payload[:-1] + b' ' * (1024 * 1024) + b'}')
+    assert len(bomb) < 4096
+    response = client.post('/api/fleet/push', data=bomb, headers=headers)
+    assert response.status_code == 400
+    assert 'larger than 4096 bytes' in response.get_json()['error']
+
+
+def test_agent_keeps_samples_taken_during_a_push():
+    agent = MetricsAgent('http://panel.invalid', HOST, batch_size=100, max_pending=3)
+    agent.registered = True
+    for n in range(3):
+        agent._pending.append([n])
+
+    def post(path, payload):
+        # New samples arrive and the full deque drops two that are being sent
+        agent._pending.append(['new', 1])
+        agent._pending.append(['new', 2])
+        return {}
+    agent._post = post
+
+    assert agent.flush() == 3
+    assert list(agent._pending) == [['new', 1], ['new', 2]]
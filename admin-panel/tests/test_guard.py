@@ -0,0 +1,57 @@
+import pytest
+
+import app as admin_app
+from guard import CircuitBreaker, Overloaded
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.stats()['state'] == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_aborted_probe_leaves_the_breaker_half_open():
+    breaker = open_breaker()
+    assert breaker.allow() == (True, True)
+    assert breaker.allow() == (False, False)
+    breaker.abort_probe()
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+    # The next request gets to probe instead
+    assert breaker.allow() == (True, True)
+    breaker.end_probe()
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
+
+
+@pytest.fixture
+def breaker(standin_db, monkeypatch):
+    breaker = open_breaker()
+    monkeypatch.setattr(admin_app, 'db_breaker', breaker)
+    return breaker
+
+
+def test_shed_probe_does_not_close_the_breaker(breaker, monkeypatch):
+    def shed(endpoint):
+        raise Overloaded('queue full')
+    monkeypatch.setattr(admin_app.db_limiter, 'acquire', shed)
+
+    response = admin_app.app.test_client().get('/api/users?per_page=1&search=nobody-shed')
+    assert response.status_code == 503
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+
+
+def test_probe_answered_from_cache_does_not_close_the_breaker(standin_db, monkeypatch):
+    client = admin_app.app.test_client()
+    assert client.get('/api/stats').status_code == 200
+
+    breaker = open_breaker()
+    monkeypatch.setattr(admin_app, 'db_breaker', breaker)
+    response = client.get('/api/stats')
+    assert response.status_code == 200
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+
+
+def test_probe_that_queries_closes_the_breaker(breaker):
+    response = admin_app.app.test_client().get('/api/users?per_page=1&search=probe-closes')
+    assert response.status_code == 200
+    assert breaker.stats()['state'] == CircuitBreaker.CLOSED
@@ -0,0 +1,25 @@
+import pytest
+
+import app as admin_app
+
+
+@pytest.mark.parametrize('path', [
+    '/api/logs/recent?airline=abc',
+    '/api/logs/recent?since_id=1.5',
+    '/api/logs/recent?from_id=x',
+    '/api/logs/recent?limit=ten',
+    '/api/logs/export?to_id=x',
+    '/api/logs/export?max_rows=all'
+])
+def test_non_integer_filters_are_a_400(standin_db, path):
+    response = admin_app.app.test_client().get(path)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid filter')
+
+
+def test_recent_logs_since_id(standin_db):
+    client = admin_app.app.test_client()
+    latest = client.get('/api/logs/recent?limit=5').get_json()
+    assert latest['logs']
+    newer = client.get(f"/api/logs/recent?since_id={latest['last_id']}").get_json()
+    assert newer == {'logs': [], 'last_id': latest['last_id'], 'has_more': False}
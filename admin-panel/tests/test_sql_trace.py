@@ -0,0 +1,33 @@
+import threading
+
+from sql_trace import SqlTracer
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+        self.done = threading.Event()
+
+    def __call__(self, query, params, pool):
+        self.calls.append((query, params, pool))
+        self.done.set()
+        return '{"query_block": {}}'
+
+
+def test_slow_query_is_explained_on_the_pool_that_ran_it():
+    explain = Recorder()
+    tracer = SqlTracer(explain, slow_threshold=0.1)
+    replica = object()
+    tracer.record([], 'get_users', "SELECT * FROM user WHERE id = %s", (7,), 0.2, None, None, pool=replica)
+
+    assert explain.done.wait(5)
+    assert explain.calls == [("SELECT * FROM user WHERE id = %s", (7,), replica)]
+
+
+def test_slow_query_limit_is_at_least_one():
+    tracer = SqlTracer(Recorder(), slow_threshold=0.1)
+    for n in range(3):
+        tracer.record(None, 'route', f"UPDATE t SET a = 1 WHERE b = 'x{n}'", None, 0.2, None, None)
+
+    assert len(tracer.slow_queries(limit=0)['queries']) == 1
+    assert len(tracer.slow_queries(limit=2)['queries']) == 2
@@ -0,0 +1,16 @@
+import app as admin_app
+
+
+def test_search_needs_one_pooled_connection(standin_db, monkeypatch):
+    admin_app.db_pool.close_all()
+    monkeypatch.setattr(admin_app.db_pool, 'size', 1)
+    monkeypatch.setattr(admin_app.db_pool, 'timeout', 0.5)
+    client = admin_app.app.test_client()
+
+    # A term nobody searched for yet, so the count is a cache miss
+    response = client.get('/api/users?search=player&match=prefix&per_page=5')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total_cached'] is False
+    assert body['total'] >= len(body['users']) > 0
+    assert admin_app.db_pool.stats()['in_use'] == 0
@@ -0,0 +1,258 @@
+"""
+Compact on-disk metric history in memory-mapped ring files
+
+Each metric keeps one fixed-size ring file per rollup tier (by default 1s,
+1m and 1h). A slot holds the min, max, sum and count of the samples that
+fell into its interval, so every tier is written directly as samples arrive
+and disk use is fixed by the tier sizes. Queries read the coarsest tier
+that still covers the requested range at the requested step.
+
+Only one process writes (whichever holds the directory's lock file), but
+any process can read, since all of them map the same files.
+"""
+
+import fcntl
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+MAGIC = b'ATS1'
+# magic, resolution seconds, slot count, record size
+HEADER = struct.Struct('<4sqqq')
+HEADER_SIZE = 64
+# slot start (epoch seconds), min, max, sum, count
+RECORD = struct.Struct('<qdddq')
+
+DEFAULT_TIERS = ((1, 6 * 3600), (60, 14 * 24 * 60), (3600, 2 * 365 * 24))
+_METRIC_NAME = re.compile(r'^[a-z0-9_]+$')
+
+
+def parse_tiers(spec):
+    """Parse "1:21600,60:20160" into ((resolution, slots), ...) sorted finest first"""
+    tiers = []
+    for part in spec.split(','):
+        resolution, slots = part.split(':')
+        tiers.append((int(resolution), int(slots)))
+    return tuple(sorted(tiers))
+
+
+class RingFile:
+    """Fixed number of rollup slots for one metric at one resolution"""
+
+    def __init__(self, path, resolution, slots, writable=False):
+        self.path = path
+        self.resolution = int(resolution)
+        self.slots = int(slots)
+        self.size = HEADER_SIZE + self.slots * RECORD.size
+        self._map = None
+        self._writable = writable
+
+    @property
+    def retention(self):
+        return self.resolution * self.slots
+
+    def _open(self):
+        if self._map is not None:
+            return self._map
+        if self._writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            try:
+                fd = os.open(self.path, os.O_RDONLY)
+            except FileNotFoundError:
+                return None
+        try:
+            header = os.pread(fd, HEADER.size, 0)
+            expected = (MAGIC, self.resolution, self.slots, RECORD.size)
+            if len(header) < HEADER.size or HEADER.unpack(header) != expected:
+                if not self._writable:
+                    return None
+                # New file, or one written with a different tier layout: start over
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+                os.pwrite(fd, HEADER.pack(*expected), 0)
+            access = mmap.ACCESS_WRITE if self._writable else mmap.ACCESS_READ
+            self._map = mmap.mmap(fd, self.size, access=access)
+        finally:
+            os.close(fd)
+        return self._map
+
+    def _offset(self, slot_start):
+        return HEADER_SIZE + (slot_start // self.resolution) % self.slots * RECORD.size
+
+    def add(self, timestamp, value):
+        """Fold one sample into the slot covering `timestamp`"""
+        buffer = self._open()
+        slot_start = int(timestamp) // self.resolution * self.resolution
+        offset = self._offset(slot_start)
+        start, low, high, total, count = RECORD.unpack_from(buffer, offset)
+        if start != slot_start or count == 0:
+            # The slot still holds an older lap of the ring; overwrite it
+            RECORD.pack_into(buffer, offset, slot_start, value, value, value, 1)
+        else:
+            RECORD.pack_into(buffer, offset, slot_start, min(low, value), max(high, value),
+                             total + value, count + 1)
+
+    def read(self, start, end):
+        """Yield (slot_start, min, max, sum, count) for filled slots in [start, end)"""
+        buffer = self._open()
+        if buffer is None:
+            return
+        first = max(int(start) // self.resolution * self.resolution,
+                    (int(end) // self.resolution - self.slots + 1) * self.resolution)
+        for slot_start in range(first, int(end), self.resolution):
+            record = RECORD.unpack_from(buffer, self._offset(slot_start))
+            if record[0] == slot_start and record[4] > 0:
+                yield record
+
+    def flush(self):
+        if self._map is not None and self._writable:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class TimeSeriesStore:
+    """Per-metric ring files in `directory`, one per (resolution, slots) tier"""
+
+    def __init__(self, directory, tiers=DEFAULT_TIERS, max_points=2000):
+        self.directory = directory
+        self.tiers = tuple(sorted(tiers))
+        self.max_points = int(max_points)
+        self._lock = threading.Lock()
+        self._files = {}
+        self._lock_fd = None
+        self.samples_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, metric, resolution):
+        return os.path.join(self.directory, f'{metric}.{resolution}s.ring')
+
+    def _rings(self, metric, writable):
+        key = (metric, writable)
+        rings = self._files.get(key)
+        if rings is None:
+            rings = [RingFile(self._path(metric, resolution), resolution, slots, writable)
+                     for resolution, slots in self.tiers]
+            self._files[key] = rings
+        return rings
+
+    def acquire_writer(self):
+        """Try to become the single writing process; True if this process writes"""
+        with self._lock:
+            if self._lock_fd is not None:
+                return True
+            fd = os.open(os.path.join(self.directory, 'writer.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            return True
+
+    def record(self, values, timestamp=None):
+        """Write {metric: value} at `timestamp` if this process holds the writer lock"""
+        if not self.acquire_writer():
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for metric, value in values.items():
+                if value is None or not _METRIC_NAME.match(metric):
+                    continue
+                for ring in self._rings(metric, writable=True):
+                    ring.add(timestamp, float(value))
+                self.samples_written += 1
+        return True
+
+    def metrics(self):
+        """Names of metrics that have history on disk"""
+        suffix = f'.{self.tiers[0][0]}s.ring'
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.directory) if name.endswith(suffix))
+
+    def choose_tier(self, start, step, now=None):
+        """Coarsest tier no coarser than `step` that still reaches back to `start`"""
+        now = time.time() if now is None else now
+        covering = [tier for tier in self.tiers if now - tier[0] * tier[1] <= start]
+        if not covering:
+            # Nothing reaches that far back; the longest-lived tier has the most of it
+            return max(self.tiers, key=lambda tier: tier[0] * tier[1])
+        fine_enough = [tier for tier in covering if tier[0] <= step]
+        if fine_enough:
+            return max(fine_enough)
+        return min(covering)
+
+    def query(self, metric, start, end, step=None):
+        """Min/max/avg points for `metric` over [start, end) bucketed by `step` seconds"""
+        if not _METRIC_NAME.match(metric):
+            raise ValueError(f'Invalid metric name: {metric}')
+        span = max(1.0, end - start)
+        step = max(1, int(step or math.ceil(span / 300)))
+        # Never return more than max_points buckets
+        step = max(step, int(math.ceil(span / self.max_points)))
+        resolution, slots = self.choose_tier(start, step)
+        # Whole tier slots per bucket, and buckets on step boundaries
+        step = int(math.ceil(step / resolution)) * resolution
+
+        with self._lock:
+            rings = self._rings(metric, writable=False)
+            ring = next(ring for ring in rings if ring.resolution == resolution)
+            records = list(ring.read(start, end))
+
+        buckets = {}
+        for slot_start, low, high, total, count in records:
+            bucket = slot_start // step * step
+            current = buckets.get(bucket)
+            if current is None:
+                buckets[bucket] = [low, high, total, count]
+            else:
+                current[0] = min(current[0], low)
+                current[1] = max(current[1], high)
+                current[2] += total
+                current[3] += count
+
+        points = [
+            {
+                'timestamp': bucket,
+                'min': round(low, 4),
+                'max': round(high, 4),
+                'avg': round(total / count, 4),
+                'count': count
+            }
+            for bucket, (low, high, total, count) in sorted(buckets.items())
+        ]
+        return {
+            'metric': metric,
+            'from': start,
+            'to': end,
+            'step': step,
+            'tier': {'resolution': resolution, 'retention': resolution * slots},
+            'points': points
+        }
+
+    def flush(self):
+        with self._lock:
+            for rings in self._files.values():
+                for ring in rings:
+                    ring.flush()
+
+    def stats(self):
+        per_metric = sum(HEADER_SIZE + slots * RECORD.size for _, slots in self.tiers)
+        metrics = self.metrics()
+        return {
+            'directory': self.directory,
+            'writer': self._lock_fd is not None,
+            'tiers': [{'resolution': resolution, 'slots': slots, 'retention': resolution * slots}
+                      for resolution, slots in self.tiers],
+            'metrics': metrics,
+            'bytes_per_metric': per_metric,
+            'disk_bytes': per_metric * len(metrics),
+            'samples_written': self.samples_written
+        }